@@ -56,19 +56,46 @@ API Detailed (Depreciated)
 
         <=  Setting Up =======================================================>
         *def configSetDisplay                               Allows loading a different display interface (default loads 'class DisplaySimpleAndClean')
+        def configSetDisplayThrottle                        Calls the display every N ticks, every N seconds, or only once the CPU halts (default every tick)
         *def configSetInstructionSet                        Allows loading a different instruction set (default loads 'class InstructionSetDefault')
         *def configSetParser                                Allows loading a different parser (default loads 'class ParseDefault')
+        def configSetProfiler                               Counts the ticks spent on every instruction line and loop, see 'def profile'
+        def configSetLoopDetection                          Stops running when the registers repeat an earlier state, IE: an infinite loop
+        def configSetOptimizer                              Runs a peephole pass over the loaded program, IE: threads jump chains and fuses instruction pairs into superinstructions
+        def configSetCheckpoints                            Takes a snapshot every N ticks, and journals every tick, so 'def rewind' can go back to any tick
+        def configSetTracer                                 Records every cycle into a trace file (see 'class TraceWriter'), replayed by 'class TraceReader'
+        def configAddHook                                   Subscribes a function to an engine event (load, parse, link, tick, instruction, halt), see 'var hookEvents'
+        def configRemoveHook                                Unsubscribes a function added by 'def configAddHook'
+        def configSetLogging                                Subscribes (or unsubscribes) hooks that log the load, parse, and link events
+        def configSetSharedRegister                         Moves a register bank into shared memory, so CPUs in other processes can share it (IE: 'm'), see 'class RegisterBankShared'
+        def configSetBarrier                                Waits on a barrier every N ticks, so CPUs in other processes run in lockstep
+        def configSetFetch                                  Fetches every instruction line through a function of pc, instead of from the program loaded by 'def linkAndLoad' (IE: from memory, see 'class RiscV')
         def configSetPostCycleFunction                      Allows changing the function that executes after every cycle (default loads 'def _postCycleUserDefault')
-        *def configAddRegister                              Adds x amount of registers with 'key' name
+        *def configAddRegister                              Adds x amount of registers with 'key' name (optionally as a compact 'class RegisterBankArray')
         def configAddFlag                                   Adds a flag register with 'index' name
         *def configConfigRegister                           Adds or modifies a specific register (key/index pair), and it's properties
         *def inject                                         Writes a number directly to a register
         *def extract                                        Get a number directly from a register
-        def _postCycleUserDefault                           The function that executes after every cycle (loaded by default), copies new state to old state, resets 'flag' registers, etc]
+        def injectRange                                     Writes bytes, an array, or a list into a range of registers at once
+        def extractRange                                    Returns a range of registers as an array at once
+        def loadImage                                       Loads a flat binary or hex image file into a register bank (IE: 'm') in bulk
+        def snapshot                                        Returns a copy of the registers and engine counters
+        def restore                                         Restores a copy returned by 'def snapshot'
+        *def clone                                          Returns an independent copy of the CPU, sharing the config and loaded program instead of rebuilding them
+        def _postCycleUserDefault                           The function that executes after every cycle (loaded by default), copies new state to old state, resets 'flag' registers (hardwired and auto cleared registers are handled by the engine)
 
         <=  Running Code =====================================================>
         *def linkAndLoad                                    Takes in source code, 'compiles' it, loads it into memory
         *def run                                            Runs code (use after 'def linkAndLoad')
+        def profile                                         Returns the ticks spent per pc, source line, instruction, and loop of a profiled run. See 'def configSetProfiler'
+        def profileTable                                    Returns 'def profile' as a text table
+        def profileCollapsed                                Returns 'def profile' as collapsed stacks, for flamegraph tools
+        *def runAsync                                       Same as 'def run', but an asyncio coroutine that yields every N ticks, for running many CPUs in one thread
+        def rewind                                          Puts the registers back to an earlier tick, continue with run(resume = True). See 'def configSetCheckpoints'
+        def _decodeNested                                   Lowers an instruction Node into pre-bound instructions, and immediate values into the 'imm' constant pool, once at load time
+        def _executeDecoded                                 Runs a line lowered by 'def _decodeNested'
+        *def sweep                                          Runs one program over many inputs in a process pool, loads the program once per worker
+        *def cluster                                        Runs one program on many cores, one process per core, sharing one register bank (IE: 'm')
         *def lazy                  #TODO not implimented    Takes in source code, 'compiles' it, runs it (without loading it into main memory)
         def _postEngineTick                                 
 
@@ -79,6 +106,8 @@ API Detailed (Depreciated)
         *class DisplaySimpleAndClean                        The default display, simple and clean for showing execution statuses and register values
             def runtime                                     Runs after every cycle, displays status/contents of registers
             def postrun                                     Runs after execution has halted
+        class DisplayIncremental                            Same as 'class DisplaySimpleAndClean', but only redraws registers that changed (ANSI cursor addressing)
+            def reset                                       Forgets the layout, the next frame redraws the whole screen
         *class DisplaySilent                                Intentionally displays nothing
             def runtime
             def postrun
@@ -142,6 +171,8 @@ API Detailed (Depreciated)
             def opJump
             def opShiftL
             def opShiftR
+            def opCAS                                       Atomic compare and swap, see 'class RegisterBankShared'
+            def opFetchAdd                                  Atomic add, returns the old value
             def opHalt                      #TODO Still figuring out syscalls
 
     <=  Testing defaults in Module ===========================================>
@@ -154,18 +185,32 @@ API Detailed (Depreciated)
         def testVLIW                                        Tests VLIW (Very Long Instruction Word) support
         def _testProgram1_defaultMultiply                   Instantiates a CPU and runs a test program (multiplication)
         def testProgram1                                    Runs (multiplication) test program with various inputs in different configurations
+    class DisplayRecord                                     A display for unittests, that records every frame instead of printing it
+    class TestDefaultDecoding                               Tests decoded lines, the read only state instructions see, and the peephole optimizer
+    class TestDefaultRegisterFile                           Tests the versioned register file, compact banks, clones, hardwired and auto cleared registers
+    class TestDefaultBulkAccess                             Tests injectRange/extractRange and loading image files
+    class TestDefaultDisplay                                Tests display throttling, the incremental display and immediates
+    class TestDefaultDebugging                              Tests the trace recorder, rewind, the profiler and loop detection
+    class TestDefaultHooks                                  Tests the engine event hooks and logging
+    class TestDefaultAsync                                  Tests 'def CPUsim.runAsync'
 
     <=  Example Partial Implimentation of RiscV ==============================> #Work in progress
     class RiscV                                             A more advanced example of creating a custom CPU
         var CPU                                             Contains an initialized instance of 'class CPUsim'
         def __init__                                        Sets up the CPU registers and memory and stuff
-        def postCycle
+        def assemble                                        Encodes the loaded program into RV32I instruction words
+        def loadBinary                                      Loads RV32I instruction words into 'm', and runs them through a fetch, decode, execute path
+        def fetch                                           Reads the instruction word at pc from 'm', decodes it through the decode cache
+        def decode                                          Decodes an RV32I instruction word into a 'class CPUsim._decodedLine'
+        def disassemble                                     Turns RV32I instruction words back into source code
+        def loadImage                                       Loads a flat binary or hex image file into 'm', and runs it the same as 'def loadBinary'
         class RiscVISA
             var instructionSet
             var stats
             var directives
             def __init__                                    An advanced example of a customized instruction set
             def opSetLessThan                               A customized instruction
+            def opBranch                                    A pc relative branch, used by decoded instruction words
         class RiscVParser                                   A customized parser for loading RiscV like assembly code
             def parseCode                                   The customized parser
             def ruleContainerTokensFollowingInstruction     A customized rule
@@ -350,7 +395,26 @@ version = sys.version_info
 assert version[0] == 3 and version[1] >= 10
 
 import copy # copy.deepcopy() required because states are a nested dictionary, and need to be copied instead of referenced
+from collections.abc import MutableMapping # used for register file overlays that need to look like the plain state dictionaries
+import array # used for compact register banks, IE: one contiguous array per register bank
 import functools # used for partial functions when executioning 'instruction operations'
+import itertools # used for chunking the inputs of 'def sweep'
+import collections # used for the queue of pending 'def sweep' chunks, and the queues and sets of 'class CPUsim_v4'
+import heapq # used for the completion event queue of 'class CPUsim_v4.ExecutorOutOfOrder'
+import math # used for rounding latencies up to whole ticks in 'class CPUsim_v4'
+import os # used for image file sizes, see 'def loadImage', and the worker count of 'def sweep'
+import concurrent.futures # used for running one program over many inputs in parallel, see 'def sweep'
+import multiprocessing # used for running many cores in separate processes, see 'def cluster'
+import queue # used for waiting on 'def cluster' results
+from multiprocessing import shared_memory # used for register banks shared between processes, see 'class RegisterBankShared'
+import time # used for throttling the display on a wall clock interval, see 'def configSetDisplayThrottle'
+import asyncio # used for running many CPUs in one event loop, see 'def runAsync'
+import mmap # used for execution trace files, see 'class TraceWriter', and image files, see 'def loadImage'
+import re # used for hex image files, see 'def loadImage'
+import struct # used for the header of execution trace files, see 'class TraceWriter'
+import weakref # used for per CPU decode caches, see 'def RiscV.fetch'
+import types # used for read only views of the state handed to instructions, see 'def _executeDecoded'
+import json # used for the register table of execution trace files, see 'class TraceWriter'
 import unittest
 import random
 from decimal import Decimal # used for handling floating point numbers in limited areas. IE: keeping track of energy usage of a single hyper efficiant instruction (10^-4)
@@ -638,6 +702,8 @@ class CPUsim:
         should CPUsim have 'checkpoints' that can be reverted to?
     '''
 
+    hookEvents : tuple[str] = ("load", "parse", "link", "tick", "instruction", "halt") #see 'def configAddHook'
+
     def __init__(self, bitLength : int = 16, defaultSetup : bool = True):
         assert type(bitLength) is int
         assert bitLength >= 1
@@ -647,20 +713,27 @@ class CPUsim:
         self.bitLength : int = bitLength #the length of the registers in bits
 
         '''core engine variables, used by a number of different functions, classes, etc. It's assumed that these variables always exist'''
-        self.state      : dict[str, dict[str or int, int]] = {}
         self.lastState  : dict[str, dict[str or int, int]] = {}
+        self.state      : CPUsim.RegisterFileVersioned = self.RegisterFileVersioned(self.lastState) #always an overlay on top of self.lastState, see 'def _postCycle'
         self.config     : dict[str, dict[str or int, dict]] = {}
-        self.stats : dict = {} #FUTURE used to keep track of CPU counters, like instruction executed, energy used, etc
+        self._autoClear : dict[str, list[str or int]] = {} #registers reset to zero every tick (IE: flags), see 'def configConfigRegister'
+        self._configShared : bool = False #True when self.config is shared with a clone, see 'def clone'
+        self.stats : dict = {} #FUTURE used to keep track of CPU counters, like instruction executed, energy used, etc. Has "profile" when profiling, see 'def configSetProfiler'
         self.engine : dict = {} #FUTURE used to keep track of CPU engine information?, should it be merged with self.stats?
 
         self.engine["run"] = False 
+        self.engine["halted"] : bool = False #True once the program ran 'def opHalt', False when 'def run' stopped for any other reason (cycleLimit, loop detection, cancelled)
 
         #TODO find a better structure for this
         self.engine["labels"] : dict[str, int] = None
         self.engine["instructionArray"] : list["Nodes"] = None
+        self.engine["decodedArray"] : list["CPUsim._decodedLine"] = None #instructionArray lowered into pre-bound instructions, see 'def linkAndLoad'
+        self.engine["optimizedArray"] : list["CPUsim._decodedLine"] = None #decodedArray after 'def _peephole', None unless 'def configSetOptimizer' is on
         self.engine["sourceCode"] : str = None
         self.engine["sourceCodeLineNumber"] : int = None #TODO this should be an array of ints, to represent multiple instructions being executed
+        self.engine["immediates"] : tuple[int] = () #'imm' indexes read by the last line executed, the displays only show these
         self.engine["tick"] : int = 0
+        self.engine["loop"] : dict[str, int] = None #{"start" : tick, "period" : ticks} of the infinite loop found by 'def configSetLoopDetection'
 
         '''a bunch of variables that are required for proper functioning, but are reqired to be configured by config functions
         defined here for a full listing of all these variables
@@ -671,6 +744,27 @@ class CPUsim:
         self.userDisplay : __class__ = None
         self._displayRuntime : Callable[[], None] = lambda : None
         self._displayPostRun : Callable[[], None] = lambda : None
+        #self.configSetDisplayThrottle
+        self._displayThrottle : tuple[int, float] = (1, None) #(ticks, seconds)
+        #self.configSetTracer
+        self._tracer : CPUsim.TraceWriter = None
+        #self.configAddHook
+        self._hooks : dict[str, list[Callable]] = {event : [] for event in self.hookEvents}
+        #self.configSetProfiler
+        self._profiling : bool = False
+        #self.configSetLoopDetection
+        self._loopDetection : bool = False
+        #self.configSetOptimizer
+        self._optimize : bool = False
+        #self.configSetBarrier
+        self._barrier : tuple["multiprocessing.Barrier", int] = (None, None) #(barrier, ticks)
+        #self.configSetFetch
+        self._fetch : Callable[["CPUsim", int], CPUsim._decodedLine] = None
+        #self.configSetCheckpoints
+        self._checkpointInterval : int = None
+        self._checkpointLimit : int = None
+        self._checkpoints : dict[int, dict] = {} #tick -> 'def snapshot' taken at the start of that tick
+        self._journal : dict[int, tuple[dict, dict]] = {} #tick -> (registers committed, registers written but not committed) at the end of that tick
         #self.configSetInstructionSet
         self.userInstructionSet : __class__ = None
         self._instructionSet : dict[str, Callable[[dict, dict, dict, dict, "Args"], None]] = {}
@@ -688,10 +782,10 @@ class CPUsim:
 
         #adds special registers that are required
         self.configConfigRegister('pc', 0, bitLength, note="SPECIAL") #program counter, it's a list for better consistancy with the other registers
-        for i in range(1024): 
-            self.configConfigRegister('imm', i, bitLength, note="SPECIAL") #holds immidiate values, IE: literal numbers stored in the instruction, EX: with "add 2,r0->r1", the '2' is stored in the instruction
-        self.state['imm'] = {}  #clears all immediate indexes, will be dynamically generated when needed
+        #holds immidiate values, IE: literal numbers stored in the instruction, EX: with "add 2,r0->r1", the '2' is stored in the instruction
+        #it's the constant pool of the loaded program, one 'imm' register per distinct value, added by 'def linkAndLoad'
         self.lastState['imm'] = {}
+        self.config['imm'] = {}
         
         #self.state['stack'] = [None for i in range(memoryAmount)] #stores stack data #FUTURE
         #the entire state information for registers, program pointers, etc, should be stored as one memory unit for simplicity
@@ -709,7 +803,7 @@ class CPUsim:
             self.configAddFlag('carry')
 
         #engine stuff?
-        self.lastState, self.state = self.userPostCycle(self.state)
+        self._postCycle()
         self._postEngineTick()
 
     def _computeNamespace(self): #TODO this should serve a different function, updating namespaces throughout program WITHOUT using a centralized 'namespace' variable
@@ -749,7 +843,8 @@ class CPUsim:
             runtime(lastState, state, config, stats, engine) - runs after every execution cycle
             postrun(lastState, state, config, stats, engine) - runs after the CPU halts
 
-        Note: runtime() must be able to handle the 'imm' register having a variying sized array, since it's size changes based on what the currect instruction needs
+        Note: runtime() must be able to handle the 'imm' register having a variying sized array, since it's size changes based on the constants of the loaded program
+        The 'imm' registers of the current line are in engine["immediates"], the rest of the constant pool doesn't change
         """
         assert displayInstance.runtime
         assert displayInstance.postrun
@@ -762,12 +857,195 @@ class CPUsim:
         self._displayRuntime = lambda : displayInstance.runtime(self.lastState, self.state, self.config, self.stats, self.engine)
         self._displayPostRun = lambda : displayInstance.postrun(self.lastState, self.state, self.config, self.stats, self.engine)
 
+    def configSetDisplayThrottle(self, ticks : int = 1, seconds : float = None):
+        """Takes in how often the display's runtime() is called while running. The display's postrun() is always called
+
+        ticks = N       calls runtime() every N ticks (default, every tick)
+        ticks = 0       only calls runtime() once, after the CPU halts (or reaches the cycle limit)
+        seconds = S     calls runtime() at most once every S seconds (wall clock), the clock is only checked every 'ticks' ticks
+
+        Ticks in between don't touch the display at all, so long running programs run about as fast as with 'class DisplaySilent'
+        """
+        assert type(ticks) is int
+        assert ticks >= 0
+        assert type(seconds) is type(None) or type(seconds) is float or type(seconds) is int
+        assert (True if seconds >= 0 else False) if seconds != None else True
+        assert not(ticks == 0 and seconds != None) #the clock would never be checked
+
+        self._displayThrottle = (ticks, seconds)
+
+    def configSetTracer(self, tracerInstance):
+        """Takes in a class that records every cycle of 'def run' (IE: 'class TraceWriter'), or None to stop tracing
+
+        class must have:
+            begin(state, config) - runs before the first cycle, takes in the registers and their config
+            record(tick, pc, instructionId, writes) - runs after every cycle, writes is {'key' : {index : value}} of the registers written that cycle
+            end() - runs after the CPU halts
+        """
+        if tracerInstance != None:
+            assert callable(tracerInstance.begin)
+            assert callable(tracerInstance.record)
+            assert callable(tracerInstance.end)
+
+        self._tracer = tracerInstance
+
+    def configAddHook(self, event : str, hook : Callable):
+        """Takes in an event name (see 'var hookEvents'), and a function to call every time the event happens
+
+        hook is called with the CPU and the event's payload:
+            "load"          hook(CPU, code)                                         - 'def linkAndLoad' is handed source code
+            "parse"         hook(CPU, parseTree, parseLabels)                       - the source code is parsed
+            "link"          hook(CPU, instructionArray, decodedArray, labels)       - the program is compiled, lowered, and loaded
+            "tick"          hook(CPU, tick, pc, committed)                          - after every cycle of 'def run', committed is {'key' : {index : value}}
+            "instruction"   hook(CPU, pc, operation, arguments)                     - before every instruction of a line (IE: every instruction of a VLIW line) is run
+            "halt"          hook(CPU, tick, halted)                                 - 'def run' stops, halted is True only if the program ran 'def opHalt' (not for cycleLimit, loop detection, or a cancelled 'def runAsync')
+        Payloads are the engine's own objects, not copies or strings, and must only be read. Nothing is built for an event no hook is subscribed to
+        """
+        assert event in self.hookEvents
+        assert callable(hook)
+
+        self._hooks[event].append(hook)
+
+    def configRemoveHook(self, event : str, hook : Callable):
+        """Takes in an event name and a function added by 'def configAddHook', stops calling it"""
+        assert event in self.hookEvents
+
+        self._hooks[event].remove(hook)
+
+    def configSetLogging(self, enabled : bool = True):
+        """Takes in whether the load, parse, and link events are logged (see 'def configAddHook'), IE: the source code at INFO, the parse tree and labels at DEBUG
+
+        Off by default, so loading a program doesn't build any of the log strings
+        """
+        assert type(enabled) is bool
+
+        hooks : dict[str, Callable] = {"load" : CPUsim._logLoad, "parse" : CPUsim._logParse, "link" : CPUsim._logLink}
+        for event, hook in hooks.items():
+            if hook in self._hooks[event]:
+                self._hooks[event].remove(hook)
+            if enabled:
+                self._hooks[event].append(hook)
+
+    @staticmethod
+    def _logLoad(CPU : "CPUsim", code : str):
+        logging.info(debugHelper(inspect.currentframe()) + "Loading source code = " + "\n" + str(code))
+
+    @staticmethod
+    def _logParse(CPU : "CPUsim", parseTree : "Node", parseLabels : dict):
+        logging.debug(debugHelper(inspect.currentframe()) + "parseLabels = " + str(parseLabels))
+        logging.info(debugHelper(inspect.currentframe()) + "linkAndLoad parseTree = " + "\n" + str(parseTree))
+
+    @staticmethod
+    def _logLink(CPU : "CPUsim", instructionArray : list["Node"], decodedArray : list["CPUsim._decodedLine"], labels : dict[str, int]):
+        logging.debug(debugHelper(inspect.currentframe()) + "compilerLabels = " + str(labels))
+        logging.info(debugHelper(inspect.currentframe()) + "Program Counter set to " + hex(CPU.state["pc"][0]))
+
+    def configSetOptimizer(self, enabled : bool):
+        """Takes in if 'def linkAndLoad' should run a peephole pass over the loaded program (default off), see 'def _peephole'
+
+        The simulated ticks are unchanged (a fused line counts every tick of the lines it replaces), but the host runs fewer, cheaper lines.
+        The display, tracer, and profiler see a fused line as one step. Runs with checkpoints on (see 'def configSetCheckpoints') use the unoptimized program, since 'def rewind' needs every tick
+        Takes effect on the next 'def linkAndLoad'
+        """
+        assert type(enabled) is bool
+
+        self._optimize = enabled
+
+    def configSetSharedRegister(self, key : str, name : str = None, lock : "multiprocessing.Lock" = None) -> str:
+        """Takes in a register bank key, moves the register bank into a multiprocessing.shared_memory block (see 'class RegisterBankShared'), so CPUs in other processes can share it. Returns the name of the block
+
+        name = None creates a new block holding the current register values. Otherwise attaches to an existing block, and the registers take the block's values (the register bank must have the same layout as the one that created the block)
+        lock is held by atomic instructions (IE: 'cas'), and has to be the same lock for every CPU sharing the block. None creates a new lock, IE: only atomic within this process
+        The registers can't be added to or resized afterwards. The creator of the block unlinks it, see RegisterBankShared.close()
+        """
+        assert type(key) is str
+        assert key in self.lastState.keys()
+        assert type(name) is type(None) or type(name) is str
+
+        if type(self.lastState[key]) is not self.RegisterBankArray:
+            self._configAddRegisterCompact(key, self.bitLength, 0, True) #converts the register bank, see 'def configAddRegister'
+        self._unshareConfig()
+
+        bank : CPUsim.RegisterBankArray = self.lastState[key]
+        if type(bank._values) is list:
+            raise Exception("Register bank '" + key + "' has registers over 64 bits, which can't be shared")
+
+        sharedMemory : shared_memory.SharedMemory = shared_memory.SharedMemory(name = name, create = name == None, size = max(1, len(bank._values) * bank._values.itemsize))
+        shared : CPUsim.RegisterBankShared = self.RegisterBankShared(bank, sharedMemory, lock if lock != None else multiprocessing.Lock(), name == None)
+        self.lastState[key] = shared
+        self.config[key].bank = shared
+
+        return sharedMemory.name
+
+    def configSetBarrier(self, barrier : "multiprocessing.Barrier", interval : int = 1):
+        """Takes in a barrier (IE: multiprocessing.Barrier), 'def run' waits on it every interval ticks. None turns it off (default)
+
+        Lets CPUs in different processes run in lockstep, see 'def cluster'. Every CPU sharing the barrier has to keep waiting on it until they have all halted
+        """
+        assert barrier == None or callable(barrier.wait)
+        assert type(interval) is int
+        assert interval >= 1
+
+        self._barrier = (barrier, interval)
+
+    def configSetFetch(self, fetch : Callable[["CPUsim", int], "CPUsim._decodedLine"]):
+        """Takes in a function that takes in the running CPU and the program counter, and returns the instruction line to execute (IE: decoded from memory, see 'def RiscV.fetch'), or None to stop. None turns it off (default)
+
+        'def run' then fetches every line through it, instead of from self.engine["decodedArray"] (and the peephole pass is skipped, see 'def configSetOptimizer')
+        The running CPU is passed in, instead of bound into fetch, so a clone (see 'def clone') fetches from it's own registers
+        """
+        assert fetch == None or callable(fetch)
+
+        self._fetch = fetch
+
+    def configSetCheckpoints(self, interval : int = None, limit : int = None):
+        """Takes in how often 'def run' takes a full snapshot of the registers, so it can be rewound (see 'def rewind'). None turns checkpoints off (default)
+
+        interval = N    takes a snapshot every N ticks, and keeps a journal of the registers written every tick. Rewinding costs O(N) at most
+        limit = N       only keeps the last N snapshots (and their journals), bounding memory. None keeps every snapshot
+        """
+        assert type(interval) is type(None) or type(interval) is int
+        assert (True if interval >= 1 else False) if type(interval) is int else True
+        assert type(limit) is type(None) or type(limit) is int
+        assert (True if limit >= 1 else False) if type(limit) is int else True
+
+        self._checkpointInterval = interval
+        self._checkpointLimit = limit
+        self._checkpoints = {}
+        self._journal = {}
+
+    def configSetProfiler(self, enabled : bool = True):
+        """Takes in whether 'def run' profiles the program, IE: counts the ticks spent on every instruction line, and every backward jump (loop) taken
+
+        Costs one list increment per tick. The counts are kept in self.stats["profile"], see 'def profile', 'def profileTable' and 'def profileCollapsed'
+        After running, self.stats["profileTable"] holds the table from 'def profileTable', which 'class DisplaySimpleAndClean' prints when the CPU halts
+        """
+        assert type(enabled) is bool
+
+        self._profiling = enabled
+
+    def configSetLoopDetection(self, enabled : bool = True):
+        """Takes in whether 'def run' stops early when the program is stuck in an infinite loop, IE: the registers (including 'pc') repeat a state they were in before
+
+        Keeps a hash of all registers, updated with the registers written every tick (O(registers written), or O(memory size) with a custom post cycle function).
+        Uses Brent's cycle detection, so only one earlier state is kept, and every hash match is verified against it before stopping.
+        When a loop is found, self.engine["loop"] is set to {"start" : tick of the compared state, "period" : ticks per loop iteration}
+        """
+        assert type(enabled) is bool
+
+        self._loopDetection = enabled
+
     def configSetInstructionSet(self, instructionSetInstance):
         """Takes in a class representing the instruction set
 
         class must have:
             instructionSet : {str: function} - contains a dictionary of operation names with instruction functions
             directives : {str: function} - contains a dictionary of assembler directives with directive functions
+        class can have (used by 'def _peephole'):
+            unconditionalJump : str - the operation name of a jump that only takes a pointer
+            superinstructions : {(str, str): function} - takes in the arguments of two consecutive single instruction lines, returns an (operation, arguments) pair doing both, or None
+        instruction functions are called as function(oldState, newState, config, engine, *arguments), see 'def _executeDecoded'
+            oldState and config are read only views of the live self.lastState and self.config, not copies. Only newState (IE: self.state) may be written to
         """
         assert type(instructionSetInstance.instructionSet) is dict
         assert type(instructionSetInstance.directives) is dict
@@ -822,10 +1100,13 @@ class CPUsim:
 
         self.userPostCycle = postCycle
 
-    def configAddRegister(self, name : str, bitLength : int, amount : int, show : bool = True):
+    def configAddRegister(self, name : str, bitLength : int, amount : int, show : bool = True, compact : bool = False):
         """takes in the name of the register/memory symbol to add, the amount of that symbol to add (can be zero for an empty array), and bitLength. Adds and configures that memory to self.state
         
-        calls self.configConfigRegister()"""
+        calls self.configConfigRegister()
+
+        compact = True stores the register bank as one contiguous array (see 'class RegisterBankArray'), with every register sharing one config dictionary until configured individually.
+            An existing register bank is converted, keeping it's values and config. Meant for large 'm' banks"""
         assert type(name) is str
         assert len(name) >= 1
         #assert all([i in ([chr(j) for j in range(128) if chr(j).islower()] + [chr(j) for j in range(128) if chr(j).isdigit()] + ['_']) for i in list(name)]) #does the same as str.isidrentifier()
@@ -839,11 +1120,57 @@ class CPUsim:
 
         assert type(show) is bool
 
-        for i in range(amount):
-            self.configConfigRegister(name.lower(), i, bitLength, show)
+        assert type(compact) is bool
+
+        if compact:
+            self._configAddRegisterCompact(name.lower(), bitLength, amount, show)
+        else:
+            for i in range(amount):
+                self.configConfigRegister(name.lower(), i, bitLength, show)
 
         self._computeNamespace()
 
+    def _configAddRegisterCompact(self, name : str, bitLength : int, amount : int, show : bool):
+        """Same as 'def configAddRegister', but stores the register bank as a 'class RegisterBankArray'. Adds all missing registers in bulk instead of one configConfigRegister() call each"""
+        self._unshareConfig()
+
+        template : dict = {'bitLength' : bitLength, 'show' : show, 'alias' : [], 'latencyCycles' : 0, 'energy' : 0, 'note' : "", 'hardwired' : False, 'autoClear' : False}
+
+        if not(name in self.lastState.keys()):
+            bank : CPUsim.RegisterBankArray = self.RegisterBankArray()
+            self.lastState[name] = bank
+            self.config[name] = self._RegisterConfigShared(bank, template)
+        elif type(self.lastState[name]) is not self.RegisterBankArray:
+            #converts an existing register bank, every register keeps it's own config
+            oldBank : dict[str or int, int] = self.lastState[name]
+            oldConfig : dict[str or int, dict] = self.config[name]
+
+            bank : CPUsim.RegisterBankArray = self.RegisterBankArray()
+            config : CPUsim._RegisterConfigShared = self._RegisterConfigShared(bank, template)
+            for index, value in oldBank.items():
+                bank.addRegister(index, oldConfig[index]['bitLength'])
+                bank[index] = value
+                config[index] = oldConfig[index]
+            self.lastState[name] = bank
+            self.config[name] = config
+
+        bank : CPUsim.RegisterBankArray = self.lastState[name]
+        config : CPUsim._RegisterConfigShared = self.config[name]
+        sharesTemplate : bool = config.template['bitLength'] == bitLength and config.template['show'] == show
+
+        for i in range(amount):
+            if i in bank: #same as configConfigRegister() on an existing register
+                config.own(i)['bitLength'] = bitLength
+                config[i]['show'] = show
+                bank.setBitLength(i, bitLength)
+            elif i == len(bank) and sharesTemplate: #the common case, appends all remaining registers at once
+                bank.addRegisters(amount - i, bitLength)
+                break
+            else:
+                bank.addRegister(i, bitLength)
+                if not sharesTemplate:
+                    config[i] = dict(template, alias = [])
+
     def configAddFlag(self, name : str):
         """Takes in a name for a CPU flag to add, Adds it to self.state
         
@@ -853,14 +1180,18 @@ class CPUsim:
         #assert all([i in ([chr(j) for j in range(128) if chr(j).islower()] + [chr(j) for j in range(128) if chr(j).isdigit()] + ['_']) for i in list(name)]) #does the same as str.isidrentifier()
         assert name.isidentifier()
 
-        self.configConfigRegister('flag', name.lower(), bitLength=1)
+        self.configConfigRegister('flag', name.lower(), bitLength=1, autoClear=True)
 
         self._computeNamespace()
 
-    def configConfigRegister(self, register : str, index : int or str, bitLength : int = None, show : bool = None, alias : list[str] = None, latencyCycles : int = None, energy : int = None, note : str = None, ):
+    def configConfigRegister(self, register : str, index : int or str, bitLength : int = None, show : bool = None, alias : list[str] = None, latencyCycles : int = None, energy : int = None, note : str = None, hardwired : bool = None, autoClear : bool = None):
         """Takes in a key/value pair representing a register/memory element, and takes in arguments for detailed configuration of that register/memory element
 
         if a key/value pair does not exist, it will be created
+
+        hardwired = True keeps the register at it's current value, writes to it are dropped as they are made (IE: RiscV x0)
+        autoClear = True resets the register to zero at the end of every tick (IE: flags, see 'def configAddFlag')
+        Both are handled by the engine for every post cycle function, costing O(1) per write/register instead of a copy of the whole state
         """
         assert type(register) is str
         assert len(register) >= 1
@@ -891,14 +1222,24 @@ class CPUsim:
         assert type(energy) is type(None) or type(energy) is int
         assert (True if energy >= 0 else False) if type(energy) is int else True
 
-        if not(register.lower() in self.state.keys()):
-            self.state[register.lower()]        = {}
+        assert type(hardwired) is type(None) or type(hardwired) is bool
+
+        assert type(autoClear) is type(None) or type(autoClear) is bool
+
+        self._unshareConfig()
+
+        #Note: self.state is an overlay on top of self.lastState, so registers only need to be added to self.lastState
+        if not(register.lower() in self.lastState.keys()):
             self.lastState[register.lower()]    = {}
             self.config[register.lower()]       = {}
 
-        if not(index in self.state[register.lower()].keys()):
-            self.state[register.lower()][index]     = 0
-            self.lastState[register.lower()][index] = 0
+        compact : bool = type(self.lastState[register.lower()]) is self.RegisterBankArray
+
+        if not(index in self.lastState[register.lower()].keys()):
+            if compact:
+                self.lastState[register.lower()].addRegister(index, 1)
+            else:
+                self.lastState[register.lower()][index] = 0
             self.config[register.lower()][index]    = {}
 
             self.config[register.lower()][index]['bitLength']       = 1
@@ -907,9 +1248,16 @@ class CPUsim:
             self.config[register.lower()][index]['latencyCycles']   = 0
             self.config[register.lower()][index]['energy']          = 0
             self.config[register.lower()][index]['note']            = ""
+            self.config[register.lower()][index]['hardwired']       = False
+            self.config[register.lower()][index]['autoClear']       = False
+
+        if compact and any([i != None for i in (bitLength, show, alias, latencyCycles, energy, note, hardwired, autoClear)]):
+            self.config[register.lower()].own(index) #stops sharing the bank's config dictionary before it's modified
 
         if bitLength != None:
             self.config[register.lower()][index]['bitLength']       = bitLength
+            if compact:
+                self.lastState[register.lower()].setBitLength(index, bitLength)
         if show != None:
             self.config[register.lower()][index]['show']            = show
         if alias != None:
@@ -923,6 +1271,16 @@ class CPUsim:
             self.config[register.lower()][index]['energy']          = energy
         if note != None:
             self.config[register.lower()][index]['note']            = note
+        if hardwired != None:
+            self.config[register.lower()][index]['hardwired']       = hardwired
+            self.state.setHardwired(register.lower(), index, hardwired)
+        if autoClear != None:
+            self.config[register.lower()][index]['autoClear']       = autoClear
+            indexes : list[str or int] = [i for i in self._autoClear.get(register.lower(), []) if i != index] + ([index] if autoClear else [])
+            if len(indexes) != 0:
+                self._autoClear[register.lower()] = indexes
+            else:
+                self._autoClear.pop(register.lower(), None)
 
         self._computeNamespace()
 
@@ -974,28 +1332,302 @@ class CPUsim:
 
         return self.state[t1][t2]
 
+    def loadImage(self, path : str, key : str = 'm', base : int = 0, imageFormat : str = None) -> int:
+        """Takes in the path of a flat binary or hex image file, loads it into register bank key, starting at register base. Returns the amount of registers loaded
+
+        imageFormat:
+            "binary"    - raw bytes, (bitLength + 7) // 8 bytes per register (the bitLength of register base), little endian
+            "hex"       - text, one hex value per register, separated by whitespace. '@address' moves to register base + address (hex), '//' starts a comment. IE: Verilog $readmemh
+            None        - "hex" for .hex files, "binary" otherwise
+        The file is memory mapped, and copied into the register bank in bulk (see 'def injectRange'), instead of one 'def inject' per register. A hex image is parsed whole first, so an invalid one loads nothing
+        The registers are committed at once (IE: replace any uncommitted writes to them), aren't displayed, and don't increment the simulation. Writes to hardwired registers are dropped
+        """
+        assert type(path) is str
+        assert type(key) is str
+        assert key in self.lastState.keys()
+        assert type(base) is int
+        assert base in self.lastState[key]
+        assert imageFormat in (None, "binary", "hex")
+
+        if imageFormat == None:
+            imageFormat = "hex" if path.lower().endswith(".hex") else "binary"
+
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return 0
+            with mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ) as image:
+                if imageFormat == "binary":
+                    return self.injectRange(key, base, image)
+                text : bytes = re.sub(rb"//[^\n]*", b"", image)
+
+        #the whole image is parsed and checked before any register is written, so a bad image loads nothing
+        blocks : list[tuple[int, "array.array or list[int]"]] = [] #(first register, values) of every '@address' block
+        parts : list[bytes] = re.split(rb"@([0-9A-Fa-f]+)", text) #text, address, text, address, text...
+        for i in range(0, len(parts), 2):
+            if len(parts[i].translate(None, b"0123456789abcdefABCDEF_ \t\r\n\v\f")) != 0:
+                raise Exception("Image '" + path + "' has a non hex value " + repr(re.search(rb"[^0-9A-Fa-f_\s]\S*", parts[i]).group().decode(errors = "replace")))
+            tokens : list[bytes] = parts[i].split()
+            if len(tokens) == 0:
+                continue
+            digits : int = len(parts[i].translate(None, b" \t\r\n\v\f"))
+            if digits == 2 * len(tokens) and b"_" not in parts[i]: #one byte per value, IE: $readmemh of a byte memory. bytes.fromhex skips the whitespace
+                values = array.array('B', bytes.fromhex(parts[i].decode()))
+            else:
+                try:
+                    values = [int(token, 16) for token in tokens]
+                except ValueError:
+                    raise Exception("Image '" + path + "' has a misplaced '_' in a hex value")
+            start : int = base + (int(parts[i - 1], 16) if i != 0 else 0)
+            if start + len(values) - 1 not in self.lastState[key]:
+                raise Exception("Image '" + path + "' is too large to fit into register bank '" + key + "', register " + str(start + len(values) - 1))
+            blocks.append((start, values))
+
+        return sum([self.injectRange(key, start, values) for start, values in blocks])
+
+    def injectRange(self, key : str, start : int, values : "bytes or memoryview or array.array or list[int]") -> int:
+        """Takes in a register bank key, the first register index, and values. Writes the values into consecutive registers from start. Returns the amount of registers written
+
+        values:
+            bytes, bytearray, or a memoryview of bytes  - packed, (bitLength + 7) // 8 bytes per register (the bitLength of register start), little endian
+            array.array, list, or any other memoryview  - one value per register
+        Values are cut down to fit each register's bitLength. Compact register banks (see 'class RegisterBankArray') are written with one array copy, if no value has to be cut down
+        Writes to hardwired registers are dropped, as in 'def inject' (see 'def configConfigRegister')
+        Unlike 'def inject', the registers are committed at once (IE: replace any uncommitted writes to them), aren't displayed, and don't increment the simulation
+        """
+        assert type(key) is str
+        assert key in self.lastState.keys()
+        assert type(start) is int
+        assert start in self.lastState[key]
+
+        bank = self.lastState[key]
+        compact : bool = isinstance(bank, self.RegisterBankArray) and type(bank._values) is not list
+        typecode : str = (bank._values.typecode if type(bank._values) is array.array else bank._values.format) if compact else None
+
+        elements : "array.array or list[int]" = values
+        if not isinstance(values, (array.array, list)):
+            with memoryview(values) as view:
+                if view.format not in ("B", "b", "c"):
+                    elements = view.tolist()
+                else:
+                    width : int = (self.config[key][start]['bitLength'] + 7) // 8
+                    if view.nbytes % width != 0:
+                        raise Exception("Expected a whole number of " + str(width) + " byte registers, got " + str(view.nbytes) + " bytes")
+                    widthTypecodes : dict[int, str] = {array.array(i).itemsize : i for i in reversed(self.RegisterBankArray._typecodes)} #bytes -> smallest typecode of that size
+                    if width in widthTypecodes:
+                        elements = array.array(typecode if compact and bank._values.itemsize == width else widthTypecodes[width])
+                        elements.frombytes(view)
+                        if sys.byteorder != "little":
+                            elements.byteswap()
+                    else:
+                        data : bytes = view.tobytes()
+                        elements = [int.from_bytes(data[i : i + width], "little") for i in range(0, len(data), width)]
+
+        count : int = len(elements)
+        if count == 0:
+            return 0
+        if start + count - 1 not in bank:
+            raise Exception(str(count) + " registers from " + str(start) + " don't fit into register bank '" + key + "'")
+
+        hardwired : dict[int, int] = {index : bank[index] for index in self.state.hardwired.get(key, ()) if type(index) is int and start <= index < start + count} #kept at their current value, as 'def inject' drops writes to them
+
+        copied : bool = False
+        if compact and start + count <= bank._direct:
+            bitLength : int = bank._bitLengths[start]
+            if bank._bitLengths[start : start + count] == array.array('I', [bitLength]) * count: #one mask for the whole range, compared as whole arrays
+                if type(elements) is array.array and elements.typecode == typecode and bitLength == elements.itemsize * 8: #already whole registers
+                    copied = True
+                elif min(elements) >= 0 and max(elements) < 2**bitLength:
+                    elements = array.array(typecode, elements)
+                    copied = True
+                if copied:
+                    bank._values[start : start + count] = elements
+        if not copied and type(bank) is dict:
+            config : dict[int, dict] = self.config[key]
+            bitLengths : set[int] = {i['bitLength'] for i in map(config.__getitem__, range(start, start + count))}
+            if len(bitLengths) == 1: #one mask for the whole range, written with one dict update
+                mask : int = 2**bitLengths.pop() - 1
+                if min(elements) < 0 or max(elements) > mask:
+                    elements = [element & mask for element in elements]
+                bank.update(zip(range(start, start + count), elements))
+                copied = True
+        if not copied:
+            for i in range(count):
+                bank[start + i] = elements[i] & (2**self.config[key][start + i]['bitLength'] - 1)
+        for index, value in hardwired.items():
+            bank[index] = value
+
+        delta : dict = self.state[key].delta
+        if len(delta) != 0:
+            for index in [index for index in delta if type(index) is int and start <= index < start + count]:
+                del delta[index]
+
+        return count
+
+    def extractRange(self, key : str, start : int, count : int) -> "array.array or list[int]":
+        """Takes in a register bank key, the first register index, and the amount of registers. Returns the values of those registers (including writes not yet committed), as an array.array of the smallest type that fits them (a list for registers over 64 bits)
+
+        Compact register banks (see 'class RegisterBankArray') are copied with one array copy. Unlike 'def extract', doesn't increment the simulation
+        """
+        assert type(key) is str
+        assert key in self.lastState.keys()
+        assert type(start) is int
+        assert type(count) is int
+        assert count >= 0
+        assert count == 0 or (start in self.lastState[key] and start + count - 1 in self.lastState[key])
+
+        bank = self.lastState[key]
+        if isinstance(bank, self.RegisterBankArray) and type(bank._values) is not list and start + count <= bank._direct:
+            values : array.array = array.array(bank._values.typecode if type(bank._values) is array.array else bank._values.format, bank._values[start : start + count])
+        else:
+            bitLength : int = max([self.config[key][i]['bitLength'] for i in range(start, start + count)], default = 1)
+            typecodes : list[str] = [i for i in self.RegisterBankArray._typecodes if array.array(i).itemsize * 8 >= bitLength]
+            values : array.array or list[int] = [bank[i] for i in range(start, start + count)]
+            if len(typecodes) != 0:
+                values = array.array(typecodes[0], values)
+
+        for index, value in self.state[key].delta.items():
+            if type(index) is int and start <= index < start + count:
+                values[index - start] = value
+
+        return values
+
+    def snapshot(self) -> dict:
+        """Returns a copy of every register (including writes not yet committed) and the engine tick counters. See 'def restore'
+
+        Costs O(memory size), but compact register banks (see 'class RegisterBankArray') are copied as whole arrays"""
+        return {
+            "state"     : self.state.snapshot(),
+            "engine"    : {"run" : self.engine["run"], "halted" : self.engine["halted"], "tick" : self.engine["tick"]}
+        }
+
+    def restore(self, snapshot : dict):
+        """Takes in a snapshot returned by 'def snapshot', copies it back into the registers. Registers added after the snapshot was taken are left as is"""
+        assert type(snapshot) is dict
+        assert "state" in snapshot.keys() and "engine" in snapshot.keys()
+
+        self.state.restore(snapshot["state"])
+        self.engine["run"] = snapshot["engine"]["run"]
+        self.engine["halted"] = snapshot["engine"]["halted"]
+        self.engine["tick"] = snapshot["engine"]["tick"]
+
+    def clone(self) -> "CPUsim":
+        """Returns a new CPU with the same configuration, loaded program, and register values, that runs independently of this CPU
+
+        The config, instruction set, parse tree, and decoded program are shared instead of rebuilt, only the registers are copied (compact register banks as whole arrays).
+        Costs O(registers), instead of re-running __init__, the config functions, and linkAndLoad.
+        self.config stays shared until either CPU is reconfigured (see 'def _unshareConfig')
+
+        EX: loaded = CPUsim(); loaded.linkAndLoad(code); CPU = loaded.clone(); CPU.inject('r', 0, 5); CPU.run()
+        """
+        snapshot : dict = self.state.snapshot()
+
+        CPU : CPUsim = object.__new__(type(self))
+        CPU.__dict__.update(self.__dict__)
+
+        CPU.lastState = snapshot["base"]
+        CPU.state = self.RegisterFileVersioned(CPU.lastState, {key : set(indexes) for key, indexes in self.state.hardwired.items()})
+        for key, delta in snapshot["delta"].items():
+            CPU.state[key].delta = delta
+        CPU.stats = copy.deepcopy(self.stats)
+        CPU.engine = dict(self.engine) #labels, instructionArray and decodedArray are replaced (never modified) by linkAndLoad, so they can be shared
+        CPU._tokenAlias = dict(self._tokenAlias)
+        CPU._autoClear = {key : list(indexes) for key, indexes in self._autoClear.items()}
+        CPU._tracer = None #two CPUs can't write the same trace
+        CPU._hooks = {event : list(hooks) for event, hooks in self._hooks.items()}
+        CPU._checkpoints = {}
+        CPU._journal = {}
+
+        self._configShared = True
+        CPU._configShared = True
+
+        #anything bound to this CPU has to be rebound to the clone
+        if getattr(self.userPostCycle, "__self__", None) is self:
+            CPU.userPostCycle = self.userPostCycle.__func__.__get__(CPU)
+        CPU.configSetDisplay(copy.copy(self.userDisplay))
+        CPU.configSetParser(copy.copy(self.userParser)) #the parser keeps a namespace of the CPUs registers
+
+        return CPU
+
+    def _unshareConfig(self):
+        """Gives this CPU it's own copy of self.config if it's shared with a clone (see 'def clone'). Called before self.config is modified, costs O(registers) once"""
+        if not self._configShared:
+            return
+
+        config : dict[str, dict[str or int, dict]] = {}
+        for key, registers in self.config.items():
+            if type(registers) is self._RegisterConfigShared:
+                config[key] = self._RegisterConfigShared(self.lastState[key], copy.deepcopy(registers.template))
+                config[key]._own = copy.deepcopy(registers._own)
+            else:
+                config[key] = copy.deepcopy(registers)
+        self.config = config
+        self._configShared = False
+
     def _postCycleUserDefault(self, currentState : dict[str, dict[str or int, int]]) -> tuple[dict[str, dict[str or int, int]], dict[str, dict[str or int, int]]]:
         """Takes in a dictionary currentState, returns a tuple containing two dictionaries representing the oldState and the newState, respectivly.
 
-        resets all required registers and flags between instructions, copies current state into lastState"""
+        resets all flags between instructions, copies current state into lastState. Hardwired and other auto cleared registers are handled by the engine, see 'def configConfigRegister'
+
+        Note: the engine recognizes this function, and runs the equivalent copy-on-write commit instead of calling it (see 'def _postCycle')"""
         assert type(currentState) is dict
 
         oldState = copy.deepcopy(currentState) #required deepCopy because state['flags'] contains a dictionary which needs to be copied
         newState = copy.deepcopy(currentState)
-        
+
         if 'flag' in newState.keys():
             for i in newState['flag'].keys(): #resets all flags
                 newState['flag'][i] = 0
-        newState['imm'] = {} 
 
         return (oldState, newState)
 
+    def _postCycle(self) -> dict[str, dict[str or int, int]]:
+        """Runs after every cycle, commits self.state into self.lastState, and starts a new self.state overlay. Returns the committed registers, IE: {'key' : {index : value}}
+
+        With the default post cycle function, only the registers written this cycle are copied.
+        A custom post cycle function (see 'def configSetPostCycleFunction') is still handed full dictionaries, and costs O(memory size)
+        Either way, only the auto cleared registers (IE: flags) that are set are reset, writes to hardwired registers never reach the state (see 'def configConfigRegister')
+        The 'flag' registers are reset by 'def _postCycleUserDefault' itself, so custom post cycle functions that call it reset them too, auto cleared or not
+        """
+        if self.userPostCycle == self._postCycleUserDefault:
+            committed : dict[str, dict[str or int, int]] = self.state.commit()
+            if 'flag' in self.lastState.keys(): #resets all flags, as 'def _postCycleUserDefault' does, not only the auto cleared ones
+                bank = self.lastState['flag']
+                for i in bank.keys():
+                    if bank[i] != 0:
+                        self.state['flag'][i] = 0
+        else:
+            oldState, newState = self.userPostCycle(self.state.materialize())
+
+            #copies the results back into the existing register banks, so custom register banks (IE: 'class RegisterBankArray') are kept
+            committed : dict[str, dict[str or int, int]] = self.state._throughValues() #already in self.lastState, see 'def RegisterFileVersioned.writeThrough'
+            self.state = self.RegisterFileVersioned(self.lastState, self.state.hardwired)
+            for key in oldState.keys() & self.lastState.keys():
+                bank = self.lastState[key]
+                for index, value in oldState[key].items():
+                    if bank.get(index) != value:
+                        bank[index] = value
+                        committed.setdefault(key, {})[index] = value
+            for key in newState.keys() & oldState.keys():
+                for index, value in newState[key].items():
+                    if oldState[key].get(index) != value:
+                        self.state[key][index] = value
+
+        for key, indexes in self._autoClear.items():
+            bank = self.lastState[key]
+            for i in indexes:
+                if bank[i] != 0:
+                    self.state[key][i] = 0
+
+        return committed
+
     def linkAndLoad(self, code: str):
         """Takes in a string of assembly instructions, and "compiles"/loads it into memory, 'm' registers
         
         configures:
             program counter to label __main, 0 if __main not present
             self.engine["instructionArray"] to contain instruction Nodes
+            self.engine["decodedArray"] to contain the instruction Nodes lowered into pre-bound instructions (see 'def _decodeNested')
+            self.engine["optimizedArray"] to contain decodedArray after a peephole pass, if 'def configSetOptimizer' is on
             self.state["m"] to contain the memory of the program (but not instruction binary encodings, instructions are written as zeros)
             self.engine["labels"] to contain a dictionary of associations of labels with memory pointers
 
@@ -1004,13 +1636,14 @@ class CPUsim:
         assert type(code) is str
         assert len(code) > 0
 
-        logging.info(debugHelper(inspect.currentframe()) + "Loading source code = " + "\n" + str(code))
+        for hook in self._hooks["load"]:
+            hook(self, code)
 
         self.engine["sourceCode"] : str = code
         parseTree, parseLabels = self._parseCode(code)
 
-        logging.debug(debugHelper(inspect.currentframe()) + "parseLabels = " + str(parseLabels))
-        logging.info(debugHelper(inspect.currentframe()) + "linkAndLoad parseTree = " + "\n" + str(parseTree))
+        for hook in self._hooks["parse"]:
+            hook(self, parseTree, parseLabels)
 
         assemmbledObject = self.compileDefault(self._instructionSet, self._directives)
         instructionArray : list["Node" or None] = [] #instructionArray is list of instruction nodes
@@ -1037,38 +1670,139 @@ class CPUsim:
             self.state["m"][i] = memoryArray[i]
         
         self.engine["labels"] = compileLabels
-        logging.debug(debugHelper(inspect.currentframe()) + "compilerLabels = " + str(compileLabels))
+
+        #lowers every instruction Node once, so 'def run' doesn't have to re-walk the parse tree every cycle
+        #immediate values and labels are resolved to 'imm' registers of one de-duplicated constant pool, loaded once here instead of every cycle
+        decodedArray : list[CPUsim._decodedLine or None] = []
+        constants : dict[int, int] = {} #value -> 'imm' index
+        for line in instructionArray:
+            if line is None:
+                decodedArray.append(None)
+                continue
+            immediates : list[int] = []
+            instructions : list[tuple[Callable, tuple]] = []
+            self._decodeNested(line, constants, immediates, instructions)
+            decodedArray.append(self._decodedLine(line.lineNum, tuple(immediates), tuple(instructions)))
+        self.engine["decodedArray"] = decodedArray
+
+        self._unshareConfig()
+        self.lastState['imm'].clear()
+        self.config['imm'] = {}
+        for value, index in constants.items():
+            self.configConfigRegister('imm', index, self.bitLength, note="SPECIAL")
+            self.lastState['imm'][index] = value
+        self.engine["immediates"] = ()
+
+        self.engine["optimizedArray"] = self._peephole(decodedArray) if self._optimize else None
 
         #sets the program counter to the label __main, if the label __main exists
         #TODO allow a settable 'main' label. IE: allow different labels to be used as the program start instead of '__main'
         if "__main" in self.engine["labels"]:
             self.state["pc"][0] = self.engine["labels"]["__main"]
 
-        logging.info(debugHelper(inspect.currentframe()) + "Program Counter set to " + hex(self.state["pc"][0]))
+        for hook in self._hooks["link"]:
+            hook(self, instructionArray, decodedArray, compileLabels)
 
     def lazy(self, code : str):
         """NotImplimented
         decodes and executes a single instruction line"""
         pass
 
-    def run(self, cycleLimit = 1024):
+    def run(self, cycleLimit = 1024, resume : bool = False):
         """Prototype
         starts execution of instructions
+
+        Dispatches straight to the pre-decoded lines in self.engine["decodedArray"] (built by 'def linkAndLoad'), the parse tree is not walked at runtime
+        resume = True continues from the current tick (IE: after 'def rewind') instead of starting over from tick 0
         
         #TODO check for empty instruction lines
         #TODO perform checks on everything"""
+        for _ in self._runSteps(cycleLimit, resume, None):
+            pass
 
-        '''
-            do a depth first search on the execution tree
-            apply 'rule functions' based on what the token is
-            recursivly evaluate
-        '''
-        self._displayRuntime()
-        self.lastState, self.state = self.userPostCycle(self.state)
-        self._postEngineTick()
+    async def runAsync(self, cycleLimit : int = 1024, yieldEvery : int = 256, resume : bool = False):
+        """Same as 'def run', but as a coroutine that gives control back to the asyncio event loop every yieldEvery ticks
+
+        Lets many CPUs run interleaved in one thread, IE: await asyncio.gather(CPU1.runAsync(), CPU2.runAsync()), and be cancelled or timed out (IE: asyncio.wait_for) between ticks.
+        A cancelled run stops on a tick boundary, and can be continued with resume = True
+        """
+        assert type(yieldEvery) is int
+        assert yieldEvery >= 1
+
+        steps = self._runSteps(cycleLimit, resume, yieldEvery)
+        finished : bool = False
+        try:
+            for _ in steps:
+                await asyncio.sleep(0)
+            finished = True
+        finally:
+            if not finished: #a cancelled run doesn't reach the end of 'def _runSteps'
+                steps.close()
+                if self._tracer != None:
+                    self._tracer.end()
+                for hook in self._hooks["halt"]:
+                    hook(self, self.engine["tick"], False)
+
+    def _runSteps(self, cycleLimit : int, resume : bool, yieldEvery : int) -> "Iterator[int]":
+        """The execution loop of 'def run' and 'def runAsync'. Is a generator that yields the tick every yieldEvery ticks, or never if yieldEvery is None"""
+        assert type(cycleLimit) is int
+        assert type(resume) is bool
+        assert type(yieldEvery) is type(None) or type(yieldEvery) is int
+
+        if not resume:
+            self._displayRuntime()
+            self._postCycle()
+            self._postEngineTick()
 
-        self.engine["run"] = True
-        self.engine["tick"] = 0
+            self.engine["run"] = True
+            self.engine["halted"] = False
+            self.engine["tick"] = 0
+            self._checkpoints = {}
+            self._journal = {}
+
+        checkpointInterval : int = self._checkpointInterval
+
+        #see 'def configSetLoopDetection'
+        loopHash : int = None
+        self.engine["loop"] = None
+        if self._loopDetection:
+            loopHash = self._stateHash()
+            loopSaved : tuple[int, int, dict] = (loopHash, self.engine["tick"], self.state.materialize()) #(hash, tick, state)
+            loopPower : int = 1
+
+        #see 'def configSetProfiler'
+        pcCounts : list[int] = None
+        if self._profiling:
+            if not resume or "profile" not in self.stats.keys():
+                self.stats["profile"] = {"pc" : [0] * len(self.engine["decodedArray"]), "backwardJumps" : {}}
+            pcCounts = self.stats["profile"]["pc"]
+            backwardJumps : dict[tuple[int, int], int] = self.stats["profile"]["backwardJumps"]
+
+        #see 'def configSetDisplayThrottle'
+        displayTicks, displaySeconds = self._displayThrottle
+        displayCountdown : int = displayTicks
+        displayNext : float = time.monotonic() + displaySeconds if displaySeconds != None else None
+        displayed : bool = True
+
+        tracer = self._tracer
+        if tracer != None:
+            tracer.begin(self.lastState, self.config)
+
+        #see 'def configAddHook', empty lists are skipped with one truth test per tick
+        tickHooks : list[Callable] = self._hooks["tick"]
+        instructionHooks : list[Callable] = self._hooks["instruction"]
+
+        yieldCountdown : int = yieldEvery
+
+        #see 'def configSetBarrier'
+        barrier, barrierTicks = self._barrier
+        barrierCountdown : int = barrierTicks
+
+        originalArray : list[CPUsim._decodedLine] = self.engine["decodedArray"]
+        decodedArray : list[CPUsim._decodedLine] = originalArray
+        if self.engine["optimizedArray"] != None and checkpointInterval == None:
+            decodedArray = self.engine["optimizedArray"]
+        fetch : Callable[[CPUsim, int], CPUsim._decodedLine] = self._fetch #see 'def configSetFetch'
 
         i = 0
         while i < cycleLimit:
@@ -1076,91 +1810,584 @@ class CPUsim:
             if self.engine["run"] == False:
                 break
 
-            #logging.info(debugHelper(inspect.currentframe()) + str(i))
-            line = self.engine["instructionArray"][self.state["pc"][0]]
-            #logging.info(debugHelper(inspect.currentframe()) + "\n" + str(line))
+            if checkpointInterval != None and self.engine["tick"] % checkpointInterval == 0:
+                self._checkpoint()
+
+            pc : int = self.state["pc"][0]
+            line = decodedArray[pc] if fetch == None else fetch(self, pc)
             if line is None: #TODO this should raise an exception, since it's trying to execute a non-instruction
                 break
+            if line.ticks != 1: #lines fused by 'def _peephole' count every tick they replace
+                if cycleLimit - i < line.ticks - 1:
+                    line = originalArray[pc]
+                i += line.ticks - 1
 
             self.engine["sourceCodeLineNumber"] = line.lineNum
+            self.engine["immediates"] = line.immediates
+            if pcCounts != None:
+                if line.fused == None:
+                    pcCounts[pc] += line.ticks
+                else:
+                    for fusedPc in line.fused:
+                        pcCounts[fusedPc] += 1
 
-            self._evaluateNested(line)
+            if instructionHooks:
+                for operation, arguments in line.instructions:
+                    for hook in instructionHooks:
+                        hook(self, pc, operation, arguments)
 
-            if self.lastState['pc'][0] == self.state['pc'][0] and self.engine["run"] == True:
-                logging.warning(debugHelper(inspect.currentframe()) + "Program Counter has not incremented\n" + str(line))
+            self._executeDecoded(line)
 
-            self._displayRuntime()
-            self.lastState, self.state = self.userPostCycle(self.state)
+            if self.lastState['pc'][0] == self.state['pc'][0] and self.engine["run"] == True:
+                logging.warning(debugHelper(inspect.currentframe()) + "Program Counter has not incremented\n" + str(self.engine["instructionArray"][self.state["pc"][0]]))
+
+            displayed = False
+            if displayTicks != 0:
+                displayCountdown -= 1
+                if displayCountdown == 0:
+                    displayCountdown = displayTicks
+                    if displaySeconds == None:
+                        self._displayRuntime()
+                        displayed = True
+                    elif time.monotonic() >= displayNext:
+                        self._displayRuntime()
+                        displayed = True
+                        displayNext = time.monotonic() + displaySeconds
+            if loopHash != None and self.userPostCycle == self._postCycleUserDefault: #everything written is about to be committed
+                for key, registers in self.state.through.items(): #already in self.lastState, see 'def RegisterFileVersioned.writeThrough'
+                    for index, (old, value) in registers.items():
+                        loopHash ^= hash((key, index, old)) ^ hash((key, index, value))
+                for key, registers in self.state.written().items():
+                    bank = self.lastState[key]
+                    for index, value in registers.items():
+                        loopHash ^= hash((key, index, bank[index])) ^ hash((key, index, value))
+            committed : dict[str, dict[str or int, int]] = self._postCycle()
+            if tracer != None:
+                tracer.record(self.engine["tick"], pc, line.lineNum, committed)
+            if tickHooks:
+                for hook in tickHooks:
+                    hook(self, self.engine["tick"], pc, committed)
+            if pcCounts != None and self.state["pc"][0] <= pc and self.engine["run"] == True:
+                jump : tuple[int, int] = (pc, self.state["pc"][0])
+                backwardJumps[jump] = backwardJumps.get(jump, 0) + 1
+            if checkpointInterval != None:
+                self._journal[self.engine["tick"]] = (committed, {key : dict(registers) for key, registers in self.state.written().items()})
+            self.engine["tick"] += line.ticks - 1
             self._postEngineTick()
 
+            if loopHash != None:
+                if self.userPostCycle != self._postCycleUserDefault:
+                    loopHash = self._stateHash()
+                stateHash : int = loopHash
+                for key, registers in self.state.written().items(): #registers written but not committed yet (IE: flag resets) are part of the state
+                    bank = self.lastState[key]
+                    for index, value in registers.items():
+                        stateHash ^= hash((key, index, bank[index])) ^ hash((key, index, value))
+
+                if stateHash == loopSaved[0] and self.state.materialize() == loopSaved[2]:
+                    self.engine["loop"] = {"start" : loopSaved[1], "period" : self.engine["tick"] - loopSaved[1]}
+                    self.engine["run"] = False
+                    logging.warning(debugHelper(inspect.currentframe()) + "Infinite loop found, the state at tick " + str(self.engine["tick"]) + " repeats every " + str(self.engine["loop"]["period"]) + " ticks")
+                elif self.engine["tick"] - loopSaved[1] >= loopPower:
+                    loopSaved = (stateHash, self.engine["tick"], self.state.materialize())
+                    loopPower *= 2
+
+            if barrier != None:
+                barrierCountdown -= 1
+                if barrierCountdown == 0:
+                    barrierCountdown = barrierTicks
+                    barrier.wait()
+
+            if yieldEvery != None:
+                yieldCountdown -= 1
+                if yieldCountdown == 0:
+                    yieldCountdown = yieldEvery
+                    yield self.engine["tick"]
+
+        if tracer != None:
+            tracer.end()
+        if pcCounts != None:
+            self.stats["profileTable"] = self.profileTable()
+        if not displayed: #shows the final state of a throttled display
+            self._displayRuntime()
         self._displayPostRun()
+        for hook in self._hooks["halt"]:
+            hook(self, self.engine["tick"], self.engine["halted"])
+
+    def profile(self) -> dict:
+        """Returns the counts of the last profiled run (see 'def configSetProfiler'), sorted from most to least executed
+
+        "pc"        : {pc : ticks}
+        "line"      : {source code line number : ticks}
+        "mnemonic"  : {instruction : times executed}, every instruction of a VLIW line, or nested instruction, is counted
+        "loops"     : [{"from" : pc, "to" : pc, "lines" : (first line, last line), "taken" : times the backward jump was taken, "ticks" : ticks spent on the lines inside the loop}]
+        pcs without a line in self.engine["decodedArray"] (IE: words fetched from an image, see 'RiscV.loadImage') are only counted in "pc" and "loops", their loop lines are None
+        """
+        if "profile" not in self.stats.keys():
+            raise Exception("Nothing profiled, see configSetProfiler()")
+
+        decodedArray : list[CPUsim._decodedLine] = self.engine["decodedArray"]
+        pcCounts : list[int] = self.stats["profile"]["pc"]
+        sort = lambda counts : dict(sorted(counts.items(), key = lambda item : item[1], reverse = True))
+
+        byPc : dict[int, int] = {pc : count for pc, count in enumerate(pcCounts) if count != 0}
+        byLine : dict[int, int] = {}
+        byMnemonic : dict[str, int] = {}
+        for pc, count in byPc.items():
+            if decodedArray[pc] is None:
+                continue
+            byLine[decodedArray[pc].lineNum] = byLine.get(decodedArray[pc].lineNum, 0) + count
+            for mnemonic in self._mnemonics(self.engine["instructionArray"][pc]):
+                byMnemonic[mnemonic] = byMnemonic.get(mnemonic, 0) + count
+
+        lineNum = lambda pc : decodedArray[pc].lineNum if decodedArray[pc] is not None else None
+        loops : list[dict] = []
+        for (source, destination), taken in self.stats["profile"]["backwardJumps"].items():
+            loops.append({
+                "from"  : source,
+                "to"    : destination,
+                "lines" : (lineNum(destination), lineNum(source)),
+                "taken" : taken,
+                "ticks" : sum(pcCounts[destination : source + 1])
+            })
+        loops.sort(key = lambda loop : loop["ticks"], reverse = True)
+
+        return {"pc" : sort(byPc), "line" : sort(byLine), "mnemonic" : sort(byMnemonic), "loops" : loops}
+
+    def profileTable(self, top : int = 20) -> str:
+        """Returns 'def profile' as a text table of the top most executed source code lines, instructions, and loops"""
+        assert type(top) is int
+        assert top >= 1
+
+        profile : dict = self.profile()
+        sourceLines : list[str] = self.engine["sourceCode"].split("\n")
+        ticks : int = max(sum(profile["pc"].values()), 1)
+        percent = lambda count : (str(round(100 * count / ticks, 1)) + "%").rjust(8)
+
+        table : str = "Profile, " + str(ticks) + " ticks\n"
+        table += "    " + "ticks".rjust(12) + "%".rjust(8) + "    " + "line".ljust(8) + "source\n"
+        for line, count in list(profile["line"].items())[:top]:
+            table += "    " + str(count).rjust(12) + percent(count) + "    " + str(line).ljust(8) + sourceLines[line].strip() + "\n"
+
+        table += "    " + "executed".rjust(12) + "%".rjust(8) + "    instruction\n"
+        for mnemonic, count in list(profile["mnemonic"].items())[:top]:
+            table += "    " + str(count).rjust(12) + percent(count) + "    " + str(mnemonic) + "\n"
+
+        if len(profile["loops"]) != 0:
+            table += "    " + "ticks".rjust(12) + "%".rjust(8) + "    " + "taken".rjust(12) + "    loop\n"
+            for loop in profile["loops"][:top]:
+                table += "    " + str(loop["ticks"]).rjust(12) + percent(loop["ticks"]) + "    " + str(loop["taken"]).rjust(12) + "    " + self._loopName(loop) + "\n"
+
+        return table
+
+    @staticmethod
+    def _loopName(loop : dict) -> str:
+        """Takes in a loop of 'def profile', returns "lines first-last", or "pcs first-last" when it's lines aren't known"""
+        if loop["lines"][0] == None or loop["lines"][1] == None:
+            return "pcs " + str(loop["to"]) + "-" + str(loop["from"])
+        return "lines " + str(loop["lines"][0]) + "-" + str(loop["lines"][1])
+
+    def profileCollapsed(self) -> str:
+        """Returns 'def profile' in the collapsed stack format used by flamegraph tools, one "frame;frame;frame ticks" line per source code line
+
+        The frames of a line are the loops it's inside (outermost first), then the line itself (or "pc N" for pcs without a decoded line). EX: "loop lines 0-6;loop lines 2-5;line 3 add(r[0], r[0], 1) 1024"
+        """
+        profile : dict = self.profile()
+        sourceLines : list[str] = self.engine["sourceCode"].split("\n")
+        loops : list[dict] = sorted(profile["loops"], key = lambda loop : loop["from"] - loop["to"], reverse = True)
+        frame = lambda text : text.replace(";", ",").strip()
+
+        collapsed : str = ""
+        for pc, count in sorted(profile["pc"].items()):
+            stack : list[str] = ["loop " + self._loopName(loop) for loop in loops if loop["to"] <= pc <= loop["from"]]
+            stack = list(dict.fromkeys(stack)) #two jumps can span the same lines
+            if self.engine["decodedArray"][pc] is None:
+                stack.append("pc " + str(pc))
+            else:
+                lineNum : int = self.engine["decodedArray"][pc].lineNum
+                stack.append(frame("line " + str(lineNum) + " " + sourceLines[lineNum].strip()))
+            collapsed += ";".join(stack) + " " + str(count) + "\n"
+        return collapsed
+
+    def _mnemonics(self, tree : "Node") -> list[str]:
+        """Takes in an instruction Node, returns the name of every instruction in it, in the order they are executed"""
+        names : list[str] = []
+        for child in tree.child:
+            names += self._mnemonics(child)
+        if type(tree.token) is str and tree.token in self._instructionSet.keys():
+            names.append(tree.token)
+        return names
+
+    def _stateHash(self) -> int:
+        """Returns a hash of the committed registers, IE: self.lastState. Is the XOR of every (key, index, value), so it can be updated one register at a time. See 'def configSetLoopDetection'"""
+        stateHash : int = 0
+        for key, bank in self.lastState.items():
+            for index, value in bank.items():
+                stateHash ^= hash((key, index, value))
+        return stateHash
+
+    def _checkpoint(self):
+        """Takes a snapshot at the start of the current tick, forgets the oldest snapshot (and it's journal) if there are more than the limit. See 'def configSetCheckpoints'"""
+        self._checkpoints[self.engine["tick"]] = self.snapshot()
+
+        if self._checkpointLimit != None and len(self._checkpoints) > self._checkpointLimit:
+            del self._checkpoints[next(iter(self._checkpoints))]
+            oldest : int = next(iter(self._checkpoints))
+            for tick in [tick for tick in self._journal.keys() if tick < oldest]:
+                del self._journal[tick]
+
+    def rewind(self, tick : int):
+        """Takes in an earlier tick of the current run, puts the registers back to how they were at the start of that tick. Continue running with run(resume = True)
+
+        Restores the nearest snapshot at or before tick, then replays the journal up to tick. Costs O(memory size) + O(ticks since the snapshot). See 'def configSetCheckpoints'
+        Forgets everything after tick
+        """
+        assert type(tick) is int
+        assert tick >= 0
+
+        if self._checkpointInterval == None:
+            raise Exception("Checkpoints are off, see configSetCheckpoints()")
+        checkpoint : int = tick - tick % self._checkpointInterval
+        if tick > self.engine["tick"] or checkpoint not in self._checkpoints.keys():
+            raise Exception("Tick " + str(tick) + " can't be rewound to, the oldest kept tick is " + str(next(iter(self._checkpoints), None)) + ", the current tick is " + str(self.engine["tick"]))
+
+        self.restore(self._checkpoints[checkpoint])
+        for t in range(checkpoint, tick):
+            committed, written = self._journal[t]
+            for key, registers in committed.items():
+                bank = self.lastState[key]
+                for index, value in registers.items():
+                    bank[index] = value
+        if tick != checkpoint:
+            for key in self.lastState.keys():
+                self.state[key].delta = dict(written.get(key, {}))
+        self.engine["run"] = True
+        self.engine["tick"] = tick
+
+        for t in [t for t in self._checkpoints.keys() if t > tick]:
+            del self._checkpoints[t]
+        for t in [t for t in self._journal.keys() if t >= tick]:
+            del self._journal[t]
+
+    _sweepWorker : tuple["CPUsim", dict] = None #the loaded CPU of a 'def sweep' worker process, and it's snapshot right after loading
+
+    @staticmethod
+    def sweep(setup : Callable[[], "CPUsim"], code : str, injections : "Iterable[dict[str, dict[str or int, int]]]", extract : list[tuple[str, str or int]], 
+            cycleLimit : int = 1024, maxWorkers : int = None, chunkSize : int = 64) -> "Iterator[dict[str, dict[str or int, int]]]":
+        """Runs one program over many inputs in a process pool. Yields the extracted registers for every injection, in the same order as injections
+
+        setup is a picklable callable (IE: a module level function, or functools.partial of one) that returns a configured CPUsim.
+            It is called once per worker process, and code is parsed and loaded once per worker. Workers don't display anything
+        injections is an iterable of {'key' : {index : value}} to inject before each run, it is consumed lazily (so it can be very large)
+        extract is a list of (key, index) register pairs to read after each run
+        yields {'key' : {index : value}}
+
+        EX: CPUsim.sweep(functools.partial(CPUsim, 16), code, ({'r' : {0 : a, 1 : b}} for a in range(256) for b in range(256)), [('r', 3)])
+        """
+        assert callable(setup)
+        assert type(code) is str
+        assert type(extract) is list
+        assert all([type(i) is tuple and len(i) == 2 for i in extract])
+        assert type(cycleLimit) is int and cycleLimit >= 0
+        assert maxWorkers is None or (type(maxWorkers) is int and maxWorkers >= 1)
+        assert type(chunkSize) is int and chunkSize >= 1
+
+        workers : int = maxWorkers if maxWorkers is not None else (os.cpu_count() or 1)
+        iterator = iter(injections)
+
+        with concurrent.futures.ProcessPoolExecutor(workers, initializer = CPUsim._sweepWorkerInit, initargs = (setup, code)) as executor:
+            pending : collections.deque[concurrent.futures.Future] = collections.deque()
+
+            def submit() -> bool:
+                chunk : list[dict] = list(itertools.islice(iterator, chunkSize))
+                if len(chunk) == 0:
+                    return False
+                pending.append(executor.submit(CPUsim._sweepWorkerRun, chunk, extract, cycleLimit))
+                return True
+
+            #keeps a limited number of chunks in flight, so injections are consumed as results are yielded
+            for _ in range(workers * 2):
+                if not submit():
+                    break
+
+            while len(pending) != 0:
+                results : list[dict] = pending.popleft().result()
+                submit()
+                yield from results
+
+    @staticmethod
+    def _sweepWorkerInit(setup : Callable[[], "CPUsim"], code : str):
+        """Runs once in every 'def sweep' worker process, configures and loads the CPU"""
+        CPU : CPUsim = setup()
+        CPU.configSetDisplay(CPU.DisplaySilent())
+        CPU.linkAndLoad(code)
+        CPUsim._sweepWorker = (CPU, CPU.snapshot())
+
+    @staticmethod
+    def _sweepWorkerRun(injections : list[dict[str, dict[str or int, int]]], extract : list[tuple[str, str or int]], cycleLimit : int) -> list[dict[str, dict[str or int, int]]]:
+        """Runs in a 'def sweep' worker process, runs the loaded program once for every injection. Returns the extracted registers"""
+        CPU, loaded = CPUsim._sweepWorker
+
+        results : list[dict] = []
+        for injection in injections:
+            CPU.restore(loaded)
+            for key, registers in injection.items():
+                for index, value in registers.items():
+                    CPU.inject(key, index, value)
+            CPU.run(cycleLimit)
+
+            result : dict[str, dict[str or int, int]] = {}
+            for key, index in extract:
+                result.setdefault(key, {})[index] = CPU.extract(key, index)
+            results.append(result)
+        return results
             
+    @staticmethod
+    def cluster(setup : Callable[[], "CPUsim"], code : str, injections : list[dict[str, dict[str or int, int]]], extract : list[tuple[str, str or int]],
+            cycleLimit : int = 1024, shared : str = 'm', barrierInterval : int = 1, timeout : float = None) -> list[dict[str, dict[str or int, int]]]:
+        """Runs one program on len(injections) cores, every core is a CPUsim in it's own process. Returns the extracted registers of every core, in the same order as injections
+
+        setup is a picklable callable that returns a configured CPUsim, same as 'def sweep'. Every core runs setup, loads code, then has injections[core] injected
+        Every core has it's own registers, except the shared register bank, which is one multiprocessing.shared_memory block (see 'def configSetSharedRegister')
+        The cores wait for each other every barrierInterval ticks (see 'def configSetBarrier'), a halted core keeps waiting until every core has halted. None lets the cores run freely
+        Writes to the shared register bank are seen by the other cores by the next barrier, use atomic instructions (IE: 'cas', 'fetchadd') for registers the cores race on
+        Registers are extracted once every core has halted (only once the core halts if barrierInterval is None)
+        Raises an exception if a core process dies without a result (IE: killed), or if the cores haven't all finished after timeout seconds (None waits forever). The other cores are terminated
+
+        EX: CPUsim.cluster(functools.partial(CPUsim, 16), code, [{'r' : {0 : core}} for core in range(4)], [('r', 1), ('m', 31)])
+        """
+        assert callable(setup)
+        assert type(code) is str
+        assert type(injections) is list
+        assert len(injections) >= 1
+        assert type(extract) is list
+        assert all([type(i) is tuple and len(i) == 2 for i in extract])
+        assert type(cycleLimit) is int and cycleLimit >= 0
+        assert type(barrierInterval) is type(None) or (type(barrierInterval) is int and barrierInterval >= 1)
+        assert timeout == None or timeout > 0
+
+        context = multiprocessing.get_context()
+
+        CPU : CPUsim = setup()
+        CPU.configSetDisplay(CPU.DisplaySilent())
+        CPU.linkAndLoad(code)
+        lock = context.Lock()
+        name : str = CPU.configSetSharedRegister(shared, lock = lock)
+
+        running = context.Value('i', len(injections)) #cores that haven't halted
+        halted = context.Value('b', False) #if every core had halted when the last barrier was passed
+        barrier = context.Barrier(len(injections), functools.partial(CPUsim._clusterBarrier, running, halted)) if barrierInterval != None else None
+        results = context.Queue()
+        processes : list[multiprocessing.Process] = [
+            context.Process(target = CPUsim._clusterWorker, args = (setup, code, shared, name, lock, barrier, barrierInterval, running, halted, core, injection, extract, cycleLimit, results), daemon = True)
+            for core, injection in enumerate(injections)
+        ]
+
+        gathered : dict[int, dict or Exception] = {}
+        try:
+            for process in processes:
+                process.start()
+            deadline : float = time.monotonic() + timeout if timeout != None else None
+            while len(gathered) != len(processes):
+                try:
+                    core, result = results.get(timeout = 1)
+                    gathered[core] = result
+                    continue
+                except queue.Empty:
+                    pass
+                dead : list[int] = [core for core, process in enumerate(processes) if core not in gathered and process.exitcode != None]
+                if len(dead) != 0:
+                    try: #the core may have put it's result just before exiting
+                        core, result = results.get(timeout = 1)
+                        gathered[core] = result
+                        continue
+                    except queue.Empty:
+                        raise Exception("Core " + str(dead[0]) + " exited with exit code " + str(processes[dead[0]].exitcode) + " without a result")
+                if deadline != None and time.monotonic() >= deadline:
+                    raise TimeoutError("Cores " + str([core for core in range(len(processes)) if core not in gathered]) + " didn't finish within " + str(timeout) + " seconds")
+            for process in processes:
+                process.join()
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            CPU.lastState[shared].close(unlink = True)
+
+        for core in range(len(injections)):
+            if isinstance(gathered[core], Exception):
+                raise Exception("Core " + str(core) + " failed") from gathered[core]
+        return [gathered[core] for core in range(len(injections))]
+
+    @staticmethod
+    def _clusterBarrier(running, halted):
+        """Runs once every time every 'def cluster' core reaches the barrier, before any are let through. Sets halted, so every core sees the same value until the next barrier"""
+        halted.value = running.value == 0
+
+    @staticmethod
+    def _clusterWorker(setup : Callable[[], "CPUsim"], code : str, shared : str, name : str, lock, barrier, barrierInterval : int, running, halted, core : int,
+            injection : dict[str, dict[str or int, int]], extract : list[tuple[str, str or int]], cycleLimit : int, results):
+        """Runs in a 'def cluster' core process. Puts (core, the extracted registers) into results, or (core, the raised exception)"""
+        try:
+            CPU : CPUsim = setup()
+            CPU.configSetDisplay(CPU.DisplaySilent())
+            CPU.linkAndLoad(code)
+            CPU.configSetSharedRegister(shared, name, lock) #after loading, so the program image doesn't overwrite the other cores' writes
+            CPU.configSetBarrier(barrier, barrierInterval if barrierInterval != None else 1)
+            for key, registers in injection.items():
+                for index, value in registers.items():
+                    CPU.inject(key, index, value)
+            CPU.run(cycleLimit)
+
+            with running.get_lock():
+                running.value -= 1
+            if barrier != None: #keeps the cores still running in lockstep, until the last core halts
+                barrier.wait()
+                while not halted.value:
+                    barrier.wait()
+
+            result : dict[str, dict[str or int, int]] = {}
+            for key, index in extract:
+                result.setdefault(key, {})[index] = CPU.extract(key, index)
+            CPU.lastState[shared].close()
+            results.put((core, result))
+        except Exception as exception:
+            if barrier != None:
+                barrier.abort() #the other cores would wait forever
+            results.put((core, exception))
+
     class _registerObject: #TODO this is a short cut
         def __init__(self, key, index):
             self.key : str = key
             self.index : str or int = index
 
-    def _evaluateNested(self, tree : "Node") -> tuple["Object"]:
-        #logging.info(debugHelper(inspect.currentframe()) + "Recurse\n" + str(tree))
+    class _decodedLine: #TODO this is a short cut
+        """An instruction line lowered once by 'def linkAndLoad', executed by 'def _executeDecoded'
+
+        immediates are the 'imm' indexes (IE: constant pool entries, see 'def linkAndLoad') the line reads, labels are already resolved to memory indexes
+        instructions are (operation, arguments) pairs, where arguments are already resolved (key, index) register tuples
+        ticks is how many ticks the line counts as, more than 1 for lines fused by 'def _peephole'
+        fused is the pc of every line a fused line replaces, one per tick (IE: for 'def profile'), None for lines that aren't fused
+        """
+        __slots__ = ("lineNum", "immediates", "instructions", "ticks", "fused")
+
+        def __init__(self, lineNum : int, immediates : tuple[int], instructions : tuple[tuple[Callable, tuple]], ticks : int = 1, fused : tuple[int] = None):
+            assert fused == None or len(fused) == ticks
+
+            self.lineNum : int = lineNum
+            self.immediates : tuple[int] = immediates
+            self.instructions : tuple[tuple[Callable, tuple]] = instructions
+            self.ticks : int = ticks
+            self.fused : tuple[int] = fused
+
+    def _peephole(self, decodedArray : list["CPUsim._decodedLine" or None]) -> list["CPUsim._decodedLine" or None]:
+        """Takes in a decoded program (see 'def linkAndLoad'), returns a copy where:
+            a line that is only an unconditional jump, to a line that is only an unconditional jump, jumps straight to the end of the chain
+            a line that is only an unconditional jump to the next line becomes a skip (see 'def _opSkip')
+            two consecutive single instruction lines the instruction set has a superinstruction for, become that superinstruction
+        Uses the optional unconditionalJump and superinstructions of the instruction set, see 'def configSetInstructionSet'
+
+        Every rewritten line counts the ticks of the lines it replaces. Lines are rewritten in place, so a jump to the second line of a fused pair still runs the original line
+        'def run' falls back to the original line when a rewritten line's ticks would go past cycleLimit
+        Labels and immediate values are already resolved to the constant pool by 'def linkAndLoad'
+        """
+        jump : str = getattr(self.userInstructionSet, "unconditionalJump", None)
+        superinstructions : dict[tuple[str, str], Callable[[tuple, tuple], tuple[Callable, tuple]]] = getattr(self.userInstructionSet, "superinstructions", {})
+
+        def single(pc : int) -> tuple[str, tuple]:
+            """Returns (operation name, arguments) if line pc is a single instruction, None otherwise"""
+            if not (0 <= pc < len(decodedArray)) or decodedArray[pc] is None or len(decodedArray[pc].instructions) != 1:
+                return None
+            names : list[str] = self._mnemonics(self.engine["instructionArray"][pc])
+            if len(names) != 1:
+                return None
+            return (names[0], decodedArray[pc].instructions[0][1])
+
+        optimized : list[CPUsim._decodedLine or None] = list(decodedArray)
+        for pc, line in enumerate(decodedArray):
+            first : tuple[str, tuple] = single(pc)
+            if first == None:
+                continue
+            name, arguments = first
+
+            if name == jump and arguments[0][0] == "imm":
+                pointer : tuple[str, int] = arguments[0]
+                chain : list[int] = [pc]
+                while True:
+                    target : int = self.lastState["imm"][pointer[1]]
+                    following : tuple[str, tuple] = single(target)
+                    if target in chain or following == None or following[0] != jump or following[1][0][0] != "imm":
+                        break
+                    chain.append(target)
+                    pointer = following[1][0]
+                ticks : int = len(chain)
+
+                if target == pc + 1:
+                    optimized[pc] = self._decodedLine(line.lineNum, (), ((self._opSkip, ()),), ticks, tuple(chain))
+                elif ticks > 1:
+                    optimized[pc] = self._decodedLine(line.lineNum, (pointer[1],), ((line.instructions[0][0], (pointer,)),), ticks, tuple(chain))
+                continue
+
+            second : tuple[str, tuple] = single(pc + 1)
+            if second != None and (name, second[0]) in superinstructions.keys():
+                fused : tuple[Callable, tuple] = superinstructions[(name, second[0])](arguments, second[1])
+                if fused != None:
+                    optimized[pc] = self._decodedLine(line.lineNum, line.immediates + decodedArray[pc + 1].immediates, (fused,), 2, (pc, pc + 1))
+
+        return optimized
+
+    @staticmethod
+    def _opSkip(oldState, newState, config, engine):
+        """An unconditional jump to the next line, see 'def _peephole'"""
+        newState['pc'][0] = oldState['pc'][0] + 1
+
+    def _executeDecoded(self, line : "CPUsim._decodedLine"):
+        """Takes in a decoded line, runs each of it's instructions. Immediate values are already in the 'imm' registers
+
+        Note: instructions are handed read only views of self.lastState and self.config (not copies), adding or replacing a register bank or config raises TypeError. Writes go to self.state
+        The register banks and configs inside are the live ones, and must only be read from. IE: oldState['r'][0] = 1 isn't caught
+        """
+        oldState : types.MappingProxyType = types.MappingProxyType(self.lastState)
+        config : types.MappingProxyType = types.MappingProxyType(self.config)
+        for operation, arguments in line.instructions:
+            operation(oldState, self.state, config, self.engine, *arguments)
+
+    def _decodeNested(self, tree : "Node", constants : dict[int, int], immediates : list[int], instructions : list[tuple[Callable, tuple]]) -> tuple["Object"]:
+        """Takes in an instruction Node, recursivly lowers it. Adds found immediate values to the constants pool {value : 'imm' index}, appends their 'imm' index to immediates, and found (operation, arguments) pairs to instructions
+
+        immediates and instructions are appended in the same order the instructions would be evaluated in, IE: nested instructions come before the instruction containing them
+        """
 
         if tree.token in self._instructionSet.keys():
             '''case 1
             tree is an intruction
-                recursivly call _evaluateNested on children if there is any -> arguments
+                recursivly call _decodeNested on children if there is any -> arguments
                 process arguments
-                run instruction on arguments
+                bind instruction to arguments
             '''
 
-            #logging.info(debugHelper(inspect.currentframe()) + "case 1 instruction")
-
             #evaluates children to get arguments
             arguments = []
             if len(tree.child) != 0:
                 for i in tree.child:
-                    temp = self._evaluateNested(i)
+                    temp = self._decodeNested(i, constants, immediates, instructions)
                     
                     if type(temp) is tuple: #incase child is container, unpacks container
                         for j in temp:
                             arguments.append(j)
                     else:
                         arguments.append(temp)
-            #logging.info(debugHelper(inspect.currentframe()) + "instruction raw input: " + str(arguments))
 
-            #unpacks register objects
+            #unpacks register objects, assigns immediate values to 'imm' registers
             newArguments = []
             for i in arguments:
                 if type(i) is self._registerObject:
                     newArguments.append((i.key, i.index))
+                elif type(i) is int:
+                    newArguments.append(("imm", self._constant(i, constants, immediates)))
                 else:
                     newArguments.append(i)
-            arguments = newArguments
-            #logging.info(debugHelper(inspect.currentframe()) + "instruction arguments: " + str(arguments))
-
-            #adds immediate values to self.state
-            newArguments = []
-            for i in range(len(arguments)):
-                if type(arguments[i]) is int: #TODO this case 'should' no longer be possible, but is somehow still active
-                    #self.lastState["imm"].append(arguments[i])
-                    self.lastState["imm"][len(self.lastState["imm"])] = arguments[i] #the created 'index' of the key/index pair will always be an int == length, int + 1 == previous index
-
-                    newArguments.append(("imm", len(self.lastState["imm"]) - 1))
-                    
-                elif type(arguments[i]) is self._registerObject:
-                    newArguments.append((arguments[i].key, arguments[i].index))
-                else:
-                    newArguments.append(arguments[i])
 
-            #logging.info(debugHelper(inspect.currentframe()) + "instruction immidiate processing: " + str(newArguments))
-
-            instruction : Callable[[dict, dict, dict, dict, Any], None] = self._instructionSet[tree.token]
-            instruction = functools.partial(instruction, copy.deepcopy(self.lastState), self.state, copy.deepcopy(self.config), self.engine)
-
-            for i in newArguments:
-                instruction = functools.partial(instruction, i)
-
-            #logging.info(debugHelper(inspect.currentframe()) + "instruction function?: " + str(instruction))
-            
-            instruction()
+            instructions.append((self._instructionSet[tree.token], tuple(newArguments)))
 
         elif len(tree.child) == 0:
             '''Case 2
@@ -1168,35 +2395,27 @@ class CPUsim:
                 if tree is a label, convert into a register object
                 return object
             '''
-            #logging.info(debugHelper(inspect.currentframe()) + "case 2 empty")
             result = None
             if tree.token in self.engine["labels"]:
-                #self.lastState["imm"].append(self.engine["labels"][tree.token])
-                self.lastState["imm"][len(self.lastState["imm"])] = self.engine["labels"][tree.token] #the created 'index' of the key/index pair will always be an int == length, int + 1 == previous index
-                
-                result = self._registerObject("imm", len(self.lastState["imm"]) - 1)
+                result = self._registerObject("imm", self._constant(self.engine["labels"][tree.token], constants, immediates))
             else:
                 result = tree.token                
             return result
 
         elif tree.type == "container": #TODO this should not rely on the parser properly labeling Nodes
             '''Case 3
-            tree is a container _evaluateNested on children
+            tree is a container _decodeNested on children
                 if there is only one child, 'pass through' results
                 else, return a tuple of results
             '''
-
-            #logging.info(debugHelper(inspect.currentframe()) + "case 3 container")
             stack = []
             for i in tree.child:
-                stack.append(self._evaluateNested(i))
+                stack.append(self._decodeNested(i, constants, immediates, instructions))
 
             if len(stack) == 1:
                 return stack[0]
             else:
                 return tuple(stack)
-            
-            #return tuple(stack)
 
         elif tree.token in self.state.keys():
             '''Case 4
@@ -1205,26 +2424,27 @@ class CPUsim:
                 assumes child is index
             returns register object
             '''
-
-            #logging.info(debugHelper(inspect.currentframe()) + "case 4 register")
-            return self._registerObject(tree.token, self._evaluateNested(tree.child[0]))
+            return self._registerObject(tree.token, self._decodeNested(tree.child[0], constants, immediates, instructions))
 
         else:
             '''Case X
             similar to the container case, mainly just 'passes through' the result of a recursive call on children
             '''
-
-            #logging.info(debugHelper(inspect.currentframe()) + "case x else")
-            #logging.info(debugHelper(inspect.currentframe()) + "tree = \n" + str(tree))
             stack = []
             for i in tree.child:
-                stack.append(self._evaluateNested(i))
+                stack.append(self._decodeNested(i, constants, immediates, instructions))
             
             if len(stack) == 1:
                 return stack[0]
             else:
                 return tuple(stack)
 
+    def _constant(self, value : int, constants : dict[int, int], immediates : list[int]) -> int:
+        """Takes in an immediate value, returns it's 'imm' index in the constants pool {value : 'imm' index}, adding it if needed. Appends the index to immediates"""
+        index : int = constants.setdefault(value, len(constants))
+        immediates.append(index)
+        return index
+
     def _postEngineTick(self):
         """Prototype
         runs at the end of each execution cycle, meant to handle engine level stuff. Should also run checks to verify the integrity of self.state"""
@@ -1239,7 +2459,574 @@ class CPUsim:
 
         #for i in self.state.keys():
         #    assert all([type(j) is int for j in self.state[i]])
-        
+
+    class RegisterFileVersioned(MutableMapping):
+        """A register file that looks like the state dictionary (IE: state['key']['index'] = int(value)), but is a copy-on-write overlay on top of a base state dictionary
+
+        Reads fall through to the base, writes go to a delta layer (one per register bank) that is only copied into the base on commit().
+        Used as self.state, with self.lastState as the base. Committing costs O(registers written), instead of O(memory size) for a deepcopy of the whole state
+        hardwired is {'key' : {index, ...}} of registers that writes are dropped for, see 'def setHardwired'
+        through is {'key' : {index : (old value, value)}} of the registers written straight into the base since the last commit, see 'def writeThrough'
+        """
+
+        def __init__(self, base : dict[str, dict[str or int, int]], hardwired : dict[str, set[str or int]] = None):
+            assert type(base) is dict
+            assert type(hardwired) is type(None) or type(hardwired) is dict
+
+            self.base : dict[str, dict[str or int, int]] = base
+            self.hardwired : dict[str, set[str or int]] = hardwired if hardwired != None else {}
+            self.through : dict[str, dict[str or int, tuple[int, int]]] = {}
+            self._banks : dict[str, CPUsim._RegisterBankOverlay] = {}
+
+        def __getitem__(self, key : str) -> "CPUsim._RegisterBankOverlay":
+            bank = self._banks.get(key)
+            if bank is None or bank.base is not self.base[key]: #creates bank overlays as needed, base banks can be added after the overlay is created
+                if key in self.hardwired:
+                    bank = CPUsim._RegisterBankOverlayHardwired(self.base[key], self.hardwired[key])
+                else:
+                    bank = CPUsim._RegisterBankOverlay(self.base[key])
+                self._banks[key] = bank
+            return bank
+
+        def __setitem__(self, key : str, bank : dict[str or int, int]):
+            self.base[key] = bank
+            self._banks.pop(key, None)
+
+        def __delitem__(self, key : str):
+            del self.base[key]
+            self._banks.pop(key, None)
+
+        def __iter__(self):
+            return iter(self.base)
+
+        def __len__(self) -> int:
+            return len(self.base)
+
+        def __contains__(self, key : str) -> bool:
+            return key in self.base
+
+        def setHardwired(self, key : str, index : str or int, hardwired : bool):
+            """Takes in a register, and whether writes to it are dropped (IE: RiscV x0). Any uncommitted write to it is dropped too
+
+            Only the overlays of banks with hardwired registers check writes (see 'class _RegisterBankOverlayHardwired'), other banks cost nothing extra
+            """
+            indexes : set[str or int] = self.hardwired.get(key, set()) - {index}
+            if hardwired:
+                indexes.add(index)
+
+            delta : dict[str or int, int] = self._banks.pop(key).delta if key in self._banks else {}
+            if len(indexes) != 0:
+                self.hardwired[key] = indexes
+            else:
+                self.hardwired.pop(key, None)
+            if key in self.base:
+                self[key].delta = {i : value for i, value in delta.items() if i not in indexes}
+
+        def writeThrough(self, key : str, index : str or int, value : int):
+            """Writes a register straight into the base (IE: a shared register bank, that other CPUs must see at once, see 'def InstructionSetDefault._atomicUpdate'), unless it's hardwired
+
+            The write is still returned by 'def commit' and 'def written', so it's traced and journaled like any other write. The caller holds any lock the base bank needs
+            """
+            if index in self.hardwired.get(key, ()):
+                return
+            bank = self.base[key]
+            registers : dict[str or int, tuple[int, int]] = self.through.setdefault(key, {})
+            registers[index] = (registers[index][0] if index in registers else bank[index], value)
+            bank[index] = value
+
+        def commit(self) -> dict[str, dict[str or int, int]]:
+            """Copies every register written since the last commit into the base. Returns the committed writes, IE: {'key' : {index : value}}"""
+            committed : dict[str, dict[str or int, int]] = self._throughValues()
+            for key, bank in self._banks.items():
+                if len(bank.delta) != 0:
+                    bank.base.update(bank.delta)
+                    if key in committed:
+                        committed[key].update(bank.delta)
+                    else:
+                        committed[key] = bank.delta
+                    bank.delta = {}
+            self.through = {}
+            return committed
+
+        def written(self) -> dict[str, dict[str or int, int]]:
+            """Returns the registers written since the last commit, IE: {'key' : {index : value}}. Costs O(register banks), not O(memory size)"""
+            if len(self.through) != 0:
+                written : dict[str, dict[str or int, int]] = self._throughValues()
+                for key, bank in self._banks.items():
+                    if len(bank.delta) != 0:
+                        written[key] = {**written.get(key, {}), **bank.delta}
+                return written
+            return {key : bank.delta for key, bank in self._banks.items() if len(bank.delta) != 0}
+
+        def _throughValues(self) -> dict[str, dict[str or int, int]]:
+            """Returns the registers of 'def writeThrough' as {'key' : {index : value}}"""
+            return {key : {index : value for index, (old, value) in registers.items()} for key, registers in self.through.items()}
+
+        def materialize(self) -> dict[str, dict[str or int, int]]:
+            """Returns a plain state dictionary copy of this register file (base with writes applied). Costs O(memory size)"""
+            return {key : {**self.base[key], **self[key].delta} for key in self.base.keys()}
+
+        def snapshot(self) -> dict[str, dict]:
+            """Returns a copy of the base register banks and the uncommitted writes, see 'def restore'"""
+            return {
+                "base"  : {key : (bank.copy() if type(bank) is CPUsim.RegisterBankArray else dict(bank)) for key, bank in self.base.items()},
+                "delta" : {key : dict(bank.delta) for key, bank in self._banks.items() if len(bank.delta) != 0}
+            }
+
+        def restore(self, snapshot : dict[str, dict]):
+            """Takes in a snapshot returned by 'def snapshot', copies it's values into the existing base register banks, replaces any uncommitted writes"""
+            for key, bank in snapshot["base"].items():
+                if key not in self.base.keys():
+                    continue
+                if type(self.base[key]) is CPUsim.RegisterBankArray and type(bank) is CPUsim.RegisterBankArray:
+                    self.base[key].loadFrom(bank)
+                else:
+                    if type(self.base[key]) is dict:
+                        self.base[key].clear()
+                    self.base[key].update(bank)
+
+            self.through = {}
+            for key in self.base.keys():
+                self[key].delta = dict(snapshot["delta"].get(key, {}))
+
+    class _RegisterBankOverlay(MutableMapping):
+        """A single register bank of 'class RegisterFileVersioned', IE: state['key']. Reads check the delta layer, then fall through to the base bank"""
+        __slots__ = ("base", "delta")
+
+        def __init__(self, base : dict[str or int, int]):
+            self.base : dict[str or int, int] = base
+            self.delta : dict[str or int, int] = {}
+
+        def __getitem__(self, index : str or int) -> int:
+            if index in self.delta:
+                return self.delta[index]
+            return self.base[index]
+
+        def __setitem__(self, index : str or int, value : int):
+            self.delta[index] = value
+
+        def __delitem__(self, index : str or int):
+            raise Exception("Registers can not be removed from a register bank")
+
+        def __iter__(self):
+            yield from self.base
+            for index in self.delta:
+                if index not in self.base:
+                    yield index
+
+        def __len__(self) -> int:
+            return len(self.base) + sum([1 for index in self.delta if index not in self.base])
+
+        def __contains__(self, index : str or int) -> bool:
+            return index in self.delta or index in self.base
+
+    class _RegisterBankOverlayHardwired(_RegisterBankOverlay):
+        """Same as 'class _RegisterBankOverlay', but writes to the hardwired registers are dropped, see 'def RegisterFileVersioned.setHardwired'"""
+        __slots__ = ("hardwired",)
+
+        def __init__(self, base : dict[str or int, int], hardwired : set[str or int]):
+            super().__init__(base)
+            self.hardwired : set[str or int] = hardwired
+
+        def __setitem__(self, index : str or int, value : int):
+            if index not in self.hardwired:
+                self.delta[index] = value
+
+    class RegisterBankArray(MutableMapping):
+        """A compact register bank, IE: state['key'], stored as one contiguous array of values instead of a dictionary of int objects
+
+        int indexes that match their slot (IE: 0, 1, 2, ...) are used as the slot directly, any other index (IE: flag names) is mapped to a slot by name.
+        Every slot has a precomputed mask from it's bitLength, values are masked when written.
+        Values are stored in the smallest array.array typecode that fits the largest bitLength, or a list if any bitLength is over 64 bits
+
+        Note: registers are added with addRegister()/addRegisters() (see 'def configConfigRegister'), writing to a missing index raises a KeyError
+        """
+
+        _typecodes : tuple[str] = ('B', 'H', 'I', 'L', 'Q')
+
+        def __init__(self):
+            self._direct : int = 0 #slots [0, _direct) have an int index equal to their slot
+            self._named : dict[str or int, int] = {} #index -> slot, for every other index
+            self._values : array.array or list[int] = array.array('B')
+            self._masks : array.array or list[int] = array.array('B')
+            self._bitLengths : array.array = array.array('I')
+
+        def _slot(self, index : str or int) -> int:
+            if type(index) is int and 0 <= index < self._direct:
+                return index
+            return self._named[index]
+
+        def _fit(self, bitLength : int):
+            """Widens the value array (if needed) so it can store bitLength bits"""
+            if type(self._values) is list or bitLength <= self._values.itemsize * 8:
+                return
+            for typecode in self._typecodes:
+                if array.array(typecode).itemsize * 8 >= bitLength:
+                    self._values = array.array(typecode, self._values)
+                    self._masks = array.array(typecode, self._masks)
+                    return
+            self._values = list(self._values)
+            self._masks = list(self._masks)
+
+        def addRegister(self, index : str or int, bitLength : int):
+            """Adds a single register, with a value of 0"""
+            assert type(index) is int or type(index) is str
+            assert type(bitLength) is int and bitLength >= 1
+            assert index not in self
+
+            slot : int = len(self._values)
+            if type(index) is int and index == slot == self._direct:
+                self._direct += 1
+            else:
+                self._named[index] = slot
+
+            self._fit(bitLength)
+            self._values.append(0)
+            self._masks.append(2**bitLength - 1)
+            self._bitLengths.append(bitLength)
+
+        def addRegisters(self, amount : int, bitLength : int):
+            """Adds amount registers with int indexes, starting at the next slot, with a value of 0"""
+            assert type(amount) is int and amount >= 0
+            assert type(bitLength) is int and bitLength >= 1
+
+            if len(self._named) != 0:
+                for _ in range(amount):
+                    self.addRegister(len(self._values), bitLength)
+                return
+
+            self._fit(bitLength)
+            self._values.extend([0] * amount if type(self._values) is list else array.array(self._values.typecode, [0]) * amount)
+            self._masks.extend([2**bitLength - 1] * amount if type(self._masks) is list else array.array(self._masks.typecode, [2**bitLength - 1]) * amount)
+            self._bitLengths.extend(array.array('I', [bitLength]) * amount)
+            self._direct += amount
+
+        def setBitLength(self, index : str or int, bitLength : int):
+            """Changes the bitLength of a register, the stored value is cut down to fit"""
+            assert type(bitLength) is int and bitLength >= 1
+
+            slot : int = self._slot(index)
+            self._fit(bitLength)
+            self._bitLengths[slot] = bitLength
+            self._masks[slot] = 2**bitLength - 1
+            self._values[slot] = self._values[slot] & self._masks[slot]
+
+        def bitLength(self, index : str or int) -> int:
+            return self._bitLengths[self._slot(index)]
+
+        def mask(self, index : str or int) -> int:
+            return self._masks[self._slot(index)]
+
+        def __getitem__(self, index : str or int) -> int:
+            return self._values[self._slot(index)]
+
+        def __setitem__(self, index : str or int, value : int):
+            slot : int = self._slot(index)
+            self._values[slot] = value & self._masks[slot]
+
+        def __delitem__(self, index : str or int):
+            raise Exception("Registers can not be removed from a register bank")
+
+        def __iter__(self):
+            yield from range(self._direct)
+            yield from self._named
+
+        def __len__(self) -> int:
+            return self._direct + len(self._named)
+
+        def __contains__(self, index : str or int) -> bool:
+            return (type(index) is int and 0 <= index < self._direct) or index in self._named
+
+        def __repr__(self) -> str:
+            return repr(dict(self))
+
+        def copy(self) -> "CPUsim.RegisterBankArray":
+            """Returns a copy of this register bank, the arrays are copied whole"""
+            bank : CPUsim.RegisterBankArray = CPUsim.RegisterBankArray()
+            bank._direct = self._direct
+            bank._named = dict(self._named)
+            bank._values = self._values[:]
+            bank._masks = self._masks[:]
+            bank._bitLengths = self._bitLengths[:]
+            return bank
+
+        def loadFrom(self, bank : "CPUsim.RegisterBankArray"):
+            """Copies every value of another register bank into this one. If both banks have the same layout, the arrays are copied whole"""
+            assert type(bank) is CPUsim.RegisterBankArray
+
+            if self._direct == bank._direct and self._named == bank._named and type(self._values) is type(bank._values) \
+                    and (type(self._values) is list or self._values.typecode == bank._values.typecode):
+                self._values[:] = bank._values
+            else:
+                for index, value in bank.items():
+                    self[index] = value
+
+    class RegisterBankShared(RegisterBankArray):
+        """A 'class RegisterBankArray' stored in a multiprocessing.shared_memory block, so CPUs in different processes can share one register bank (IE: 'm'). See 'def configSetSharedRegister'
+
+        Writes are committed straight into the block, so the other CPUs see them on their next read. The layout (indexes, bitLengths) is fixed, registers can't be added or resized
+        lock is held by atomic instructions (IE: 'def opCAS'), every CPU sharing the block has to use the same lock
+        """
+
+        def __init__(self, bank : "CPUsim.RegisterBankArray", sharedMemory : shared_memory.SharedMemory, lock : "multiprocessing.Lock", load : bool):
+            """Takes in the register bank to share, and the shared memory block to store it in. load = True copies the register values into the block, otherwise the block's values are kept"""
+            assert type(bank._values) is array.array
+
+            super().__init__()
+            self._direct = bank._direct
+            self._named = dict(bank._named)
+            self._masks = bank._masks[:]
+            self._bitLengths = bank._bitLengths[:]
+
+            self.sharedMemory : shared_memory.SharedMemory = sharedMemory
+            self.lock = lock
+            self._view : memoryview = sharedMemory.buf[:len(bank._values) * bank._values.itemsize]
+            self._values : memoryview = self._view.cast(bank._values.typecode)
+            if load:
+                self._values[:] = bank._values
+
+        def _fit(self, bitLength : int):
+            if bitLength > self._values.itemsize * 8:
+                raise Exception("Registers of a shared register bank can't be widened")
+
+        def addRegister(self, index : str or int, bitLength : int):
+            raise Exception("Registers can't be added to a shared register bank")
+
+        def addRegisters(self, amount : int, bitLength : int):
+            raise Exception("Registers can't be added to a shared register bank")
+
+        def copy(self) -> "CPUsim.RegisterBankArray":
+            """Returns a private (not shared) copy of this register bank"""
+            bank : CPUsim.RegisterBankArray = CPUsim.RegisterBankArray()
+            bank._direct = self._direct
+            bank._named = dict(self._named)
+            bank._values = array.array(self._values.format, self._values)
+            bank._masks = self._masks[:]
+            bank._bitLengths = self._bitLengths[:]
+            return bank
+
+        def close(self, unlink : bool = False):
+            """Detaches from the shared memory block, unlink = True also frees it (only the creator should). The register bank can't be used afterwards"""
+            self._values.release()
+            self._view.release()
+            self.sharedMemory.close()
+            if unlink:
+                self.sharedMemory.unlink()
+
+    class _RegisterConfigShared(MutableMapping):
+        """The config of a 'class RegisterBankArray' bank, IE: config['key']. Every register shares one template config dictionary, until own() gives it it's own copy"""
+
+        def __init__(self, bank : "CPUsim.RegisterBankArray", template : dict):
+            self.bank : CPUsim.RegisterBankArray = bank
+            self.template : dict = template
+            self._own : dict[str or int, dict] = {}
+
+        def own(self, index : str or int) -> dict:
+            """Returns the config dictionary of a single register, after making sure it isn't shared with other registers"""
+            if index not in self._own:
+                self._own[index] = dict(self[index], alias = list(self[index]['alias']))
+            return self._own[index]
+
+        def __getitem__(self, index : str or int) -> dict:
+            if index in self._own:
+                return self._own[index]
+            if index in self.bank:
+                return self.template
+            raise KeyError(index)
+
+        def __setitem__(self, index : str or int, value : dict):
+            self._own[index] = value
+
+        def __delitem__(self, index : str or int):
+            del self._own[index]
+
+        def __iter__(self):
+            return iter(self.bank)
+
+        def __len__(self) -> int:
+            return len(self.bank)
+
+        def __contains__(self, index : str or int) -> bool:
+            return index in self.bank
+        
+    class TraceWriter:
+        """Records every cycle of 'def run' into a memory-mapped ring buffer file (see 'def configSetTracer'), read it back with 'class TraceReader'
+
+        Every cycle is one fixed size record: tick, pc, instruction id (the source code line number), and the registers written as (slot, value) pairs.
+        A cycle that writes more than slotsPerRecord registers is continued in the following record(s).
+        Only the last 'capacity' records are kept. Evicted records are first folded into a snapshot of the registers, so the registers at every kept tick can be rebuilt without re-running.
+        'imm' registers aren't recorded. Every 'def run' starts a new trace, overwriting the file
+
+        File layout:
+            header          see 'var _header', count is the amount of records ever written
+            slot table      JSON list of [key, index], a register's slot is it's position in the list
+            snapshot        valueBytes per slot, the registers before the oldest kept record
+            ring            capacity records, record n is stored at position n % capacity
+        """
+        _header = struct.Struct("<8sIIQQIIIQQQQ") #magic, version, recordSize, capacity, count, valueBytes, slotsPerRecord, slotAmount, tableOffset, tableLength, snapshotOffset, ringOffset
+        _headerCount : int = 24 #offset of count in the header
+        _record = struct.Struct("<QIIHH") #tick, pc, instructionId, writes, flags. Followed by slotsPerRecord (slot, value) pairs
+        _slot = struct.Struct("<I") #followed by valueBytes of little endian value
+        _magic : bytes = b"CPUTRACE"
+        _version : int = 1
+        _continued : int = 1 #record flag, the record continues the writes of the record before it
+
+        def __init__(self, path : str, capacity : int = 2**20, slotsPerRecord : int = 4):
+            assert type(path) is str
+            assert type(capacity) is int
+            assert capacity >= 1
+            assert type(slotsPerRecord) is int
+            assert 1 <= slotsPerRecord <= 0xFFFF
+
+            self.path : str = path
+            self.capacity : int = capacity
+            self.slotsPerRecord : int = slotsPerRecord
+
+            self._file = None
+            self._map : mmap.mmap = None
+
+        def begin(self, state : dict[str, dict[str or int, int]], config : dict[str, dict[str or int, dict]]):
+            """Takes in the registers (and their config) before the first cycle. Creates the trace file, and writes the slot table and starting snapshot"""
+            self.end()
+
+            table : list[list[str or int]] = [[key, index] for key in state.keys() if key != "imm" for index in state[key].keys()]
+            self._slots : dict[tuple[str, str or int], int] = {(key, index) : slot for slot, (key, index) in enumerate(table)}
+
+            self._valueBytes : int = (max([config[key][index]["bitLength"] for key, index in table], default = 1) + 7) // 8
+            self._pairSize : int = self._slot.size + self._valueBytes
+            self._recordSize : int = (self._record.size + self.slotsPerRecord * self._pairSize + 7) // 8 * 8
+            tableBytes : bytes = json.dumps(table).encode()
+            tableOffset : int = self._header.size
+            self._snapshotOffset : int = (tableOffset + len(tableBytes) + 7) // 8 * 8
+            self._ringOffset : int = (self._snapshotOffset + len(table) * self._valueBytes + 7) // 8 * 8
+            size : int = self._ringOffset + self.capacity * self._recordSize
+
+            self._file = open(self.path, "w+b")
+            self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), size)
+            self._count : int = 0
+
+            self._header.pack_into(self._map, 0, self._magic, self._version, self._recordSize, self.capacity, self._count, self._valueBytes, self.slotsPerRecord, len(table),
+                tableOffset, len(tableBytes), self._snapshotOffset, self._ringOffset)
+            self._map[tableOffset : tableOffset + len(tableBytes)] = tableBytes
+            for (key, index), slot in self._slots.items():
+                offset : int = self._snapshotOffset + slot * self._valueBytes
+                self._map[offset : offset + self._valueBytes] = state[key][index].to_bytes(self._valueBytes, "little")
+
+        def record(self, tick : int, pc : int, instructionId : int, writes : dict[str, dict[str or int, int]]):
+            """Takes in one cycle, appends it as one record (or more, if it wrote more than slotsPerRecord registers)"""
+            pairs : list[tuple[int, int]] = [(self._slots[(key, index)], value) for key, registers in writes.items() if key != "imm" for index, value in registers.items()]
+
+            self._append(tick, pc, instructionId, pairs[:self.slotsPerRecord], 0)
+            for start in range(self.slotsPerRecord, len(pairs), self.slotsPerRecord):
+                self._append(tick, pc, instructionId, pairs[start : start + self.slotsPerRecord], self._continued)
+
+            struct.pack_into("<Q", self._map, self._headerCount, self._count)
+
+        def _append(self, tick : int, pc : int, instructionId : int, pairs : list[tuple[int, int]], flags : int):
+            """Writes one record at the head of the ring, evicting the oldest record if the ring is full"""
+            position : int = self._ringOffset + (self._count % self.capacity) * self._recordSize
+            if self._count >= self.capacity:
+                self._evict(position)
+
+            self._record.pack_into(self._map, position, tick, pc, instructionId, len(pairs), flags)
+            offset : int = position + self._record.size
+            for slot, value in pairs:
+                self._slot.pack_into(self._map, offset, slot)
+                self._map[offset + self._slot.size : offset + self._pairSize] = value.to_bytes(self._valueBytes, "little")
+                offset += self._pairSize
+            self._count += 1
+
+        def _evict(self, position : int):
+            """Folds the writes of the record at position into the snapshot, before it's overwritten"""
+            writes : int = self._record.unpack_from(self._map, position)[3]
+            offset : int = position + self._record.size
+            for _ in range(writes):
+                slot : int = self._slot.unpack_from(self._map, offset)[0]
+                snapshot : int = self._snapshotOffset + slot * self._valueBytes
+                self._map[snapshot : snapshot + self._valueBytes] = self._map[offset + self._slot.size : offset + self._pairSize]
+                offset += self._pairSize
+
+        def end(self):
+            """Flushes and closes the trace file"""
+            if self._map != None:
+                self._map.flush()
+                self._map.close()
+                self._file.close()
+                self._map = None
+                self._file = None
+
+    class TraceReader:
+        """Reads a trace file written by 'class TraceWriter'. Rebuilds the registers at any kept tick without re-running the program"""
+
+        def __init__(self, path : str):
+            assert type(path) is str
+
+            with open(path, "rb") as file:
+                self._map : mmap.mmap = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+
+            header = CPUsim.TraceWriter._header.unpack_from(self._map, 0)
+            magic, version, self._recordSize, self.capacity, self.count, self._valueBytes, self.slotsPerRecord, slotAmount, tableOffset, tableLength, self._snapshotOffset, self._ringOffset = header
+            if magic != CPUsim.TraceWriter._magic or version != CPUsim.TraceWriter._version:
+                raise Exception("Not a CPUsim trace file, or an unsupported version: " + str(path))
+
+            self.slots : list[tuple[str, str or int]] = [tuple(i) for i in json.loads(self._map[tableOffset : tableOffset + tableLength])]
+            self._pairSize : int = CPUsim.TraceWriter._slot.size + self._valueBytes
+
+        def close(self):
+            self._map.close()
+
+        def snapshot(self) -> dict[str, dict[str or int, int]]:
+            """Returns the registers before the oldest kept record, IE: {'key' : {index : value}}"""
+            state : dict[str, dict[str or int, int]] = {}
+            for slot, (key, index) in enumerate(self.slots):
+                offset : int = self._snapshotOffset + slot * self._valueBytes
+                state.setdefault(key, {})[index] = int.from_bytes(self._map[offset : offset + self._valueBytes], "little")
+            return state
+
+        def records(self) -> "Iterator[tuple[int, int, int, dict[str, dict[str or int, int]]]]":
+            """Yields every kept cycle, oldest first, as (tick, pc, instructionId, {'key' : {index : value}} of the registers written). Continued records are merged"""
+            cycle : list = None
+            for n in range(max(0, self.count - self.capacity), self.count):
+                position : int = self._ringOffset + (n % self.capacity) * self._recordSize
+                tick, pc, instructionId, writes, flags = CPUsim.TraceWriter._record.unpack_from(self._map, position)
+                if cycle != None and not(flags & CPUsim.TraceWriter._continued):
+                    yield tuple(cycle)
+                    cycle = None
+                if cycle == None:
+                    cycle = [tick, pc, instructionId, {}]
+
+                offset : int = position + CPUsim.TraceWriter._record.size
+                for _ in range(writes):
+                    key, index = self.slots[CPUsim.TraceWriter._slot.unpack_from(self._map, offset)[0]]
+                    cycle[3].setdefault(key, {})[index] = int.from_bytes(self._map[offset + CPUsim.TraceWriter._slot.size : offset + self._pairSize], "little")
+                    offset += self._pairSize
+            if cycle != None:
+                yield tuple(cycle)
+
+        def ticks(self) -> tuple[int, int]:
+            """Returns the (first, last) kept tick, or None if the trace is empty"""
+            if self.count == 0:
+                return None
+            first : int = CPUsim.TraceWriter._record.unpack_from(self._map, self._ringOffset + (max(0, self.count - self.capacity) % self.capacity) * self._recordSize)[0]
+            last : int = CPUsim.TraceWriter._record.unpack_from(self._map, self._ringOffset + ((self.count - 1) % self.capacity) * self._recordSize)[0]
+            return (first, last)
+
+        def stateAt(self, tick : int) -> dict[str, dict[str or int, int]]:
+            """Takes in a kept tick, returns the registers after that cycle, IE: {'key' : {index : value}}. Costs O(records kept before tick)"""
+            assert type(tick) is int
+            ticks : tuple[int, int] = self.ticks()
+            if ticks == None or not(ticks[0] <= tick <= ticks[1]):
+                raise Exception("Tick " + str(tick) + " is not kept in the trace, kept ticks = " + str(ticks))
+
+            state : dict[str, dict[str or int, int]] = self.snapshot()
+            for recordTick, pc, instructionId, writes in self.records():
+                if recordTick > tick:
+                    break
+                for key, registers in writes.items():
+                    state[key].update(registers)
+            return state
+
     class compileDefault:
         """a working prototype, provides functions that take in an execution tree, and return a programs instruction list, memory array, etc"""
 
@@ -1281,7 +3068,8 @@ class CPUsim:
             #can't assert execution tree is type node because that's only available in the parser?
             assert type(parseLabels) is dict
 
-            logging.debug(debugHelper(inspect.currentframe()) + "compile input ExecutionTree = \n" + str(executionTree))
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug(debugHelper(inspect.currentframe()) + "compile input ExecutionTree = \n" + str(executionTree))
 
             instructionArray : list["Node"] = []
             memoryArray : list[int] = []
@@ -1335,14 +3123,8 @@ class CPUsim:
             self.backDeepBlue : str = "\u001b[48;5;17m" #background deep blue
             self.ANSIend : str = "\u001b[0m" #resets ANSI colours
 
-        def runtime(self, oldState : dict, newState : dict, config : dict, stats : dict = None, engine : dict = None):
-            """Executed after every instruction/cycle. Accesses/takes in all information about the engine, takes control of the terminal to print information."""
-
-            lineEngine : str = ""
-            lineEngine += "[TICK " + str(engine["tick"]).rjust(10, "0") + "]"
-            lineEngine += "\n"
-
-            #calculate column widths
+        def _columnWidths(self, oldState : dict, config : dict) -> tuple[list[tuple[str, str or int]], dict[str, int]]:
+            """Takes in the state and config, returns a sorted list of every shown (key, index) register, and the width of every column"""
             registers : list[tuple[str, str or int]] = []
             maxWidths : dict[str, int] = {
                                             "key":3, #3 since 'imm' doesn't show up in every cycle
@@ -1381,6 +3163,21 @@ class CPUsim:
             for key in maxWidths.keys():
                 maxWidths[key] += (4 - (maxWidths[key] % 4)) % 4 #the outer '%4' prevents adding an additional 4, adding a 0 instead
 
+            return (registers, maxWidths)
+
+        def _currentImmediates(self, oldState : dict, config : dict, engine : dict) -> list[int]:
+            """Returns the shown 'imm' indexes read by the current line (see engine["immediates"]), without repeats. The rest of the constant pool isn't shown"""
+            return [index for index in dict.fromkeys(engine["immediates"]) if index in oldState["imm"] and config["imm"][index]["show"]]
+
+        def runtime(self, oldState : dict, newState : dict, config : dict, stats : dict = None, engine : dict = None):
+            """Executed after every instruction/cycle. Accesses/takes in all information about the engine, takes control of the terminal to print information."""
+
+            lineEngine : str = ""
+            lineEngine += "[TICK " + str(engine["tick"]).rjust(10, "0") + "]"
+            lineEngine += "\n"
+
+            registers, maxWidths = self._columnWidths(oldState, config)
+
             #source code program counter
             lineSource : str = ""
             indent : int = 4
@@ -1438,10 +3235,10 @@ class CPUsim:
 
                 lineSpecialPC += "\n"
 
-            #format special registers 'imm'
+            #format special registers 'imm', only the current line's
             lineSpecialIMM : str = ""
             indent : int = 4
-            for key, index in [(key, index) for key, index in registers if key in ["imm"]]:
+            for key, index in [("imm", index) for index in self._currentImmediates(oldState, config, engine)]:
                 lineSpecialIMM += "".ljust(indent)
 
                 lineSpecialIMM += str(key).ljust(maxWidths["key"])
@@ -1509,6 +3306,167 @@ class CPUsim:
             #TODO
 
             print("CPU Halted")
+            if stats != None and "profileTable" in stats.keys(): #see 'def configSetProfiler'
+                print(stats["profileTable"])
+
+    class DisplayIncremental(DisplaySimpleAndClean):
+        """The same screen as 'class DisplaySimpleAndClean', but only redraws the registers that changed
+
+        The first frame clears the terminal and draws every shown register, remembering the row each register is drawn on.
+        After that, a frame uses ANSI cursor addressing to rewrite only the values of registers written this cycle (and un-highlights the ones written last cycle),
+        so it costs O(registers written) instead of O(registers shown). Meant for large 'm' banks with show=True
+
+        The screen is redrawn when a register bank changes size, and every drawn value is re-checked when ticks were skipped (IE: 'def configSetDisplayThrottle')
+        Assumes the terminal is tall enough to fit every shown register
+        """
+
+        def __init__(self, animationDelay : float = 0.5):
+            super().__init__(animationDelay)
+            self.reset()
+
+        def reset(self):
+            """Forgets the layout, the next frame redraws the whole screen"""
+            self._layoutKey : tuple = None
+            self._maxWidths : dict[str, int] = {}
+            self._rows : dict[tuple[str, str or int], int] = {} #(key, index) -> screen row
+            self._drawn : dict[tuple[str, str or int], tuple[int, int]] = {} #(key, index) -> (old value, new value) as drawn on screen
+            self._highlighted : set[tuple[str, str or int]] = set() #registers drawn as changed in the last frame
+            self._sourceLines : list[str] = []
+            self._sourceRows : dict[str or int, int] = {} #pc index -> screen row
+            self._immRow : int = 0
+            self._immSlots : int = 0
+            self._height : int = 0
+            self._lastTick : int = None
+
+        def runtime(self, oldState : dict, newState : dict, config : dict, stats : dict = None, engine : dict = None):
+            """Executed after every instruction/cycle. Redraws the whole screen on the first frame (or a layout change), otherwise only what changed"""
+            layoutKey : tuple = (id(config), engine["sourceCode"], tuple((key, len(oldState[key])) for key in oldState.keys() if key != "imm"))
+
+            if layoutKey != self._layoutKey or len(self._currentImmediates(oldState, config, engine)) > self._immSlots:
+                screen : str = self._drawLayout(oldState, newState, config, engine)
+                self._layoutKey = layoutKey
+            else:
+                screen : str = self._drawChanges(oldState, newState, config, engine)
+            self._lastTick = engine["tick"]
+
+            screen += "\u001b[" + str(self._height + 1) + ";1H" #parks the cursor under the screen, so anything else printed doesn't overwrite it
+            print(screen, end = "", flush = True)
+
+            #the animation delay
+            delay : float = (self.animationDelay - self.timer() + self.lastTime) if 0 < (self.animationDelay - self.timer() + self.lastTime) < self.animationDelay else 0
+            self.sleep(delay)
+            self.lastTime = self.timer()
+
+        def _drawLayout(self, oldState : dict, newState : dict, config : dict, engine : dict) -> str:
+            """Computes the layout, returns the whole screen. Costs O(registers shown)"""
+            registers, self._maxWidths = self._columnWidths(oldState, config)
+            self._sourceLines = engine["sourceCode"].split("\n") if engine["sourceCode"] != None else []
+            self._rows = {}
+            self._drawn = {}
+            self._highlighted = set()
+
+            row : int = 2 #row 1 is the tick line
+            self._sourceRows = {}
+            for key, index in registers:
+                if key == "pc":
+                    self._sourceRows[index] = row
+                    row += 1
+            for key, index in registers:
+                if key == "pc":
+                    self._rows[(key, index)] = row
+                    row += 1
+            self._immRow = row
+            self._immSlots = max(len(self._currentImmediates(oldState, config, engine)), 4)
+            row += self._immSlots
+            for key, index in registers:
+                if key not in ["pc", "imm"]:
+                    self._rows[(key, index)] = row
+                    row += 1
+            self._height = row - 1
+
+            screen : str = "\u001b[2J" #clears the terminal
+            for (key, index), row in self._rows.items():
+                screen += "\u001b[" + str(row) + ";1H" + self._registerLabel(key, index, config) + self._registerValues(key, index, oldState, newState, config)
+                screen += self.textGrey + (config[key][index]["note"]).ljust(self._maxWidths["note"]) + self.ANSIend
+            screen += self._drawEveryFrame(oldState, config, engine)
+            return screen
+
+        def _drawChanges(self, oldState : dict, newState : dict, config : dict, engine : dict) -> str:
+            """Returns the cursor addressed updates for the registers that changed since the last frame. Costs O(registers written)"""
+            if engine["tick"] == self._lastTick + 1 and type(newState) is CPUsim.RegisterFileVersioned:
+                changed : set[tuple[str, str or int]] = set(self._highlighted)
+                for key, registers in newState.written().items():
+                    changed.update((key, index) for index in registers.keys())
+            else: #ticks were skipped, the writes in between weren't seen
+                changed = self._rows.keys()
+
+            self._highlighted = set()
+            screen : str = ""
+            for register in changed:
+                if register in self._rows:
+                    screen += self._registerValues(register[0], register[1], oldState, newState, config)
+            screen += self._drawEveryFrame(oldState, config, engine)
+            return screen
+
+        def _registerLabel(self, key : str, index : str or int, config : dict) -> str:
+            """Returns the indent, key, index and alias columns of a register line"""
+            line : str = "".ljust(4)
+            line += str(key).ljust(self._maxWidths["key"])
+            line += ("[" + str(index) + "]").ljust(self._maxWidths["index"])
+            if len(config[key][index]["alias"]) != 0:
+                line += self.textGrey + ("[" + ",".join(config[key][index]["alias"]) + "]").ljust(self._maxWidths["alias"]) + self.ANSIend
+            else:
+                line += "".ljust(self._maxWidths["alias"])
+            return line
+
+        def _registerValues(self, key : str, index : str or int, oldState : dict, newState : dict, config : dict) -> str:
+            """Returns the cursor addressed old and new value columns of a register line, or "" if they are already drawn"""
+            old : int = oldState[key][index]
+            new : int = newState[key][index]
+            if old != new:
+                self._highlighted.add((key, index))
+            if self._drawn.get((key, index)) == (old, new):
+                return ""
+            self._drawn[(key, index)] = (old, new)
+
+            column : int = 4 + self._maxWidths["key"] + self._maxWidths["index"] + self._maxWidths["alias"] + 1
+            screen : str = "\u001b[" + str(self._rows[(key, index)]) + ";" + str(column) + "H"
+            highlight : str = ""
+            screen += ("[" + self.textGrey + "0b" + self.ANSIend + highlight + str(bin(old))[2:].rjust(config[key][index]["bitLength"], "0") + self.ANSIend + "]")\
+                        .ljust(self._maxWidths["bitLength"] + len(self.textGrey) + len(highlight) + 2*len(self.ANSIend))
+            highlight = self.textTeal if old != new else "" #TODO should check if memory read/written instead of just looking for a difference
+            screen += ("[" + self.textGrey + "0b" + self.ANSIend + highlight + str(bin(new))[2:].rjust(config[key][index]["bitLength"], "0") + self.ANSIend + "]")\
+                        .ljust(self._maxWidths["bitLength"] + len(self.textGrey) + len(highlight) + 2*len(self.ANSIend))
+            return screen
+
+        def _drawEveryFrame(self, oldState : dict, config : dict, engine : dict) -> str:
+            """Returns the lines redrawn every frame: the tick, the source code line of every 'pc', and the 'imm' registers"""
+            screen : str = "\u001b[1;1H" + "[TICK " + str(engine["tick"]).rjust(10, "0") + "]"
+
+            for index, row in self._sourceRows.items():
+                screen += "\u001b[" + str(row) + ";1H\u001b[K" + "".ljust(4) + self.backDeepBlue + self._registerLabel("pc", index, config)[4:]
+                screen += ("[" + self.textGrey + "0x" + self.ANSIend + self.backDeepBlue + str(hex(oldState["pc"][index]))[2:].rjust(config["pc"][index]["bitLength"] // 4, "0") + "]")\
+                            .ljust(self._maxWidths["bitLength"] + len(self.textGrey) + len(self.ANSIend) + len(self.backDeepBlue))
+                operation = engine["instructionArray"][oldState["pc"][index]] if engine["instructionArray"] != None and oldState["pc"][index] < len(engine["instructionArray"]) else None
+                if type(operation) is not type(None):
+                    screen += ("[Line " + str(operation.lineNum).rjust(4, "0") + "]").ljust(self._maxWidths["bitLength"])
+                    screen += str(self._sourceLines[operation.lineNum]).strip()
+                else:
+                    screen += "Instruction Not Found"
+                screen += self.ANSIend
+
+            highlight : str = self.textTeal
+            immediates : list[int] = self._currentImmediates(oldState, config, engine)
+            for slot in range(self._immSlots):
+                screen += "\u001b[" + str(self._immRow + slot) + ";1H\u001b[K"
+                if slot < len(immediates):
+                    index : int = immediates[slot]
+                    screen += self._registerLabel("imm", index, config)
+                    screen += ("[" + self.textGrey + "0b" + self.ANSIend + highlight + str(bin(oldState["imm"][index]))[2:].rjust(config["imm"][index]["bitLength"], "0") + self.ANSIend + "]")\
+                                .ljust(self._maxWidths["bitLength"] + len(self.textGrey) + len(highlight) + 2*len(self.ANSIend))
+                    screen += "".ljust(self._maxWidths["bitLength"])
+                    screen += self.textGrey + (config["imm"][index]["note"]).ljust(self._maxWidths["note"]) + self.ANSIend
+            return screen
 
     class DisplaySilent:
         """An intentionally empty definition, that will display nothing to the screen"""
@@ -1649,13 +3607,14 @@ class CPUsim:
                 
                 newNode = self.__class__(self.type, self.token, self.lineNum, self.charNum)
 
-                logging.debug(debugHelper(inspect.currentframe()) + "attempting to copyDeep node"+ "\n" + str((
-                        self.type,
-                        self.token,
-                        self.lineNum,
-                        self.charNum,
-                        self.child))
-                    )
+                if logging.getLogger().isEnabledFor(logging.DEBUG):
+                    logging.debug(debugHelper(inspect.currentframe()) + "attempting to copyDeep node"+ "\n" + str((
+                            self.type,
+                            self.token,
+                            self.lineNum,
+                            self.charNum,
+                            self.child))
+                        )
 
                 for i in range(len(self.child)):
                     newNode.append(self.child[i].copyDeep())
@@ -1678,21 +3637,26 @@ class CPUsim:
                 
                 #'rewires' the references of the children nodes
                 newNode.parent = self
+                debug : bool = logging.getLogger().isEnabledFor(logging.DEBUG)
                 if len(self.child) == 1: #case where oldNode is the only child in the list
-                    logging.debug(debugHelper(inspect.currentframe()) + "only child detected")
+                    if debug:
+                        logging.debug(debugHelper(inspect.currentframe()) + "only child detected")
                     pass
                 elif index == 0: #case where oldNode is first child in the list, but not the only child in the list
-                    logging.debug(debugHelper(inspect.currentframe()) + "first child detected")
+                    if debug:
+                        logging.debug(debugHelper(inspect.currentframe()) + "first child detected")
 
                     newNode.nodeNext = self.child[1]
                     self.child[1].nodePrevious = newNode
                 elif index == len(self.child) - 1: #case where oldNode is the last child in the list, but not the only child in the list
-                    logging.debug(debugHelper(inspect.currentframe()) + "last child detected")
+                    if debug:
+                        logging.debug(debugHelper(inspect.currentframe()) + "last child detected")
 
                     newNode.nodePrevious = self.child[-1]
                     self.child[-1].nodeNext = newNode
                 elif 0 < index < len(self.child) -1: #case where oldNode is between two other nodes
-                    logging.debug(debugHelper(inspect.currentframe()) + "middle child detected")
+                    if debug:
+                        logging.debug(debugHelper(inspect.currentframe()) + "middle child detected")
 
                     newNode.nodePrevious = self.child[index - 1]
                     newNode.nodeNext = self.child[index + 1]
@@ -1727,27 +3691,33 @@ class CPUsim:
 
                 removeNode : self.__class__ = self.child[index]
 
-                logging.debug(debugHelper(inspect.currentframe()) + "attempting to remove node"+ "\n" + str((
-                        self.type,
-                        self.token,
-                        self.lineNum,
-                        self.charNum,
-                        self.child)))
+                debug : bool = logging.getLogger().isEnabledFor(logging.DEBUG)
+                if debug:
+                    logging.debug(debugHelper(inspect.currentframe()) + "attempting to remove node"+ "\n" + str((
+                            self.type,
+                            self.token,
+                            self.lineNum,
+                            self.charNum,
+                            self.child)))
 
                 #'rewires' the references of the children nodes to remove removeNode
                 if len(self.child) == 1: #case where removeNode is the only child in the list
-                    logging.debug(debugHelper(inspect.currentframe()) + "only child detected")
+                    if debug:
+                        logging.debug(debugHelper(inspect.currentframe()) + "only child detected")
                     pass
                 elif index == 0: #case where removeNode is first child in the list, but not the only child in the list
-                    logging.debug(debugHelper(inspect.currentframe()) + "first child detected")
+                    if debug:
+                        logging.debug(debugHelper(inspect.currentframe()) + "first child detected")
                     if type(removeNode.nodeNext) is self.__class__: #TODO figure out why this is neccissary to avoid a specific error.
                         removeNode.nodeNext.nodePrevious = None
                 elif index == len(self.child) - 1: #case where removeNode is the last child in the list, but not the only child in the list
-                    logging.debug(debugHelper(inspect.currentframe()) + "last child detected")
+                    if debug:
+                        logging.debug(debugHelper(inspect.currentframe()) + "last child detected")
                     if type(removeNode.nodePrevious) is self.__class__:
                         removeNode.nodePrevious.nodeNext = None
                 elif 0 < index < len(self.child) -1: #case where removeNode is between two other nodes
-                    logging.debug(debugHelper(inspect.currentframe()) + "middle child detected")
+                    if debug:
+                        logging.debug(debugHelper(inspect.currentframe()) + "middle child detected")
                     if type(removeNode.nodePrevious) is self.__class__:
                         removeNode.nodePrevious.nodeNext = removeNode.nodeNext
                     if type(removeNode.nodeNext) is self.__class__:
@@ -1791,7 +3761,8 @@ class CPUsim:
                 
             def __eq__(self, other) -> bool:
                 """A custom equals comparision. Takes in another object other, and compaires it to self.token. Returns True if equal, False otherwise"""
-                logging.debug(debugHelper(inspect.currentframe()) + "Custom equals comparison")
+                if logging.getLogger().isEnabledFor(logging.DEBUG):
+                    logging.debug(debugHelper(inspect.currentframe()) + "Custom equals comparison")
 
                 #return self.token == other
                 if type(other) is self.__class__:
@@ -1801,7 +3772,8 @@ class CPUsim:
 
             def __ne__(self, other) -> bool:
                 """A custom not equals comparision. Takes in another object other, and compaires it to self.token. Returns True if not equal, False otherwise"""
-                logging.debug(debugHelper(inspect.currentframe()) + "Custom equals comparison")
+                if logging.getLogger().isEnabledFor(logging.DEBUG):
+                    logging.debug(debugHelper(inspect.currentframe()) + "Custom equals comparison")
 
                 #return self.token != other
                 if type(other) is self.__class__:
@@ -1815,12 +3787,13 @@ class CPUsim:
                 
                 will not touch pointers to this node from other nodes. IE: nodeNext's pointer to this node could be set to None, but that could get messy?"""
                 
-                logging.debug(debugHelper(inspect.currentframe()) + "Deleting Node" + "\n" + str((
-                        self.type,
-                        self.token,
-                        self.lineNum,
-                        self.charNum))
-                        )
+                if logging.getLogger().isEnabledFor(logging.DEBUG):
+                    logging.debug(debugHelper(inspect.currentframe()) + "Deleting Node" + "\n" + str((
+                            self.type,
+                            self.token,
+                            self.lineNum,
+                            self.charNum))
+                            )
                 
                 self.parent = None
                 self.nodeNext = None
@@ -2026,23 +3999,29 @@ class CPUsim:
             Edge: 1 -> 0: found newline
             Edge: 1 -> 1: did not find newline, copy token
             '''
+            debug : bool = logging.getLogger().isEnabledFor(logging.DEBUG) #checked once, instead of per token
             for i in tree.child:
-                logging.debug(debugHelper(inspect.currentframe()) + repr(i.token))
+                if debug:
+                    logging.debug(debugHelper(inspect.currentframe()) + repr(i.token))
                 if stack != None: #State 0: at beginning of line
                     if i.token in whiteSpace: #Edge: 0 -> 0: found whitespace, not copying
-                        logging.debug(debugHelper(inspect.currentframe()) + "\tEdge 0 -> 0")
+                        if debug:
+                            logging.debug(debugHelper(inspect.currentframe()) + "\tEdge 0 -> 0")
                         pass
                     else: #Edge: 0 -> 1: found token, copying
-                        logging.debug(debugHelper(inspect.currentframe()) + "\tEdge 0 -> 1")
+                        if debug:
+                            logging.debug(debugHelper(inspect.currentframe()) + "\tEdge 0 -> 1")
                         root.append(i.copyDeep())
                         stack = None
                 else: #State 1: after first token
                     if i == "\n": #Edge: 1 -> 0: found newline
-                        logging.debug(debugHelper(inspect.currentframe()) + "\tEdge 1 -> 0")
+                        if debug:
+                            logging.debug(debugHelper(inspect.currentframe()) + "\tEdge 1 -> 0")
                         stack = "\n"
                         root.append(i.copyDeep())
                     else: #Edge: 1 -> 1: did not find newline, copy token
-                        logging.debug(debugHelper(inspect.currentframe()) + "\tEdge 1 -> 1")
+                        if debug:
+                            logging.debug(debugHelper(inspect.currentframe()) + "\tEdge 1 -> 1")
                         root.append(i.copyDeep())
 
             return root
@@ -2726,31 +4705,41 @@ class CPUsim:
             for i in self._tokenize(sourceCode):
                 root.append(self.Node("token", i[0], i[1], i[2]))
 
-            logging.debug(debugHelper(inspect.currentframe()) + "this is the original code: " + "\n" + repr(sourceCode))
-            logging.debug(debugHelper(inspect.currentframe()) + "tokenized code: " + "\n" + str(root))
+            debug : bool = logging.getLogger().isEnabledFor(logging.DEBUG) #str(root) walks the whole tree, the dumps are only built when they're logged
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "this is the original code: " + "\n" + repr(sourceCode))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "tokenized code: " + "\n" + str(root))
 
             #Note: at this point, rules do operations on the Node Tree, but the depth of the Node Tree remains 2
 
             root = self.ruleFilterLineComments(root, "#")
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleFilterLineComments: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleFilterLineComments: " + "\n" + str(root))
 
             root = self.ruleStringSimple(root)
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleStringSimple: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleStringSimple: " + "\n" + str(root))
 
             root = self.ruleApplyAlias(root, self.alias)
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleApplyAlias: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleApplyAlias: " + "\n" + str(root))
 
             root = self.ruleLowerCase(root)
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleLowerCase: " + "\n" + str(root))            
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleLowerCase: " + "\n" + str(root))            
 
             root = self.ruleRemoveLeadingWhitespace(root, [" ", "\t"])
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleRemoveLeadingWhitespace: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleRemoveLeadingWhitespace: " + "\n" + str(root))
 
             root = self.ruleRemoveEmptyLines(root)
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleRemoveEmptyLines: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleRemoveEmptyLines: " + "\n" + str(root))
 
             root, self.labels = self.ruleFindLabels(root)
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleFindLabels: " + "\n" + str(root) + "\nlabels: " + str(self.labels))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleFindLabels: " + "\n" + str(root) + "\nlabels: " + str(self.labels))
             i = 0
             while i < len(root.child): #removes the label nodes, as they don't need to be executed
                 if root.child[i].type == "label":
@@ -2759,30 +4748,37 @@ class CPUsim:
                     i += 1
             
             root = self.ruleLabelNamespace(root, self.nameSpace)
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleLabelNamespace: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleLabelNamespace: " + "\n" + str(root))
 
             root = self.ruleRemoveToken(root, " ", False)
             root = self.ruleRemoveToken(root, "\t", False)
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleRemoveToken: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleRemoveToken: " + "\n" + str(root))
 
             root = self.ruleCastInts(root)
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleCastInts: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleCastInts: " + "\n" + str(root))
 
             root = self.ruleCastHex(root)
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleCastHex: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleCastHex: " + "\n" + str(root))
 
             #This is where the Node Tree is allowed to go to depth > 2
             root = self.ruleContainer(root, {"(":")", "[":"]"})
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleContainer: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleContainer: " + "\n" + str(root))
 
             root = self.ruleNestContainersIntoInstructions(root, self.nameSpace, True)
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleNestContainersIntoInstructions: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleNestContainersIntoInstructions: " + "\n" + str(root))
 
             temp : list[self.Node] = self.ruleSplitLines(root, "line", "\n")
             root = self.Node("root")
             for i in temp:
                 root.append(i)
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleSplitLines: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleSplitLines: " + "\n" + str(root))
 
             #removes empty lines/empty line nodes
             i = 0
@@ -2791,10 +4787,12 @@ class CPUsim:
                     root.remove(root.child[i])
                 else:
                     i += 1
-            logging.debug(debugHelper(inspect.currentframe()) + "remove empty line nodes: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "remove empty line nodes: " + "\n" + str(root))
 
             root = self.ruleSplitTokens(root, "argument", ',', True)
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleSplitTokens: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleSplitTokens: " + "\n" + str(root))
 
             return root, self.labels
             
@@ -2803,6 +4801,7 @@ class CPUsim:
         
         Note: uses 'carry' flag, but doesn't need that flag to run. IE: will use 'carry' flag if present
         Note: instruction functions do not 'see' immediate values, they instead see an index of register 'imm' (IE: immediate values are filtered out before instructions are called)
+        Note: oldState and config are read only views of the CPU's live registers and config, not copies (see 'def CPUsim._executeDecoded'). Instructions only read from them, and write to newState
         """
 
         def __init__(self):
@@ -2820,10 +4819,19 @@ class CPUsim:
                 "jump"  : (lambda z1, z2, z3, z4,   pointer           : self.opJump(z1, z2, z3, z4,       "goto", pointer)),
                 "shiftl": (lambda z1, z2, z3, z4,   des, a            : self.opShiftL(z1, z2, z3, z4,     des, a, 1)),
                 "shiftr": (lambda z1, z2, z3, z4,   des, a            : self.opShiftR(z1, z2, z3, z4,     des, a, 1)),
+                "cas"   : self.opCAS,
+                "fetchadd": self.opFetchAdd,
 
                 "halt"  : self.opHalt
             }
 
+            #see 'def _peephole'
+            self.unconditionalJump : str = "jump"
+            self.superinstructions : dict[tuple[str, str], Callable[[tuple, tuple], tuple[Callable, tuple]]] = {
+                ("and", "jumpeq")   : (lambda first, second : self.fuseANDJump("==", first, second)),
+                ("and", "jumpne")   : (lambda first, second : self.fuseANDJump("!=", first, second)),
+            }
+
             self.stats : dict = {}
 
             self.directives : dict = {}
@@ -3131,8 +5139,96 @@ class CPUsim:
             newState[des1][des2] = result
             newState['pc'][0] = oldState['pc'][0] + 1
 
+        def _atomicUpdate(self, oldState, newState, register : tuple, update : Callable[[int], int]) -> int:
+            """Takes in a register, and update(old value) -> new value (or None to leave it as is). Returns the old value
+
+            A register of a shared register bank (see 'class RegisterBankShared') is read and written while holding the register bank's lock, straight into the register bank,
+            so CPUs sharing the register bank see the update at once (see 'def RegisterFileVersioned.writeThrough', it's still traced and journaled). Any other register is written to newState, like every other instruction
+            """
+            key, index = register
+            bank = oldState[key]
+
+            if isinstance(bank, CPUsim.RegisterBankShared):
+                with bank.lock:
+                    old : int = bank[index]
+                    value : int = update(old)
+                    if value != None:
+                        newState.writeThrough(key, index, value)
+                return old
+
+            old : int = bank[index]
+            value : int = update(old)
+            if value != None:
+                newState[key][index] = value
+            return old
+
+        def opCAS(self, oldState, newState, config, engine, des, a, expected, new):
+            """Atomic compare and swap, if register a equals register expected, stores register new in a. Stores the old value of a in des, IE: the swap happened if des == expected
+
+            See 'def _atomicUpdate' for how a is written
+            """
+            assert type(des) is tuple and len(des) == 2
+            assert type(a) is tuple and len(a) == 2
+            assert type(expected) is tuple and len(expected) == 2
+            assert type(new) is tuple and len(new) == 2
+
+            a1, a2 = a
+            des1, des2 = des
+            expectedValue : int = oldState[expected[0]][expected[1]]
+            newValue : int = oldState[new[0]][new[1]] & (2**config[a1][a2]['bitLength'] - 1)
+
+            old : int = self._atomicUpdate(oldState, newState, a, lambda old : newValue if old == expectedValue else None)
+
+            newState[des1][des2] = old & (2**config[des1][des2]['bitLength'] - 1)
+            newState['pc'][0] = oldState['pc'][0] + 1
+
+        def opFetchAdd(self, oldState, newState, config, engine, des, a, b):
+            """Atomic add, adds register b to register a. Stores the old value of a in des. Writes a the same way as 'def opCAS'"""
+            assert type(des) is tuple and len(des) == 2
+            assert type(a) is tuple and len(a) == 2
+            assert type(b) is tuple and len(b) == 2
+
+            a1, a2 = a
+            des1, des2 = des
+            amount : int = oldState[b[0]][b[1]]
+            mask : int = 2**config[a1][a2]['bitLength'] - 1
+
+            old : int = self._atomicUpdate(oldState, newState, a, lambda old : (old + amount) & mask)
+
+            newState[des1][des2] = old & (2**config[des1][des2]['bitLength'] - 1)
+            newState['pc'][0] = oldState['pc'][0] + 1
+
         def opHalt(self, oldState, newState, config, engine):
             engine["run"] = False
+            engine["halted"] = True
+
+        def fuseANDJump(self, mode : str, first : tuple, second : tuple) -> tuple[Callable, tuple]:
+            """Takes in mode ('==' or '!='), the arguments of an 'and' line, and of the conditional jump line after it. Returns the superinstruction doing both (see 'def opANDJump'), or None if they can't be fused
+
+            EX: the bit test in a multiply loop, and(r[1], r[0], 1) then jumpNE(zero, r[1], 1)
+            """
+            assert mode in ("==", "!=")
+
+            des, a, b = first
+            pointer, c, d = second
+            if des[0] == "pc" or des == pointer: #the jump has to read it's pointer and the program counter from before the 'and'
+                return None
+
+            return (self.opANDJump, (mode, des, a, b, pointer, c, d))
+
+        def opANDJump(self, oldState, newState, config, engine, mode : str, des, a, b, pointer, c, d):
+            """Superinstruction, 'def opAND' of a and b into des, then 'def opJump' to pointer comparing c and d (either can be des) with mode. Is two ticks, see 'def fuseANDJump'"""
+            des1, des2 = des
+
+            result : int = oldState[a[0]][a[1]] & oldState[b[0]][b[1]] & (2**config[des1][des2]['bitLength'] - 1)
+            newState[des1][des2] = result
+
+            left : int = result if c == des else oldState[c[0]][c[1]]
+            right : int = result if d == des else oldState[d[0]][d[1]]
+            if (left == right) == (mode == "=="):
+                newState['pc'][0] = oldState[pointer[0]][pointer[1]]
+            else:
+                newState['pc'][0] = oldState['pc'][0] + 2
 
         def dirString(self, config) -> list[int]:
             #TODO
@@ -3175,9 +5271,23 @@ class RiscV:
             
     """
     
-    def __init__(self):
+    #RV32I encodings, see riscv-spec-20191213.pdf -> page 130 (148 of 238) -> RV32/64G Instruction Set Listings. Only instructions 'class RiscVISA' implements are listed
+    _opcodeR : int = 0b0110011
+    _opcodeI : int = 0b0010011
+    _opcodeB : int = 0b1100011
+    _ecall : int = 0x00000073 #stands in for 'halt'
+    _encodingR : dict[str, tuple[int, int]] = {"add" : (0, 0x00), "sll" : (1, 0x00), "sltu" : (3, 0x00), "xor" : (4, 0x00), "srl" : (5, 0x00), "sra" : (5, 0x20), "or" : (6, 0x00), "and" : (7, 0x00)} #funct3, funct7
+    _encodingI : dict[str, int] = {"addi" : 0, "sltiu" : 3, "xori" : 4, "ori" : 6, "andi" : 7} #funct3
+    _encodingShift : dict[str, tuple[int, int]] = {"slli" : (1, 0x00), "srli" : (5, 0x00), "srai" : (5, 0x20)} #funct3, funct7
+    _encodingB : dict[str, int] = {"beq" : 0, "bne" : 1, "bltu" : 6, "bgeu" : 7} #funct3
+    _branchModes : dict[str, str] = {"beq" : "==", "bne" : "!=", "bltu" : "<", "bgeu" : ">="}
+
+    def __init__(self, memorySize : int = 2**4):
+        """memorySize is the amount of bytes in 'm', binaries (see 'def loadBinary') take 4 bytes per instruction"""
+        assert type(memorySize) is int
+        assert memorySize >= 1
+
         #when initalizing this class making an instance of this class, initalizing this class should return a CPUsim() object
-        memorySize = 2**4
         xLength = None #TODO look up the name for the bitLength of the ISA from documentation
 
         CPU = CPUsim(32, defaultSetup=False)
@@ -3227,7 +5337,7 @@ class RiscV:
 
         CPU.configConfigRegister('_upper', 0, bitLength=32,     note="upper immediate")         
 
-        CPU.configConfigRegister('x',  0, alias=["zero"],       note="Zero")                    #always zero
+        CPU.configConfigRegister('x',  0, alias=["zero"],       note="Zero", hardwired=True)    #always zero
         CPU.configConfigRegister('x',  1, alias=["r1"],         note="call return address")     #call return address
         CPU.configConfigRegister('x',  2, alias=["sp"],         note="stack pointer")           #stack pointer
         CPU.configConfigRegister('x',  3, alias=["gp"],         note="global pointer")          #global pointer
@@ -3264,7 +5374,6 @@ class RiscV:
         #CPU.configConfigRegister('status', 'cycle', 0)
         #CPU.configConfigRegister('status', 'time', 0)
         
-        CPU.configSetPostCycleFunction(self.postCycle)
         CPU.configSetInstructionSet(self.RiscVISA())
         CPU.configSetParser(self.RiscVParser())
 
@@ -3272,25 +5381,210 @@ class RiscV:
 
         self.CPU = CPU
 
-    def postCycle(self, currentState : dict) -> tuple[dict, dict]:
-        """Takes in the currentState dict, returns a tuple containing the oldState dict, and the newState dict
+        #per CPU (IE: self.CPU and it's clones), as each has it's own 'imm' constant pool
+        self._decodeCaches : weakref.WeakKeyDictionary[CPUsim, dict[int, CPUsim._decodedLine]] = weakref.WeakKeyDictionary() #CPU -> {instruction word : decoded line}, see 'def fetch'
+        self._constants : weakref.WeakKeyDictionary[CPUsim, dict[int, int]] = weakref.WeakKeyDictionary() #CPU -> {immediate value : 'imm' index}, see 'def decode'
+
+    def assemble(self) -> list[int]:
+        """Encodes the program loaded by CPU.linkAndLoad() into RV32I instruction words, one per instruction line. Returns the words
+
+        Raises an Exception for lines without an RV32I encoding, IE: a branch compairing a register with an immediate other than 0 (0 is encoded as x0)
+        """
+        words : list[int] = []
+        for pc, line in enumerate(self.CPU.engine["decodedArray"]):
+            names : list[str] = self.CPU._mnemonics(self.CPU.engine["instructionArray"][pc]) if line != None else []
+            if len(names) != 1:
+                raise Exception("Line " + str(pc) + " isn't a single instruction, and can't be encoded")
+            arguments : list[tuple[str, int] or int] = [(self.CPU.lastState[key][index] if key == "imm" else (key, index)) for key, index in line.instructions[0][1]]
+            words.append(self._encode(names[0], arguments, pc))
+        return words
+
+    def _encode(self, name : str, arguments : list[tuple[str, int] or int], pc : int) -> int:
+        """Takes in an instruction name, it's arguments as ('x', index) registers or int immediates, and it's pc. Returns it's RV32I instruction word"""
+        def register(argument : tuple[str, int] or int) -> int:
+            if argument == 0: #compairing with 0 is compairing with x0
+                return 0
+            if type(argument) is not tuple or argument[0] != "x":
+                raise Exception("'" + name + "' at line " + str(pc) + " takes 'x' registers, got " + str(argument))
+            return argument[1]
+
+        def immediate(argument : tuple[str, int] or int, low : int, high : int) -> int:
+            if type(argument) is not int:
+                raise Exception("'" + name + "' at line " + str(pc) + " takes an immediate, got " + str(argument))
+            signed : int = argument - 2**32 if argument >= 2**31 else argument
+            if not (low <= signed < high):
+                raise Exception("'" + name + "' at line " + str(pc) + " immediate " + str(signed) + " doesn't fit in [" + str(low) + ", " + str(high) + ")")
+            return signed
+
+        if name == "halt":
+            return self._ecall
+        elif name in self._encodingR:
+            funct3, funct7 = self._encodingR[name]
+            des, a, b = arguments
+            return funct7 << 25 | register(b) << 20 | register(a) << 15 | funct3 << 12 | register(des) << 7 | self._opcodeR
+        elif name in self._encodingI:
+            des, a, imm = arguments
+            return (immediate(imm, -2**11, 2**11) & 0xFFF) << 20 | register(a) << 15 | self._encodingI[name] << 12 | register(des) << 7 | self._opcodeI
+        elif name in self._encodingShift:
+            funct3, funct7 = self._encodingShift[name]
+            des, a, imm = arguments
+            return funct7 << 25 | immediate(imm, 0, 32) << 20 | register(a) << 15 | funct3 << 12 | register(des) << 7 | self._opcodeI
+        elif name in self._encodingB:
+            a, b, pointer = arguments
+            offset : int = immediate((pointer - pc) * 4 & 0xFFFFFFFF, -2**12, 2**12) & 0x1FFF #in bytes, 4 per instruction
+            return (offset >> 12 & 1) << 31 | (offset >> 5 & 0x3F) << 25 | register(b) << 20 | register(a) << 15 | self._encodingB[name] << 12 | (offset >> 1 & 0xF) << 8 | (offset >> 11 & 1) << 7 | self._opcodeB
+        raise Exception("'" + name + "' at line " + str(pc) + " has no RV32I encoding")
+
+    def _fields(self, word : int) -> tuple[str, list[tuple[str, int] or int]]:
+        """Takes in an RV32I instruction word. Returns it's instruction name, and it's arguments as ('x', index) registers or int immediates (branches have the signed offset in instructions)"""
+        assert type(word) is int
+        assert 0 <= word < 2**32
+
+        opcode : int = word & 0x7F
+        rd : int = word >> 7 & 0x1F
+        funct3 : int = word >> 12 & 0x7
+        rs1 : int = word >> 15 & 0x1F
+        rs2 : int = word >> 20 & 0x1F
+        funct7 : int = word >> 25
+
+        if word == self._ecall:
+            return ("halt", [])
+        elif opcode == self._opcodeR:
+            for name, encoding in self._encodingR.items():
+                if encoding == (funct3, funct7):
+                    return (name, [("x", rd), ("x", rs1), ("x", rs2)])
+        elif opcode == self._opcodeI:
+            for name, encoding in self._encodingShift.items():
+                if encoding == (funct3, funct7):
+                    return (name, [("x", rd), ("x", rs1), rs2])
+            for name, encoding in self._encodingI.items():
+                if encoding == funct3:
+                    return (name, [("x", rd), ("x", rs1), (word >> 20) - (2**12 if word >> 31 else 0)])
+        elif opcode == self._opcodeB:
+            offset : int = (word >> 31) << 12 | (word >> 7 & 1) << 11 | (word >> 25 & 0x3F) << 5 | (word >> 8 & 0xF) << 1
+            offset -= 2**13 if word >> 31 else 0
+            for name, encoding in self._encodingB.items():
+                if encoding == funct3:
+                    return (name, [("x", rs1), ("x", rs2), offset // 4])
+        raise Exception("Instruction word " + hex(word) + " isn't a supported RV32I instruction")
+
+    def decode(self, word : int, CPU : CPUsim = None) -> "CPUsim._decodedLine":
+        """Takes in an RV32I instruction word, and the CPU to decode it for (self.CPU by default, IE: a clone). Returns it as a decoded line (see 'class CPUsim._decodedLine'). Immediates are added to that CPU's 'imm' constant pool as needed
+
+        Branches become 'def RiscVISA.opBranch', so the decoded line doesn't depend on where the word is, IE: can be cached by word (see 'def fetch')
+        """
+        if CPU == None:
+            CPU = self.CPU
+        name, arguments = self._fields(word)
+
+        constants : dict[int, int] = self._constants.get(CPU)
+        if constants is None: #a clone starts with a copy of the pool it was cloned from
+            constants = self._constants[CPU] = {value : index for index, value in CPU.lastState["imm"].items()}
+
+        immediates : list[int] = []
+        resolved : list[tuple[str, int]] = []
+        for argument in arguments:
+            if type(argument) is int:
+                value : int = argument & 0xFFFFFFFF
+                if value not in constants:
+                    constants[value] = len(CPU.config["imm"])
+                    CPU.configConfigRegister("imm", constants[value], 32, note="SPECIAL")
+                    CPU.lastState["imm"][constants[value]] = value
+                immediates.append(constants[value])
+                resolved.append(("imm", constants[value]))
+            else:
+                resolved.append(argument)
+
+        if name in self._encodingB:
+            instruction : tuple[Callable, tuple] = (CPU.userInstructionSet.opBranch, (self._branchModes[name], *resolved))
+        else:
+            instruction : tuple[Callable, tuple] = (CPU._instructionSet[name], tuple(resolved))
+        return CPUsim._decodedLine(0, tuple(immediates), (instruction,)) #words have no source code line
+
+    def fetch(self, CPU : CPUsim, pc : int) -> "CPUsim._decodedLine":
+        """Takes in the running CPU (self.CPU, or a clone of it) and the program counter, reads the (little endian) instruction word at m[4 * pc] of that CPU, returns it decoded. Returns None past the end of 'm'. See 'def loadBinary'
 
-        resets CPU Flags to zero (if there are CPU Flags)
-        resets x0 to zero
+        Words are decoded once per CPU, then looked up in a cache keyed by the word. A store that changes an instruction changes the word, so the cache never returns a stale decoding
         """
-        assert type(currentState) is dict
+        memory = CPU.lastState["m"]
+        address : int = 4 * pc
+        if address + 4 > len(memory):
+            return None
+        word : int = memory[address] | memory[address + 1] << 8 | memory[address + 2] << 16 | memory[address + 3] << 24
 
-        oldState = copy.deepcopy(currentState)
-        newState = copy.deepcopy(currentState)
-        
-        oldState["x"][0] = 0 #resets x0 to zero
+        cache : dict[int, CPUsim._decodedLine] = self._decodeCaches.get(CPU)
+        if cache is None:
+            cache = self._decodeCaches[CPU] = {}
+        line : CPUsim._decodedLine = cache.get(word)
+        if line is None:
+            line = self.decode(word, CPU)
+            cache[word] = line
+        return line
 
-        if 'flag' in oldState.keys():
-            for i in newState['flag'].keys():
-                newState['flag'][i] = 0
-        newState['imm'] = {}
+    def loadBinary(self, words : list[int]):
+        """Takes in RV32I instruction words (IE: from 'def assemble'), writes them into 'm' (4 bytes each, little endian) from address 0, and sets the program counter to 0
 
-        return (oldState, newState)
+        CPU.run() then fetches and decodes every instruction from 'm' (see 'def fetch', 'CPUsim.configSetFetch') instead of running a parse tree.
+        The program counter counts instructions, IE: the word at pc is m[4 * pc]
+        """
+        assert type(words) is list
+        assert all([type(i) is int and 0 <= i < 2**32 for i in words])
+
+        if len(words) * 4 > len(self.CPU.state["m"]):
+            raise Exception("Program is too large to fit into memory array")
+
+        for address, word in enumerate(words):
+            for i in range(4):
+                self.CPU.state["m"][4 * address + i] = word >> (8 * i) & 0xFF
+
+        #the disassembly stands in for source code, for the display and profiler
+        self.CPU.engine["sourceCode"] = self.disassemble(words)
+        self.CPU.engine["instructionArray"] = []
+        for pc, word in enumerate(words):
+            line : CPUsim.ParseDefault.Node = CPUsim.ParseDefault.Node("line", None, pc, 0)
+            line.append(CPUsim.ParseDefault.Node("namespace", self._fields(word)[0], pc, 0))
+            self.CPU.engine["instructionArray"].append(line)
+        self._startFetch(0)
+        self.CPU.engine["decodedArray"] = [self.decode(word) for word in words]
+
+    def loadImage(self, path : str, base : int = 0, imageFormat : str = None):
+        """Takes in the path of a flat binary (IE: RV32I instruction words, little endian) or hex (one byte per value) image file, loads it into 'm' from byte address base (see 'CPUsim.loadImage'). Runs it from base, the same as 'def loadBinary'
+
+        Words are only decoded once they are fetched, so data in the image is never decoded. The display shows "Instruction Not Found" instead of source code
+        """
+        assert type(base) is int
+        assert base % 4 == 0
+
+        self.CPU.loadImage(path, "m", base, imageFormat)
+
+        self.CPU.engine["sourceCode"] = ""
+        self.CPU.engine["instructionArray"] = [None] * (len(self.CPU.lastState["m"]) // 4)
+        self._startFetch(base // 4)
+        self.CPU.engine["decodedArray"] = [None] * (len(self.CPU.lastState["m"]) // 4)
+
+    def _startFetch(self, pc : int):
+        """Forgets the loaded program's constant pool and decodings, sets the program counter, and turns on 'def fetch'"""
+        self.CPU._unshareConfig() #the config may still be shared with a clone
+        self.CPU.lastState["imm"].clear()
+        self.CPU.config["imm"] = {}
+        self._decodeCaches = weakref.WeakKeyDictionary()
+        self._constants = weakref.WeakKeyDictionary()
+
+        self.CPU.engine["labels"] = {}
+        self.CPU.engine["optimizedArray"] = None
+
+        self.CPU.state["pc"][0] = pc
+        self.CPU.configSetFetch(self.fetch)
+
+    def disassemble(self, words : list[int]) -> str:
+        """Takes in RV32I instruction words, returns them as source code (one line per word, branch targets as instruction indexes), that CPU.linkAndLoad() can load"""
+        lines : list[str] = []
+        for pc, word in enumerate(words):
+            name, arguments = self._fields(word)
+            if name in self._encodingB:
+                arguments[2] = pc + arguments[2]
+            lines.append((name.ljust(8) + ", ".join([("x[" + str(i[1]) + "]" if type(i) is tuple else str(i & 0xFFFFFFFF)) for i in arguments])).strip())
+        return "\n".join(lines)
 
     class RiscVISA(CPUsim.InstructionSetDefault):
         def __init__(self):
@@ -3449,6 +5743,18 @@ class RiscV:
         
             newState['pc'][0] = oldState['pc'][0] + 1
 
+        def opBranch(self, oldState, newState, config, engine, mode : str, a, b, offset):
+            """Same as 'def opJump', but jumps offset (an 'imm' register, two's compliment) instructions from the program counter, instead of to an address. See 'def RiscV.decode'"""
+            assert type(offset) is tuple and len(offset) == 2
+
+            mask : int = 2**config['pc'][0]['bitLength'] - 1
+            target : int = (oldState['pc'][0] + oldState[offset[0]][offset[1]]) & mask
+            if {"==" : oldState[a[0]][a[1]] == oldState[b[0]][b[1]], "!=" : oldState[a[0]][a[1]] != oldState[b[0]][b[1]],
+                    "<" : oldState[a[0]][a[1]] < oldState[b[0]][b[1]], ">=" : oldState[a[0]][a[1]] >= oldState[b[0]][b[1]]}[mode]:
+                newState['pc'][0] = target
+            else:
+                newState['pc'][0] = oldState['pc'][0] + 1
+
     class RiscVParser(CPUsim.ParseDefault):
 
         def parseCode(self, sourceCode : str) -> tuple["Node", dict[str, "Node"]]:
@@ -3561,31 +5867,41 @@ class RiscV:
             for i in self._tokenize(sourceCode):
                 root.append(self.Node("token", i[0], i[1], i[2]))
 
-            logging.debug(debugHelper(inspect.currentframe()) + "this is the original code: " + "\n" + repr(sourceCode))
-            logging.debug(debugHelper(inspect.currentframe()) + "tokenized code: " + "\n" + str(root))
+            debug : bool = logging.getLogger().isEnabledFor(logging.DEBUG) #see 'def CPUsim.ParseDefault.parseCode'
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "this is the original code: " + "\n" + repr(sourceCode))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "tokenized code: " + "\n" + str(root))
 
             #Note: at this point, rules do operations on the Node Tree, but the depth of the Node Tree remains 2
 
             root = self.ruleFilterLineComments(root, "#")
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleFilterLineComments: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleFilterLineComments: " + "\n" + str(root))
 
             root = self.ruleStringSimple(root)
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleStringSimple: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleStringSimple: " + "\n" + str(root))
 
             root = self.ruleApplyAlias(root, self.alias)
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleApplyAlias: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleApplyAlias: " + "\n" + str(root))
 
             root = self.ruleLowerCase(root)
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleLowerCase: " + "\n" + str(root))            
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleLowerCase: " + "\n" + str(root))            
 
             root = self.ruleRemoveLeadingWhitespace(root, [" ", "\t"])
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleRemoveLeadingWhitespace: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleRemoveLeadingWhitespace: " + "\n" + str(root))
 
             root = self.ruleRemoveEmptyLines(root)
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleRemoveEmptyLines: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleRemoveEmptyLines: " + "\n" + str(root))
 
             root, self.labels = self.ruleFindLabels(root)
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleFindLabels: " + "\n" + str(root) + "\nlabels: " + str(self.labels))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleFindLabels: " + "\n" + str(root) + "\nlabels: " + str(self.labels))
             i = 0
             while i < len(root.child): #removes the label nodes, as they don't need to be executed
                 if root.child[i].type == "label":
@@ -3594,30 +5910,37 @@ class RiscV:
                     i += 1
             
             root = self.ruleLabelNamespace(root, self.nameSpace)
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleLabelNamespace: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleLabelNamespace: " + "\n" + str(root))
 
             root = self.ruleRemoveToken(root, " ", False)
             root = self.ruleRemoveToken(root, "\t", False)
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleRemoveToken: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleRemoveToken: " + "\n" + str(root))
 
             root = self.ruleCastInts(root)
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleCastInts: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleCastInts: " + "\n" + str(root))
 
             root = self.ruleCastHex(root)
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleCastHex: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleCastHex: " + "\n" + str(root))
 
             #This is where the Node Tree is allowed to go to depth > 2
             root = self.ruleContainer(root, {"(":")", "[":"]"})
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleContainer: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleContainer: " + "\n" + str(root))
 
             root = self.ruleNestContainersIntoInstructions(root, self.nameSpace, True)
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleNestContainersIntoInstructions: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleNestContainersIntoInstructions: " + "\n" + str(root))
 
             temp : list[self.Node] = self.ruleSplitLines(root, "line", "\n")
             root = self.Node("root")
             for i in temp:
                 root.append(i)
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleSplitLines: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleSplitLines: " + "\n" + str(root))
 
             #removes empty lines/empty line nodes
             i = 0
@@ -3626,16 +5949,19 @@ class RiscV:
                     root.remove(root.child[i])
                 else:
                     i += 1
-            logging.debug(debugHelper(inspect.currentframe()) + "remove empty line nodes: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "remove empty line nodes: " + "\n" + str(root))
 
             temp = root.copyInfo()
             for i in root.child:
                 temp.append(self.ruleContainerTokensFollowingInstruction(i, self.nameSpace))
             root = temp                            
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleContainerTokensFollowingInstruction: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleContainerTokensFollowingInstruction: " + "\n" + str(root))
 
             root = self.ruleSplitTokens(root, "argument", ',', True)
-            logging.debug(debugHelper(inspect.currentframe()) + "ruleSplitTokens: " + "\n" + str(root))
+            if debug:
+                logging.debug(debugHelper(inspect.currentframe()) + "ruleSplitTokens: " + "\n" + str(root))
 
             return root, self.labels
 
@@ -3692,6 +6018,23 @@ class RiscV:
 
             return root
 
+class DisplayRecord:
+    """A display for unittests, that records every frame instead of printing it (see 'def CPUsim.configSetDisplay')
+
+    record is called with the same arguments as runtime, and what it returns is appended to frames. By default it records the tick
+    """
+
+    def __init__(self, record : Callable = None):
+        self.record : Callable = record if record != None else (lambda oldState, newState, config, stats, engine : engine["tick"])
+        self.frames : list = []
+        self.postrunCalls : int = 0
+
+    def runtime(self, oldState : dict, newState : dict, config : dict, stats : dict = None, engine : dict = None):
+        self.frames.append(self.record(oldState, newState, config, stats, engine))
+
+    def postrun(self, oldState : dict, newState : dict, config : dict, stats : dict = None, engine : dict = None):
+        self.postrunCalls += 1
+
 class TestDefault(unittest.TestCase):
     def testDefaultInitialization(self):
         """Tests Default initialization by reading/writing to registers and memory. Attempt initialization with multiple bitLengths"""
@@ -3724,72 +6067,700 @@ class TestDefault(unittest.TestCase):
                 CPU = CPUsim(bitLength, defaultSetup = False)
                 CPU.configSetDisplay(CPU.DisplaySilent())
 
-                CPU.configAddRegister('r', bitLength, 8)
-                CPU.configAddRegister('m', bitLength, 8, show=False)
+                CPU.configAddRegister('r', bitLength, 8)
+                CPU.configAddRegister('m', bitLength, 8, show=False)
+
+                CPU.linkAndLoad(program)
+
+                a : list[int] = [random.randint(0, 2**(bitLength - 1) - 1) for _ in range(4)] #generates numbers that are half the max storable size of a register with the given bitLength
+
+                for i, j in enumerate(a):
+                    CPU.inject('r', i, j)
+                
+                CPU.run()
+                
+                self.assertEqual(
+                    a[0] + a[1],
+                    CPU.extract('r', 4),
+                    ("input = " + str(a)).ljust(32) + ("Expected = " + str(a[0] + a[1])).ljust(16) + ("Got = " + str(CPU.extract('r', 4)))
+                )
+                self.assertEqual(
+                    a[2] + a[3],
+                    CPU.extract('r', 5),
+                    ("input = " + str(a)).ljust(32) + ("Expected = " + str(a[2] + a[3])).ljust(16) + ("Got = " + str(CPU.extract('r', 5)))
+                )
+
+    def testVLIW_multipleInstructionType(self):
+        """Tests for VLIW (Very long instruction word) support, with multiple instruction types per line"""
+        program : str = "add(r[4], r[0], r[1]), and(r[5], r[0], r[1]), or(r[6], r[0], r[1]), xor(r[7], r[0], r[1]) \n halt"
+
+        bitLength : int
+        for bitLength in [4, 8, 16]:
+            with self.subTest(bitLength=bitLength):
+                CPU = CPUsim(bitLength, defaultSetup = False)
+                CPU.configSetDisplay(CPU.DisplaySilent())
+
+                CPU.configAddRegister('r', bitLength, 8)
+                CPU.configAddRegister('m', bitLength, 8, show=False)
+
+                CPU.linkAndLoad(program)
+
+                a : list[int] = [random.randint(0, 2**(bitLength - 1) - 1) for _ in range(2)] #generates numbers that are half the max storable size of a register with the given bitLength
+
+                for i, j in enumerate(a):
+                    CPU.inject('r', i, j)
+                
+                CPU.run()
+                
+                self.assertEqual(
+                    a[0] + a[1],
+                    CPU.extract('r', 4),
+                    ("input = " + str(a)).ljust(32) + ("Expected = " + str(a[0] + a[1])).ljust(16) + ("Got = " + str(CPU.extract('r', 4)))
+                )
+                self.assertEqual(
+                    a[0] & a[1],
+                    CPU.extract('r', 5),
+                    ("input = " + str(a)).ljust(32) + ("Expected = " + str(a[0] & a[1])).ljust(16) + ("Got = " + str(CPU.extract('r', 5)))
+                )
+                self.assertEqual(
+                    a[0] | a[1],
+                    CPU.extract('r', 6),
+                    ("input = " + str(a)).ljust(32) + ("Expected = " + str(a[0] | a[1])).ljust(16) + ("Got = " + str(CPU.extract('r', 6)))
+                )
+                self.assertEqual(
+                    a[0] ^ a[1],
+                    CPU.extract('r', 7),
+                    ("input = " + str(a)).ljust(32) + ("Expected = " + str(a[0] ^ a[1])).ljust(16) + ("Got = " + str(CPU.extract('r', 7)))
+                )
+
+
+class TestDefaultDecoding(unittest.TestCase):
+    def testDecodedArray(self):
+        """Tests that linkAndLoad lowers every instruction line into pre-bound instructions, with labels and ints resolved to 'imm' registers of one de-duplicated constant pool"""
+        program : str = "loop: add(r[2], r[0], 1), jump(loop) \n add(r[3], r[1], 1) \n halt"
+
+        CPU = CPUsim(8, defaultSetup = False)
+        CPU.configSetDisplay(CPU.DisplaySilent())
+
+        CPU.configAddRegister('r', 8, 4)
+        CPU.configAddRegister('m', 8, 8, show=False)
+
+        CPU.linkAndLoad(program)
+
+        decodedArray : list = CPU.engine["decodedArray"]
+        self.assertEqual(len(decodedArray), len(CPU.engine["instructionArray"]))
+
+        self.assertEqual(CPU.lastState['imm'], {0 : 1, 1 : 0})
+        self.assertEqual(CPU.config['imm'][1]['note'], "SPECIAL")
+
+        line = decodedArray[0]
+        self.assertEqual(line.immediates, (0, 1))
+        self.assertEqual([arguments for operation, arguments in line.instructions], [(('r', 2), ('r', 0), ('imm', 0)), (('imm', 1),)])
+
+        line = decodedArray[1]
+        self.assertEqual(line.immediates, (0,), "the constant 1 is shared with the first line")
+        self.assertEqual([arguments for operation, arguments in line.instructions], [(('r', 3), ('r', 1), ('imm', 0))])
+
+        line = decodedArray[2]
+        self.assertEqual(line.immediates, ())
+        self.assertEqual(len(line.instructions), 1)
+
+    def testOptimizer(self):
+        """Tests the peephole pass gives the same registers and ticks as the unoptimized program, with fewer lines executed"""
+        program : str = """
+                            jump(a)
+                    a:      jump(b)
+                    b:      jump(loop)
+                    loop:   jumpEQ(end, r[0], 0)
+                                and(r[1], r[0], 1)
+                                jumpNE(zero, r[1], 1)
+                                    add(r[3], r[2], r[3])
+                    zero:       shiftL(r[2], r[2])
+                                jump(next)
+                    next:       shiftR(r[0], r[0])
+                                jump(loop)
+                    end:    halt
+                    """
+
+        results : list[tuple] = []
+        for optimize in (False, True):
+            CPU = CPUsim(16)
+            display = DisplayRecord()
+            CPU.configSetDisplay(display)
+            CPU.configSetProfiler(True)
+            CPU.configSetOptimizer(optimize)
+            CPU.linkAndLoad(program)
+            CPU.inject('r', 0, 0b1011)
+            CPU.inject('r', 2, 7)
+            CPU.run()
+            self.assertFalse(CPU.engine["run"])
+            results.append((CPU.engine["tick"], dict(CPU.lastState['r']), len(display.frames), CPU.profile()["pc"]))
+
+        (tick, registers, steps, pcs), (optimizedTick, optimizedRegisters, optimizedSteps, optimizedPcs) = results
+        self.assertEqual(registers[3], 0b1011 * 7)
+        self.assertEqual(optimizedRegisters, registers)
+        self.assertEqual(optimizedTick, tick)
+        self.assertEqual(optimizedPcs, pcs, "fused lines credit every line they replace")
+        self.assertLess(optimizedSteps, steps)
+
+        optimizedArray : list = CPU.engine["optimizedArray"]
+        self.assertEqual(optimizedArray[0].ticks, 3, "jump chain a, b, loop")
+        self.assertEqual(CPU.lastState['imm'][optimizedArray[0].instructions[0][1][0][1]], 3)
+        self.assertIs(optimizedArray[4].instructions[0][0].__func__, CPU.InstructionSetDefault.opANDJump)
+        self.assertEqual(optimizedArray[4].ticks, 2)
+        self.assertIs(optimizedArray[5], CPU.engine["decodedArray"][5], "jumps into the middle of a fused pair still run the original line")
+        self.assertIs(optimizedArray[8].instructions[0][0], CPU._opSkip)
+
+        CPU = CPUsim(16)
+        CPU.configSetDisplay(CPU.DisplaySilent())
+        CPU.configSetOptimizer(True)
+        CPU.linkAndLoad("loop: jump(again) \n again: jump(loop)")
+        CPU.run(cycleLimit = 9)
+        self.assertEqual(CPU.engine["tick"], 9, "a jump chain that loops forever still stops at cycleLimit")
+        self.assertEqual(CPU.engine["optimizedArray"][0].ticks, 2)
+
+    def testReadOnlyState(self):
+        """Tests that instructions are handed read only views of the live registers and config, so replacing a register bank raises"""
+        seen : list[tuple] = []
+        def opPeek(oldState, newState, config, engine):
+            seen.append((oldState['r'][0], config['r'][0]['bitLength']))
+            newState['pc'][0] = oldState['pc'][0] + 1
+        def opReplace(oldState, newState, config, engine):
+            oldState['r'] = {}
+
+        instructionSet = CPUsim.InstructionSetDefault()
+        instructionSet.instructionSet["peek"] = opPeek
+        instructionSet.instructionSet["replace"] = opReplace
+
+        CPU = CPUsim(8)
+        CPU.configSetDisplay(CPU.DisplaySilent())
+        CPU.configSetInstructionSet(instructionSet)
+        CPU.linkAndLoad("add(r[0], r[0], 5) \n peek \n replace \n halt")
+        self.assertRaises(TypeError, CPU.run)
+        self.assertEqual(seen, [(5, 8)], "reads see the committed registers")
+        self.assertEqual(CPU.engine["tick"], 2)
+        self.assertEqual(dict(CPU.lastState['r'])[0], 5)
+
+
+class TestDefaultRegisterFile(unittest.TestCase):
+    def testRegisterFileVersioned(self):
+        """Tests that writes to the register file overlay only reach the base state on commit"""
+        base : dict = {'r' : {0 : 1, 1 : 2}, 'flag' : {'carry' : 0}}
+        state = CPUsim.RegisterFileVersioned(base)
+
+        state['r'][0] = 5
+        state['flag']['carry'] = 1
+        self.assertEqual(state['r'][0], 5)
+        self.assertEqual(base['r'][0], 1, "base should not see writes before commit")
+        self.assertEqual(sorted(state['r'].keys()), [0, 1])
+        self.assertEqual(state.materialize(), {'r' : {0 : 5, 1 : 2}, 'flag' : {'carry' : 1}})
+
+        committed : dict = state.commit()
+        self.assertEqual(committed, {'r' : {0 : 5}, 'flag' : {'carry' : 1}})
+        self.assertEqual(base, {'r' : {0 : 5, 1 : 2}, 'flag' : {'carry' : 1}})
+        self.assertEqual(state.commit(), {}, "nothing written since last commit")
+
+    def testRegisterBankArray(self):
+        """Tests that compact register banks behave like the dictionary register banks"""
+        bank = CPUsim.RegisterBankArray()
+        bank.addRegisters(4, 8)
+        bank.addRegister('carry', 1)
+
+        self.assertEqual(list(bank.keys()), [0, 1, 2, 3, 'carry'])
+        bank[2] = 0x1FF
+        bank['carry'] = 3
+        self.assertEqual((bank[2], bank['carry']), (0xFF, 1), "values should be masked to their bitLength")
+        self.assertRaises(KeyError, bank.__setitem__, 4, 1)
+
+        bank.setBitLength(3, 80) #wider than any array typecode
+        bank[3] = 2**80 - 1
+        self.assertEqual(bank[3], 2**80 - 1)
+        self.assertEqual(bank[2], 0xFF)
+
+    def testCompactRegisters(self):
+        """Tests reading/writing and running a program with compact register banks, including converting an existing register bank"""
+        program : str = "add(r[2], r[0], r[1]) \n halt"
+
+        bitLength : int
+        for bitLength in [4, 8, 16, 32, 64, 128]:
+            with self.subTest(bitLength = bitLength):
+                CPU = CPUsim(bitLength)
+                CPU.configSetDisplay(CPU.DisplaySilent())
+                CPU.configAddRegister('r', bitLength, 8, compact = True) #converts the default 'r' registers
+                CPU.configAddRegister('m', bitLength, 1024, show = False, compact = True)
+                self.assertIs(type(CPU.lastState['m']), CPU.RegisterBankArray)
+                self.assertEqual(len(CPU.state['m']), 1024)
+
+                CPU.linkAndLoad(program)
+
+                a : int = random.randint(0, 2**(bitLength - 1) - 1)
+                b : int = random.randint(0, 2**(bitLength - 1) - 1)
+                CPU.inject('r', 0, a)
+                CPU.inject('r', 1, b)
+                CPU.inject('m', 1023, 2**bitLength - 1)
+                CPU.run()
+
+                self.assertEqual(CPU.extract('r', 2), a + b)
+                self.assertEqual(CPU.extract('m', 1023), 2**bitLength - 1)
+                self.assertEqual(CPU.config['m'][1023]['bitLength'], bitLength)
+
+    def testClone(self):
+        """Tests that a clone runs the loaded program without changing the original, and that reconfiguring a clone doesn't change the original's config"""
+        program : str = "add(r[2], r[0], r[1]), add(m[0], m[0], 1) \n halt"
+
+        CPU = CPUsim(8)
+        CPU.configSetDisplay(CPU.DisplaySilent())
+        CPU.configAddRegister('m', 8, 64, compact = True)
+        CPU.linkAndLoad(program)
+        CPU.inject('r', 0, 3)
+
+        clones : list[CPUsim] = [CPU.clone() for _ in range(4)]
+        for i, clone in enumerate(clones):
+            clone.inject('r', 1, i)
+            clone.run()
+        for i, clone in enumerate(clones):
+            self.assertEqual(clone.extract('r', 2), 3 + i)
+            self.assertEqual(clone.extract('m', 0), 1)
+        self.assertEqual(CPU.extract('r', 2), 0, "original should not be changed by running a clone")
+        self.assertEqual(CPU.extract('m', 0), 0)
+
+        clones[0].configConfigRegister('r', 2, bitLength = 2)
+        clones[0].configConfigRegister('m', 5, bitLength = 2)
+        self.assertEqual(CPU.config['r'][2]['bitLength'], 8)
+        self.assertEqual(CPU.config['m'][5]['bitLength'], 8)
+
+        CPU.run()
+        self.assertEqual(CPU.extract('r', 2), 3)
+
+    def testHardwiredRegisters(self):
+        """Tests that writes to hardwired registers are dropped, and auto cleared registers are reset every tick, with the default and a custom post cycle function"""
+        for custom in (False, True):
+            with self.subTest(custom = custom):
+                CPU = CPUsim(8)
+                CPU.configSetDisplay(CPU.DisplaySilent())
+                CPU.configConfigRegister('r', 7, hardwired=True)
+                CPU.configConfigRegister('r', 6, autoClear=True)
+                if custom:
+                    CPU.configSetPostCycleFunction(lambda state : (copy.deepcopy(state), copy.deepcopy(state)))
+                self.assertEqual(CPU._autoClear, {'flag' : ['carry'], 'r' : [6]})
+                self.assertTrue(CPU.config['r'][7]['hardwired'])
+                self.assertFalse(CPU.config['r'][0]['hardwired'])
+
+                CPU.inject('r', 7, 5)
+                self.assertEqual(CPU.extract('r', 7), 0, "inject is dropped too")
+
+                CPU.linkAndLoad("add(r[7], r[7], 9) \n add(r[6], r[6], 3) \n add(r[0], r[7], r[6]) \n add(r[1], r[6], 0) \n add(r[2], 255, 1) \n halt")
+                CPU.run()
+                self.assertEqual(CPU.extract('r', 7), 0)
+                self.assertEqual(CPU.extract('r', 0), 3, "r[6] is only reset after the tick it was read in")
+                self.assertEqual(CPU.extract('r', 1), 0)
+                self.assertEqual(CPU.extract('r', 6), 0)
+                self.assertEqual(CPU.extract('flag', 'carry'), 0)
+
+                CPU.configConfigRegister('r', 7, hardwired=False)
+                CPU.inject('r', 7, 5)
+                self.assertEqual(CPU.extract('r', 7), 5)
+                self.assertEqual(CPU.clone().state.hardwired, {})
+
+    def testPostCycleFlags(self):
+        """Tests that every flag is reset after each tick, auto cleared or not, with the default post cycle function and a custom one that calls it"""
+        for custom in (False, True):
+            with self.subTest(custom = custom):
+                CPU = CPUsim(8)
+                CPU.configSetDisplay(CPU.DisplaySilent())
+                CPU.configConfigRegister('flag', 'zero', bitLength=1)
+                if custom:
+                    CPU.configSetPostCycleFunction(lambda state : CPU._postCycleUserDefault(state))
+                self.assertNotIn('zero', CPU._autoClear['flag'])
+
+                CPU.linkAndLoad("add(r[0], r[0], 1) \n add(r[1], r[1], 1) \n halt")
+                CPU.inject('flag', 'zero', 1)
+                CPU.run()
+                self.assertEqual(CPU.extract('flag', 'zero'), 0)
+
+
+class TestDefaultBulkAccess(unittest.TestCase):
+    def testInjectRange(self):
+        """Tests writing and reading ranges of registers as bytes, arrays, lists and memoryviews, in compact and plain register banks"""
+        values : array.array = array.array('H', range(1000, 1064))
+        packed : bytes = b"".join(value.to_bytes(2, "little") for value in values)
+
+        for compact in (True, False):
+            with self.subTest(compact = compact):
+                CPU = CPUsim(8)
+                CPU.configSetDisplay(CPU.DisplaySilent())
+                CPU.configAddRegister('w', 16, 128, compact = compact)
+                CPU.configAddRegister('v', 12, 8, compact = compact)
+
+                self.assertEqual(CPU.injectRange('w', 0, packed), 64)
+                self.assertEqual(CPU.injectRange('w', 64, values), 64)
+                self.assertEqual(list(CPU.extractRange('w', 0, 128)), list(values) * 2)
+                self.assertEqual(CPU.injectRange('w', 10, [7, 8, 2**16 + 9]), 3) #cut down to 16 bits
+                self.assertEqual(list(CPU.extractRange('w', 9, 5)), [1009, 7, 8, 9, 1013])
+                with memoryview(values) as view:
+                    CPU.injectRange('w', 100, view[:4])
+                self.assertEqual(list(CPU.extractRange('w', 100, 4)), [1000, 1001, 1002, 1003])
+                self.assertEqual(CPU.extractRange('w', 0, 2).itemsize, 2)
+
+                CPU.injectRange('v', 0, b"\xff\xff\x34\x12") #2 bytes per register, masked to 12 bits
+                self.assertEqual(list(CPU.extractRange('v', 0, 2)), [0xFFF, 0x234])
+
+                CPU.inject('w', 2, 5) #uncommitted writes, one replaced by injectRange and one shown by extractRange
+                CPU.inject('w', 70, 6)
+                CPU.injectRange('w', 0, [1, 2, 3])
+                self.assertEqual(list(CPU.extractRange('w', 0, 3)) + list(CPU.extractRange('w', 70, 1)), [1, 2, 3, 6])
+
+                self.assertRaises(Exception, CPU.injectRange, 'w', 126, [1, 2, 3])
+                self.assertRaises(Exception, CPU.injectRange, 'w', 0, b"\x01\x02\x03")
+
+    def testLoadImage(self):
+        """Tests loading binary and hex image files into compact, wide, and plain register banks"""
+        import tempfile # used for temporary image files
+        image : bytes = random.randbytes(2**20)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path : str = os.path.join(directory, "image.bin")
+            with open(path, "wb") as file:
+                file.write(image)
+
+            CPU = CPUsim(8)
+            CPU.configSetDisplay(CPU.DisplaySilent())
+            CPU.configAddRegister('m', 8, 2**20 + 16, compact = True)
+            CPU.inject('m', 20, 1) #an uncommitted write, replaced by the image
+            self.assertEqual(CPU.loadImage(path, base = 16), 2**20)
+            self.assertEqual([CPU.extract('m', i) for i in (15, 16, 20, 2**20 + 15)], [0, image[0], image[4], image[-1]])
+            self.assertRaises(Exception, CPU.loadImage, path, 'm', 17)
+
+            CPU = CPUsim(8)
+            CPU.configSetDisplay(CPU.DisplaySilent())
+            CPU.configAddRegister('w', 12, 2**19) #2 bytes per register, masked to 12 bits
+            self.assertEqual(CPU.loadImage(path, 'w'), 2**19)
+            self.assertEqual(CPU.extract('w', 1), (image[2] | image[3] << 8) & 0xFFF)
+
+            path = os.path.join(directory, "image.hex")
+            with open(path, "w") as file:
+                file.write("// a comment\n0a 0B\n@4\nf_f 1ff\n")
+            CPU = CPUsim(8)
+            CPU.configSetDisplay(CPU.DisplaySilent())
+            self.assertEqual(CPU.loadImage(path, base = 2), 4)
+            self.assertEqual([CPU.extract('m', i) for i in range(2, 8)], [0x0A, 0x0B, 0, 0, 0xFF, 0xFF])
+
+            with open(path, "w") as file:
+                file.write("0a zz")
+            self.assertRaises(Exception, CPU.loadImage, path)
+            with open(path, "w") as file:
+                file.write("07 08 @fffff 09")
+            self.assertRaises(Exception, CPU.loadImage, path)
+            with open(path, "w") as file:
+                file.write("07 _8")
+            self.assertRaises(Exception, CPU.loadImage, path)
+            self.assertEqual([CPU.extract('m', i) for i in range(2)], [0, 0], "an invalid image loads nothing")
+
+    def testHardwiredRanges(self):
+        """Tests that injectRange and loadImage drop writes to hardwired registers, in compact and plain register banks"""
+        import tempfile # used for temporary image files
+        for compact in (True, False):
+            with self.subTest(compact = compact):
+                CPU = CPUsim(8)
+                CPU.configSetDisplay(CPU.DisplaySilent())
+                CPU.configAddRegister('x', 8, 16, compact = compact)
+                CPU.configConfigRegister('x', 0, hardwired=True)
+
+                self.assertEqual(CPU.injectRange('x', 0, array.array('B', range(5, 21))), 16)
+                self.assertEqual(list(CPU.extractRange('x', 0, 4)), [0, 6, 7, 8])
+                CPU.injectRange('x', 0, [300, 1])
+                self.assertEqual(list(CPU.extractRange('x', 0, 2)), [0, 1])
+
+                with tempfile.TemporaryDirectory() as directory:
+                    path : str = os.path.join(directory, "image.hex")
+                    with open(path, "w") as file:
+                        file.write("ff 0a 0b")
+                    self.assertEqual(CPU.loadImage(path, 'x'), 3)
+                self.assertEqual(list(CPU.extractRange('x', 0, 3)), [0, 10, 11])
+
+
+class TestDefaultDisplay(unittest.TestCase):
+    def testDisplayThrottle(self):
+        """Tests that a throttled display is only called every N ticks, or once on halt, without changing the result"""
+        program : str = "loop: add(r[0], r[0], 1) \n jumpNE(loop, r[0], 0) \n halt" #513 ticks
+
+        for ticks, seconds, expected in [(1, None, 1 + 513), (100, None, 1 + 5 + 1), (0, None, 1 + 1), (1, 3600, 1 + 1)]:
+            with self.subTest(ticks = ticks, seconds = seconds):
+                CPU = CPUsim(8)
+                display = DisplayRecord()
+                CPU.configSetDisplay(display)
+                CPU.configSetDisplayThrottle(ticks, seconds)
+                CPU.linkAndLoad(program)
+                CPU.run(cycleLimit = 2048)
+
+                self.assertEqual(CPU.engine["tick"], 513)
+                self.assertEqual(CPU.extract('r', 0), 0)
+                self.assertEqual(len(display.frames), expected)
+                self.assertEqual(display.postrunCalls, 1)
+
+    def testDisplayIncremental(self):
+        """Tests that the incremental display only redraws changed registers, by comparing the amount printed against 'class DisplaySimpleAndClean'"""
+        import io # used for capturing display output
+        import contextlib # used for capturing display output
+        program : str = "loop: add(r[0], r[0], 1), add(m[200], m[200], 2) \n jumpNE(loop, r[0], 0) \n halt"
+
+        printed : dict[type, str] = {}
+        for display in [CPUsim.DisplaySimpleAndClean, CPUsim.DisplayIncremental]:
+            CPU = CPUsim(8)
+            CPU.configAddRegister('m', 8, 256)
+            CPU.configSetDisplay(display(0))
+            CPU.linkAndLoad(program)
+
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                CPU.run(cycleLimit = 2048)
+            printed[display] = output.getvalue()
+
+            self.assertEqual(CPU.extract('m', 200), 0)
+
+        self.assertEqual(printed[CPUsim.DisplayIncremental].count("\u001b[2J"), 1, "should only clear the screen on the first frame")
+        self.assertLess(len(printed[CPUsim.DisplayIncremental]) * 20, len(printed[CPUsim.DisplaySimpleAndClean]))
+
+    def testDisplayImmediates(self):
+        """Tests that the displays only show the 'imm' registers of the current line, not the whole constant pool"""
+        import io # used for capturing display output
+        import contextlib # used for capturing display output
+        program : str = "add(r[0], r[0], 5) \n add(r[1], r[1], 6), add(r[2], r[2], 6) \n halt"
+
+        for display in [CPUsim.DisplaySimpleAndClean, CPUsim.DisplayIncremental]:
+            with self.subTest(display = display.__name__):
+                CPU = CPUsim(8)
+                CPU.configSetDisplay(display(0))
+                CPU.linkAndLoad(program)
+                self.assertEqual(len(CPU.lastState['imm']), 2)
+
+                output = io.StringIO()
+                with contextlib.redirect_stdout(output):
+                    CPU.run()
+                frames : list[str] = re.sub(r"\x1b\[[0-9;]*[A-Za-z]", " ", output.getvalue()).split("[TICK ")[1:] #without ANSI codes
+                self.assertEqual([frame.count("imm ") for frame in frames], [0, 1, 1, 0], "the repeated 6 is shown once, halt reads no 'imm' registers")
+                self.assertRegex(frames[1], r"imm +\[0\] +\[ 0b +00000101 \]")
+                self.assertRegex(frames[2], r"imm +\[1\] +\[ 0b +00000110 \]")
+
+
+class TestDefaultDebugging(unittest.TestCase):
+    def testTrace(self):
+        """Tests that the registers rebuilt from a trace match the registers seen while running, including evicted and continued records"""
+        import tempfile # used for a temporary trace file
+        program : str = "loop: add(r[0], r[0], 1), add(r[1], r[1], 3), add(m[7], m[7], 5) \n jumpNE(loop, r[0], 0) \n halt"
+
+        with tempfile.TemporaryDirectory() as directory:
+            path : str = os.path.join(directory, "trace.bin")
+
+            CPU = CPUsim(4)
+            display = DisplayRecord(lambda oldState, newState, config, stats, engine : (engine["tick"], {key : dict(newState[key]) for key in newState.keys() if key != "imm"}))
+            CPU.configSetDisplay(display)
+            CPU.configSetTracer(CPU.TraceWriter(path, capacity = 20, slotsPerRecord = 2))
+            CPU.linkAndLoad(program)
+            CPU.run()
+
+            trace = CPUsim.TraceReader(path)
+            records : list[tuple] = list(trace.records())
+            self.assertEqual(trace.ticks(), (20, 32), "the oldest records should be evicted")
+            self.assertEqual(records[-1][1:3], (2, 2), "the last cycle is the halt")
+            self.assertEqual(records[-3], (30, 0, 0, {'pc' : {0 : 1}, 'r' : {0 : 0, 1 : 0}, 'm' : {7 : 0}, 'flag' : {'carry' : 1}}), "5 writes, continued over 3 records")
+
+            for tick in range(20, 33):
+                self.assertEqual(trace.stateAt(tick), dict(display.frames)[tick], "tick " + str(tick))
+            self.assertRaises(Exception, trace.stateAt, 19)
+            trace.close()
+
+    def testRewind(self):
+        """Tests rewinding to earlier ticks against runs stopped at that tick, then resuming to the same result"""
+        program : str = "loop: add(r[0], r[0], 1), add(r[1], r[1], 3), add(m[7], m[7], r[0]) \n jumpNE(loop, r[0], 0) \n halt"
+
+        def load(checkpoints : bool) -> CPUsim:
+            CPU = CPUsim(4)
+            CPU.configSetDisplay(CPU.DisplaySilent())
+            if checkpoints:
+                CPU.configSetCheckpoints(interval = 8, limit = 3)
+            CPU.linkAndLoad(program)
+            CPU.inject('r', 2, 9)
+            return CPU
+        registers = lambda CPU : {key : dict(registers) for key, registers in CPU.state.materialize().items() if key != "imm"}
+
+        CPU = load(True)
+        CPU.run()
+        final : dict = registers(CPU)
+        self.assertEqual(CPU.engine["tick"], 33)
+
+        for tick in [30, 17, 16, 29, 24]: #with limit = 3, only ticks 16 and later are kept
+            with self.subTest(tick = tick):
+                CPU.rewind(tick)
+                expected = load(False)
+                expected.run(cycleLimit = tick)
+                self.assertEqual(registers(CPU), registers(expected))
+
+                CPU.run(resume = True)
+                self.assertEqual(registers(CPU), final)
+                self.assertEqual(CPU.engine["tick"], 33)
+        self.assertRaises(Exception, CPU.rewind, 15)
+
+    def testProfiler(self):
+        """Tests the profiler counts per line, instruction, and loop, and the collapsed stack output"""
+        program : str = "loop: add(r[0], r[0], 1), add(r[1], r[1], 1) \n jumpNE(loop, r[0], 0) \n halt"
+
+        CPU = CPUsim(4)
+        CPU.configSetDisplay(CPU.DisplaySilent())
+        CPU.configSetProfiler()
+        CPU.linkAndLoad(program)
+        CPU.run()
+
+        profile : dict = CPU.profile()
+        self.assertEqual(profile["line"], {0 : 16, 1 : 16, 2 : 1})
+        self.assertEqual(profile["mnemonic"], {"add" : 32, "jumpne" : 16, "halt" : 1})
+        self.assertEqual(profile["loops"], [{"from" : 1, "to" : 0, "lines" : (0, 1), "taken" : 15, "ticks" : 32}])
+        self.assertEqual(CPU.profileCollapsed().splitlines(), [
+            "loop lines 0-1;line 0 loop: add(r[0], r[0], 1), add(r[1], r[1], 1) 16",
+            "loop lines 0-1;line 1 jumpNE(loop, r[0], 0) 16",
+            "line 2 halt 1"
+        ])
+        self.assertIn("jumpne", CPU.stats["profileTable"])
+
+    def testLoopDetection(self):
+        """Tests that infinite loops are stopped early with the right period, and that programs that halt aren't affected"""
+        programs : list[tuple[str, int]] = [
+            ("loop: jump(loop)", 1),
+            ("loop: add(r[0], r[0], 1) \n jump(loop)", 32), #r[0] wraps around every 16 iterations
+            ("add(r[1], r[1], 3) \n loop: add(r[0], r[0], 1) \n jumpNE(loop, r[0], 5) \n jump(loop)", 33), #plus one tick for jump(loop)
+            ("loop: add(r[0], r[0], 1) \n jumpNE(loop, r[0], 0) \n halt", None)
+        ]
+
+        for program, period in programs:
+            with self.subTest(program = program):
+                CPU = CPUsim(4)
+                CPU.configSetDisplay(CPU.DisplaySilent())
+                CPU.configSetLoopDetection()
+                CPU.linkAndLoad(program)
+                CPU.run(cycleLimit = 10000)
+
+                if period == None:
+                    self.assertEqual(CPU.engine["loop"], None)
+                    self.assertEqual(CPU.engine["tick"], 33)
+                else:
+                    self.assertEqual(CPU.engine["loop"]["period"], period)
+                    self.assertLess(CPU.engine["tick"], 4 * period + 8)
+
+
+class TestDefaultHooks(unittest.TestCase):
+    def testHooks(self):
+        """Tests that hooks get every event with it's payload, and stop getting them once removed"""
+        CPU = CPUsim(8)
+        CPU.configSetDisplay(CPU.DisplaySilent())
+        events : list[tuple] = []
+        for event in CPUsim.hookEvents:
+            CPU.configAddHook(event, lambda CPU, *payload, event = event : events.append((event,) + payload))
+
+        code : str = "add(r[0], r[0], 2) \n vliw(add(r[1], 1, 1), nop) \n halt"
+        CPU.linkAndLoad(code)
+        self.assertEqual([i[0] for i in events], ["load", "parse", "link"])
+        self.assertEqual(events[0][1], code)
+        self.assertIs(events[2][2], CPU.engine["decodedArray"])
+
+        events.clear()
+        CPU.run()
+        self.assertEqual([i[0] for i in events if i[0] == "instruction"], ["instruction"] * 4)
+        self.assertEqual([i[1:3] for i in events if i[0] == "tick"], [(0, 0), (1, 1), (2, 2)])
+        self.assertEqual([i for i in events if i[0] == "tick"][0][3]['r'], {0 : 2})
+        self.assertEqual(events[-1], ("halt", 3, True))
+
+        events.clear()
+        clone : CPUsim = CPU.clone()
+        for event in CPUsim.hookEvents:
+            CPU.configRemoveHook(event, CPU._hooks[event][0])
+        CPU.run()
+        self.assertEqual(events, [])
+        clone.run()
+        self.assertNotEqual(events, [], "the clone keeps it's own hooks")
 
+        halts : list[bool] = []
+        CPU = CPUsim(8)
+        CPU.configSetDisplay(CPU.DisplaySilent())
+        CPU.configAddHook("halt", lambda CPU, tick, halted : halts.append(halted))
+        CPU.linkAndLoad("loop: jump(loop)")
+        CPU.run(cycleLimit = 8)
+        CPU.configSetLoopDetection()
+        CPU.run(cycleLimit = 64)
+        self.assertNotEqual(CPU.engine["loop"], None)
+        CPU.configSetLoopDetection(False)
+
+        async def cancelled():
+            task : asyncio.Task = asyncio.current_task()
+            cancel : Callable = lambda CPU, tick, pc, committed : task.cancel() if tick == 100 else None
+            CPU.configAddHook("tick", cancel)
+            try:
+                await CPU.runAsync(cycleLimit = 2**62, yieldEvery = 64)
+            finally:
+                CPU.configRemoveHook("tick", cancel)
+        self.assertRaises(asyncio.CancelledError, asyncio.run, cancelled())
+        self.assertEqual(CPU.engine["tick"], 128)
+        self.assertEqual(halts, [False, False, False], "ran out of cycles, found a loop, and was cancelled")
+
+        CPU.configSetLogging()
+        CPU.configSetLogging()
+        self.assertEqual(len(CPU._hooks["load"]), 1)
+        with self.assertLogs(level = logging.DEBUG):
+            CPU.linkAndLoad(code)
+        CPU.configSetLogging(False)
+        self.assertEqual(len(CPU._hooks["load"]), 0)
+
+        import unittest.mock # used for counting debugHelper calls
+        with unittest.mock.patch(__name__ + ".debugHelper", wraps = debugHelper) as helper:
+            CPU.linkAndLoad(code)
+        if not logging.getLogger().isEnabledFor(logging.DEBUG):
+            self.assertEqual(helper.call_count, 0, "parsing builds no log strings unless DEBUG is on")
+
+
+class TestDefaultAsync(unittest.TestCase):
+    def testRunAsync(self):
+        """Tests interleaving many CPUs in one event loop, and timing out then resuming an infinite loop"""
+        program : str = "loop: add(r[0], r[0], 1), add(r[1], r[1], r[2]) \n jumpNE(loop, r[0], 0) \n halt"
+
+        async def interleave() -> list[CPUsim]:
+            order : list[int] = []
+            CPUs : list[CPUsim] = []
+            for i in range(8):
+                CPU = CPUsim(8)
+                CPU.configSetDisplay(DisplayRecord(lambda *frame, i = i : order.append(i)))
                 CPU.linkAndLoad(program)
+                CPU.inject('r', 0, 255 - 16 * i) #loops 16 * i + 1 times
+                CPU.inject('r', 2, 3)
+                CPUs.append(CPU)
+            await asyncio.gather(*[CPU.runAsync(cycleLimit = 2048, yieldEvery = 16) for CPU in CPUs])
 
-                a : list[int] = [random.randint(0, 2**(bitLength - 1) - 1) for _ in range(4)] #generates numbers that are half the max storable size of a register with the given bitLength
-
-                for i, j in enumerate(a):
-                    CPU.inject('r', i, j)
-                
-                CPU.run()
-                
-                self.assertEqual(
-                    a[0] + a[1],
-                    CPU.extract('r', 4),
-                    ("input = " + str(a)).ljust(32) + ("Expected = " + str(a[0] + a[1])).ljust(16) + ("Got = " + str(CPU.extract('r', 4)))
-                )
-                self.assertEqual(
-                    a[2] + a[3],
-                    CPU.extract('r', 5),
-                    ("input = " + str(a)).ljust(32) + ("Expected = " + str(a[2] + a[3])).ljust(16) + ("Got = " + str(CPU.extract('r', 5)))
-                )
-    
-    def testVLIW_multipleInstructionType(self):
-        """Tests for VLIW (Very long instruction word) support, with multiple instruction types per line"""
-        program : str = "add(r[4], r[0], r[1]), and(r[5], r[0], r[1]), or(r[6], r[0], r[1]), xor(r[7], r[0], r[1]) \n halt"
+            longest : int = max(len(list(group)) for _, group in itertools.groupby(order[:16 * 8])) #the longest running CPU ends alone
+            self.assertLessEqual(longest, 16 + 2, "a CPU ran without yielding")
+            return CPUs
 
-        bitLength : int
-        for bitLength in [4, 8, 16]:
-            with self.subTest(bitLength=bitLength):
-                CPU = CPUsim(bitLength, defaultSetup = False)
-                CPU.configSetDisplay(CPU.DisplaySilent())
+        for i, CPU in enumerate(asyncio.run(interleave())):
+            self.assertEqual(CPU.engine["tick"], 2 * (16 * i + 1) + 1)
+            self.assertEqual(CPU.extract('r', 1), (3 * (16 * i + 1)) % 256)
 
-                CPU.configAddRegister('r', bitLength, 8)
-                CPU.configAddRegister('m', bitLength, 8, show=False)
+        CPU = CPUsim(8)
+        CPU.configSetDisplay(CPU.DisplaySilent())
+        CPU.linkAndLoad("loop: add(r[0], r[0], 1) \n jump(loop)")
 
-                CPU.linkAndLoad(program)
+        async def cancelled():
+            task : asyncio.Task = asyncio.current_task()
+            cancel : Callable = lambda CPU, tick, pc, committed : task.cancel() if tick == 200 else None
+            CPU.configAddHook("tick", cancel)
+            try:
+                await CPU.runAsync(cycleLimit = 2**62, yieldEvery = 64)
+            finally:
+                CPU.configRemoveHook("tick", cancel)
+        self.assertRaises(asyncio.CancelledError, asyncio.run, cancelled())
+        self.assertTrue(CPU.engine["run"])
+        self.assertEqual(CPU.engine["tick"], 256, "a cancel between yields should stop on the next yield")
+        CPU.run(cycleLimit = 10, resume = True)
+        self.assertEqual(CPU.engine["tick"], 266)
+        self.assertEqual(CPU.extract('r', 0), 128 + 5)
 
-                a : list[int] = [random.randint(0, 2**(bitLength - 1) - 1) for _ in range(2)] #generates numbers that are half the max storable size of a register with the given bitLength
 
-                for i, j in enumerate(a):
-                    CPU.inject('r', i, j)
-                
-                CPU.run()
-                
-                self.assertEqual(
-                    a[0] + a[1],
-                    CPU.extract('r', 4),
-                    ("input = " + str(a)).ljust(32) + ("Expected = " + str(a[0] + a[1])).ljust(16) + ("Got = " + str(CPU.extract('r', 4)))
-                )
-                self.assertEqual(
-                    a[0] & a[1],
-                    CPU.extract('r', 5),
-                    ("input = " + str(a)).ljust(32) + ("Expected = " + str(a[0] & a[1])).ljust(16) + ("Got = " + str(CPU.extract('r', 5)))
-                )
-                self.assertEqual(
-                    a[0] | a[1],
-                    CPU.extract('r', 6),
-                    ("input = " + str(a)).ljust(32) + ("Expected = " + str(a[0] | a[1])).ljust(16) + ("Got = " + str(CPU.extract('r', 6)))
-                )
-                self.assertEqual(
-                    a[0] ^ a[1],
-                    CPU.extract('r', 7),
-                    ("input = " + str(a)).ljust(32) + ("Expected = " + str(a[0] ^ a[1])).ljust(16) + ("Got = " + str(CPU.extract('r', 7)))
-                )
-    
 class TestDefaultInstructionSet(unittest.TestCase):
     def test_int2bits_bits2int(self):
         """Tests int2bits and bits2 int against ALL NUMBERS POSSIBLE for a bitLength"""
@@ -4218,11 +7189,209 @@ class TestDefaultSimplePrograms(unittest.TestCase):
             ("bitLength = " + str(bitLength)).ljust(16) + ("a = " + str(a)).ljust(16) +  ("b = " + str(b)).ljust(16) +  ("Expected = " + str(a * b)).ljust(16) + ("Got = " + str(result)).ljust(16)
         )
 
+    def testDefaultProgram_multiplySweep(self):
+        """Runs a 'multiply' program over many inputs with CPUsim.sweep"""
+        bitLength : int = 8
+
+        program : str = '''
+                            # Multiplies two numbers together
+                            # Inputs: r[0], r[1]
+                            # Output: r[3]
+                            loop:   jumpEQ  (end, r[0], 0)
+                                        and     (r[2], r[0], 1)
+                                        jumpNE  (zero, r[2], 1)
+                                            add     (r[3], r[1], r[3])
+                            zero:       shiftL  (r[1], r[1])
+                                        shiftR  (r[0], r[0])
+                                        jump    (loop)
+                            end:    halt
+                            '''
+
+        pairs : list[tuple[int, int]] = [(random.randint(0, 2**bitLength - 1), random.randint(0, 2**bitLength - 1)) for _ in range(64)]
+
+        results = CPUsim.sweep(
+            functools.partial(CPUsim, bitLength * 2), #the default setup, 16-bit 'r' registers
+            program,
+            ({'r' : {0 : a, 1 : b}} for a, b in pairs),
+            [('r', 3)],
+            maxWorkers = 2,
+            chunkSize = 8
+        )
+
+        for (a, b), result in zip(pairs, results, strict = True):
+            with self.subTest(a=a, b=b):
+                self.assertEqual(a * b, result['r'][3])
+
+    def testCluster(self):
+        """Tests cores in separate processes counting into, and racing for, one shared 'm' register"""
+        program : str = '''
+                            # Inputs: r[0] loop amount, r[4] core id + 1
+                            # Output: m[30] sum of every loop amount, m[31] id of the core that won the race, r[2] old value of m[31]
+                                    cas     (r[2], m[31], 0, r[4])
+                            loop:   fetchadd(r[1], m[30], 1)
+                                    add     (r[0], r[0], 255)
+                                    jumpNE  (loop, r[0], 0)
+                                    halt
+                            '''
+
+        for barrierInterval in (1, 7, None):
+            with self.subTest(barrierInterval=barrierInterval):
+                results = CPUsim.cluster(
+                    functools.partial(CPUsim, 8),
+                    program,
+                    [{'r' : {0 : 10 * (core + 1), 4 : core + 1}} for core in range(4)],
+                    [('r', 2), ('r', 4), ('m', 30), ('m', 31)],
+                    barrierInterval = barrierInterval
+                )
+
+                if barrierInterval != None: #every core extracts after the last core halts
+                    self.assertEqual([result['m'][30] for result in results], [10 + 20 + 30 + 40] * 4)
+                winners : list[int] = [result['r'][4] for result in results if result['r'][2] == 0]
+                self.assertEqual(len(winners), 1, "exactly one core should win the compare and swap")
+                self.assertEqual(results[-1]['m'][31], winners[0])
+
+    @staticmethod
+    def _setupExitInCore() -> CPUsim:
+        """A 'def cluster' setup that kills every core process (IE: as if it ran out of memory)"""
+        if multiprocessing.parent_process() != None:
+            os._exit(3)
+        return CPUsim(8)
+
+    def testClusterFailure(self):
+        """Tests cluster raises instead of waiting forever when a core dies, or runs past the timeout"""
+        self.assertRaisesRegex(Exception, "exit code 3", CPUsim.cluster, self._setupExitInCore, "halt", [{}, {}], [('r', 0)])
+        self.assertRaises(TimeoutError, CPUsim.cluster, functools.partial(CPUsim, 8), "loop: jump(loop)", [{}, {}], [('r', 0)], cycleLimit = 2**40, barrierInterval = None, timeout = 0.5)
+
+    def testAtomicInstructions(self):
+        """Tests atomic instructions are committed, traced, journaled, and hardwired like every other write, both for plain and shared register banks"""
+        program : str = "vliw(fetchadd(r[1], m[0], 5), add(r[2], m[0], 0)) \n cas(r[3], m[0], 5, 9) \n fetchadd(r[4], m[1], 1) \n halt"
+
+        for shared in (False, True):
+            with self.subTest(shared = shared):
+                CPU = CPUsim(8)
+                CPU.configSetDisplay(CPU.DisplaySilent())
+                CPU.configSetCheckpoints(interval = 1)
+                CPU.configConfigRegister('m', 1, hardwired = True)
+                committed : list[dict] = []
+                CPU.configAddHook("tick", lambda CPU, tick, pc, written : committed.append(dict(written.get('m', {}))))
+                CPU.linkAndLoad(program)
+                if shared:
+                    CPU.configSetSharedRegister('m')
+
+                CPU.run()
+                self.assertEqual(CPU.extract('r', 2), 5 if shared else 0, "a shared register bank is written at once, plain ones on commit")
+                self.assertEqual([CPU.extract('r', i) for i in (1, 3, 4)], [0, 5, 0])
+                self.assertEqual([CPU.extract('m', 0), CPU.extract('m', 1)], [9, 0])
+                self.assertEqual(committed[:3], [{0 : 5}, {0 : 9}, {}])
+
+                CPU.rewind(1)
+                self.assertEqual(CPU.extract('m', 0), 5)
+                CPU.rewind(0)
+                self.assertEqual(CPU.extract('m', 0), 0)
+                if shared:
+                    CPU.lastState['m'].close(unlink = True)
+
 class TestRISCV(unittest.TestCase):
     #TODO test initialization
 
     #TODO test instructions
 
+    def testRISCVBinary(self):
+        """Assembles a 'multiply' program into RV32I words, runs it from memory, and disassembles it back"""
+        import tempfile # used for a temporary image file
+        program : str = """
+                            # Same as testRISCVProgram_multiply1, but only with instructions that have an RV32I encoding
+                            loop:   beq     a0, zero, end
+                                    andi    a1, a0, 1
+                                    beq     a1, zero, temp
+                                    add     a3, a2, a3
+                            temp:   slli    a2, a2, 1
+                                    srli    a0, a0, 1
+                                    beq     zero, zero, loop
+                            end:    halt
+                            """
+
+        source = RiscV(memorySize = 64)
+        source.CPU.configSetDisplay(source.CPU.DisplaySilent())
+        source.CPU.linkAndLoad(program)
+        words : list[int] = source.assemble()
+        self.assertEqual(len(words), 8)
+        self.assertEqual(words[1], 0x00157593, "andi a1, a0, 1")
+        self.assertEqual(words[-2], 0xFE0004E3, "beq zero, zero, loop")
+        self.assertEqual(words[-1], 0x00000073, "ecall")
+
+        a : int = random.randint(0, 2**16 - 1)
+        b : int = random.randint(0, 2**16 - 1)
+        ticks : list[int] = []
+        for loaded in ("tree", "binary"):
+            with self.subTest(loaded=loaded):
+                riscv = RiscV(memorySize = 64)
+                CPU = riscv.CPU
+                CPU.configSetDisplay(CPU.DisplaySilent())
+                if loaded == "tree":
+                    CPU.linkAndLoad(program)
+                else:
+                    riscv.loadBinary(words)
+                    self.assertEqual([CPU.extract('m', i) for i in range(4)], [0x63, 0x0E, 0x05, 0x00], "beq a0, zero, end")
+                CPU.inject('x', 10, a)
+                CPU.inject('x', 12, b)
+                CPU.run(2048)
+                ticks.append(CPU.engine["tick"])
+                self.assertEqual(CPU.extract('x', 13), a * b)
+
+        self.assertEqual(ticks[0], ticks[1])
+        self.assertEqual(len(riscv._decodeCaches[CPU]), len(set(words)), "every word is decoded once")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path : str = os.path.join(directory, "multiply.bin")
+            with open(path, "wb") as file:
+                file.write(b"".join([word.to_bytes(4, "little") for word in words]))
+            riscv = RiscV(memorySize = 64)
+            CPU = riscv.CPU
+            CPU.configSetDisplay(CPU.DisplaySilent())
+            CPU.configSetProfiler(True)
+            riscv.loadImage(path, 32)
+            CPU.inject('x', 10, a)
+            CPU.inject('x', 12, b)
+            CPU.run(2048)
+            self.assertEqual(CPU.extract('x', 13), a * b, "from an image at byte 32")
+            self.assertEqual(min(CPU.profile()["pc"].keys()), 8, "words fetched from an image are profiled by pc")
+            self.assertIn("Profile", CPU.stats["profileTable"])
+            CPU.profileCollapsed()
+
+        disassembled = RiscV(memorySize = 64)
+        disassembled.CPU.configSetDisplay(disassembled.CPU.DisplaySilent())
+        disassembled.CPU.linkAndLoad(riscv.disassemble(words))
+        self.assertEqual(disassembled.assemble(), words)
+
+        unencodable = RiscV()
+        unencodable.CPU.configSetDisplay(unencodable.CPU.DisplaySilent())
+        unencodable.CPU.linkAndLoad("bne a1, 1, end \n end: halt")
+        self.assertRaises(Exception, unencodable.assemble)
+
+    def testRISCVClone(self):
+        """Tests that a clone of a CPU running fetched words decodes from it's own memory, into it's own 'imm' constant pool"""
+        riscv = RiscV(memorySize = 64)
+        CPU = riscv.CPU
+        CPU.configSetDisplay(CPU.DisplaySilent())
+        riscv.loadBinary([riscv._encode("addi", [('x', 5), ('x', 5), 7], 0), riscv._encode("addi", [('x', 6), ('x', 6), 8], 1), 0x00000073])
+        CPU.run(16)
+        pool : dict[int, int] = dict(CPU.lastState['imm'])
+
+        clone = CPU.clone()
+        clone.inject('x', 5, 0)
+        clone.inject('x', 6, 0)
+        clone.inject('pc', 0, 0)
+        word : int = riscv._encode("addi", [('x', 5), ('x', 5), 100], 0)
+        clone.injectRange('m', 0, list(word.to_bytes(4, "little")))
+        clone.run(16)
+
+        self.assertEqual((clone.extract('x', 5), clone.extract('x', 6)), (100, 8))
+        self.assertEqual((CPU.extract('x', 5), CPU.extract('x', 6)), (7, 8))
+        self.assertEqual(CPU.lastState['imm'], pool, "the clone's immediates aren't added to the original")
+        self.assertIn(100, clone.lastState['imm'].values())
+        self.assertIsNot(CPU.config, clone.config)
+
     def testRISCVProgram_multiply1(self):
         """Runs a 'multiply' program once"""
         a : int = random.randint(0, 2**8 - 1)
@@ -4785,7 +7954,30 @@ class CPUsim_v4:
             class DisplaySilent                     #TODO
             class InstructionSetDefault
                 def opCopy                          #NotImplimented
-            class MMMU                              #TODO #NotImplimented
+            class PersistentMap                     Immutable hash array mapped trie, used for memory versioning
+            class MMMUDefault
+                class EvictionLRU                   Cache eviction policies, O(1) per access
+                class EvictionRoundRobin
+                class EvictionRandom
+                class PoolCache                     Set associative cache level, with hit/miss/eviction counters
+                class PoolMemory                    The last memory level (IE: DRAM)
+                def createPool
+                def createCacheHierarchy            registers -> L1D/L1I -> L2 -> DRAM
+                def getPoolStats
+                class TransactionLog                Columnar log of memory transactions, finds conflicting branchNodes in one pass
+                def configTransactionLog            Off by default, the log grows until 'def tick'
+                def memoryTransactions
+                def conflicts
+                def tick
+                def createMemory
+                def configInfo
+                def addWriteWatcher
+                def read
+                def write
+                def fork                            O(1), no memory is copied
+                def commit
+                def discard
+                def getMemoryKeys
             class ParserDefault
                 def __init__                        #Eliminate
                     var Node = NodeParse            #TODO should import 'class NodeParse' but name refers to old code with old name
@@ -4794,8 +7986,11 @@ class CPUsim_v4:
                 def ruleFilterBlockComments         #TODO #NotImplimented
                 def ruleFindDirectives              #TODO #NotImplimented
                 def _tokenizeChar                   #NotImplimented
+            class ExecutorOutOfOrder                Out of order execution, N ports, reorder buffer, skips idle ticks
+                def run
             class CompilerDefault                   #TODO #NotImplimented
-            class DecoderDefault                    #TODO #NotImplimented
+            class DecoderDefault                    Memory words -> instructionSet calls, cached by (address, word)
+                def decode
 
     """
     """ Random Design Notes
@@ -6364,8 +9559,8 @@ class CPUsim_v4:
         #     a : int = funcRead(registerA)
         #     amount : int = funcRead(registerShiftOffset)
 
-        #     bitLengthSource : int = funcGetConfig(registerA)
-        #     bitLengthDestination : int = funcGetConfig(registerDestination)
+        #     bitLengthSource : int = funcGetConfig(registerA)["bitLength"]
+        #     bitLengthDestination : int = funcGetConfig(registerDestination)["bitLength"]
 
         #     if amount > 8 * max(256, bitLengthSource, bitLengthDestination):
         #         raise Exception("Instruction input 'registerShiftOffset' is too large to be valid")
@@ -6495,8 +9690,8 @@ class CPUsim_v4:
             a : int = funcRead(registerA)
             amount : int = funcRead(registerShiftOffset)
 
-            bitLengthSource : int = funcGetConfig(registerA)
-            bitLengthDestination: int = funcGetConfig(registerDestination)
+            bitLengthSource : int = funcGetConfig(registerA)["bitLength"]
+            bitLengthDestination: int = funcGetConfig(registerDestination)["bitLength"]
 
             if amount > 8 * max(256, bitLengthSource, bitLengthDestination):
                 raise Exception("Instruction input 'registerShiftOffset' is too large to be valid")
@@ -6549,8 +9744,8 @@ class CPUsim_v4:
             assert len(trunkOrExtend) > 0
             assert trunkOrExtend == "trunk" or trunkOrExtend == "extend"
 
-            sourceBitLength : int = funcGetConfig(registerA)
-            destinationBitLength : int = funcGetConfig(registerDestination)
+            sourceBitLength : int = funcGetConfig(registerA)["bitLength"]
+            destinationBitLength : int = funcGetConfig(registerDestination)["bitLength"]
 
             a : int = funcRead(registerA)
             result : int = 0
@@ -6640,11 +9835,11 @@ class CPUsim_v4:
                 assert all([i >= 0 for i in registerB if type(i) is int])
                 assert self.isISARegisterVector(registerB)
 
-            bitLengthSourceA : int = funcGetConfig(registerA)
+            bitLengthSourceA : int = funcGetConfig(registerA)["bitLength"]
             bitLengthSourceB : int = bitLengthSourceA
             if registerB != None:
-                bitLengthSourceB = funcGetConfig(registerB)
-            bitLengthDestination : int = funcGetConfig(registerDestination)
+                bitLengthSourceB = funcGetConfig(registerB)["bitLength"]
+            bitLengthDestination : int = funcGetConfig(registerDestination)["bitLength"]
             
             energy : Decimal = Decimal(min(max(bitLengthSourceA, bitLengthSourceB), bitLengthDestination))
 
@@ -6750,9 +9945,9 @@ class CPUsim_v4:
             assert all([i >= 0 for i in registerB if type(i) is int])
             assert self.isISARegisterVector(registerB)
 
-            bitLengthSourceA : int = funcGetConfig(registerA)
-            bitLengthSourceB : int = funcGetConfig(registerB)
-            bitLengthDestination : int = funcGetConfig(registerDestination)
+            bitLengthSourceA : int = funcGetConfig(registerA)["bitLength"]
+            bitLengthSourceB : int = funcGetConfig(registerB)["bitLength"]
+            bitLengthDestination : int = funcGetConfig(registerDestination)["bitLength"]
 
             energy : Decimal = Decimal(min(bitLengthDestination, max(bitLengthSourceA, bitLengthSourceB)) * 5)
 
@@ -6809,7 +10004,7 @@ class CPUsim_v4:
 
             a : int = funcRead(registerA)
             b : int = funcRead(registerB)
-            bitLengthDestination : int = funcGetConfig(registerDestination)
+            bitLengthDestination : int = funcGetConfig(registerDestination)["bitLength"]
 
             #aBitLength : int = a.bit_length() # The built-in way to determin bitlength of int, but I don't trust it
             #bBitLength : int = b.bit_length() # The built-in way to determin bitlength of int, but I don't trust it
@@ -6875,9 +10070,9 @@ class CPUsim_v4:
             assert all([i >= 0 for i in registerB if type(i) is int])
             assert self.isISARegisterVector(registerB)
 
-            bitLengthSourceA : int = funcGetConfig(registerA)
-            bitLengthSourceB : int = funcGetConfig(registerB)
-            bitLengthDestination : int = funcGetConfig(registerDestination)
+            bitLengthSourceA : int = funcGetConfig(registerA)["bitLength"]
+            bitLengthSourceB : int = funcGetConfig(registerB)["bitLength"]
+            bitLengthDestination : int = funcGetConfig(registerDestination)["bitLength"]
 
             latency : Decimal = Decimal(min(bitLengthDestination, max(bitLengthSourceA, bitLengthSourceB)) * 3)
 
@@ -6934,7 +10129,7 @@ class CPUsim_v4:
 
             a : int = funcRead(registerA)
             b : int = funcRead(registerB)
-            bitLengthDestination : int = funcGetConfig(registerDestination)
+            bitLengthDestination : int = funcGetConfig(registerDestination)["bitLength"]
 
             #aBitLength : int = a.bit_length() # The built-in way to determin bitlength of int, but I don't trust it
             #bBitLength : int = b.bit_length() # The built-in way to determin bitlength of int, but I don't trust it
@@ -7000,8 +10195,8 @@ class CPUsim_v4:
             assert all([i >= 0 for i in registerB if type(i) is int])
             assert self.isISARegisterVector(registerB)
 
-            bitLengthSourceA : int = funcGetConfig(registerA)
-            bitLengthSourceB : int = funcGetConfig(registerB)
+            bitLengthSourceA : int = funcGetConfig(registerA)["bitLength"]
+            bitLengthSourceB : int = funcGetConfig(registerB)["bitLength"]
 
             bitLength : int = max(bitLengthSourceA, bitLengthSourceB) * 2
 
@@ -7058,8 +10253,8 @@ class CPUsim_v4:
             assert all([i >= 0 for i in registerB if type(i) is int])
             assert self.isISARegisterVector(registerB)
 
-            bitLengthSourceA : int = funcGetConfig(registerA)
-            bitLengthSourceB : int = funcGetConfig(registerB)
+            bitLengthSourceA : int = funcGetConfig(registerA)["bitLength"]
+            bitLengthSourceB : int = funcGetConfig(registerB)["bitLength"]
 
             bitLength : int = max(bitLengthSourceA, bitLengthSourceB)
 
@@ -7118,8 +10313,8 @@ class CPUsim_v4:
             assert all([i >= 0 for i in registerB if type(i) is int])
             assert self.isISARegisterVector(registerB)
 
-            bitLengthSourceA : int = funcGetConfig(registerA)
-            bitLengthSourceB : int = funcGetConfig(registerB)
+            bitLengthSourceA : int = funcGetConfig(registerA)["bitLength"]
+            bitLengthSourceB : int = funcGetConfig(registerB)["bitLength"]
 
             bitLength : int = max(bitLengthSourceA, bitLengthSourceB) * 2
 
@@ -7178,8 +10373,8 @@ class CPUsim_v4:
             assert all([i >= 0 for i in registerB if type(i) is int])
             assert self.isISARegisterVector(registerB)
 
-            bitLengthSourceA : int = funcGetConfig(registerA)
-            bitLengthSourceB : int = funcGetConfig(registerB)
+            bitLengthSourceA : int = funcGetConfig(registerA)["bitLength"]
+            bitLengthSourceB : int = funcGetConfig(registerB)["bitLength"]
 
             bitLength : int = max(bitLengthSourceA, bitLengthSourceB)
 
@@ -7227,8 +10422,8 @@ class CPUsim_v4:
             assert all([i >= 0 for i in registerB if type(i) is int])
             assert self.isISARegisterVector(registerB)
 
-            bitLengthSourceA : int = funcGetConfig(registerA)
-            bitLengthSourceB : int = funcGetConfig(registerB)
+            bitLengthSourceA : int = funcGetConfig(registerA)["bitLength"]
+            bitLengthSourceB : int = funcGetConfig(registerB)["bitLength"]
 
             bitLength : int = max(bitLengthSourceA, bitLengthSourceB)
             assert bitLength % 2 == 0
@@ -7310,8 +10505,8 @@ class CPUsim_v4:
             assert all([i >= 0 for i in registerB if type(i) is int])
             assert self.isISARegisterVector(registerB)
 
-            bitLengthSourceA : int = funcGetConfig(registerA)
-            bitLengthSourceB : int = funcGetConfig(registerB)
+            bitLengthSourceA : int = funcGetConfig(registerA)["bitLength"]
+            bitLengthSourceB : int = funcGetConfig(registerB)["bitLength"]
 
             bitLength : int = max(bitLengthSourceA, bitLengthSourceB)
             assert bitLength % 2 == 0
@@ -9098,6 +12293,169 @@ class CPUsim_v4:
 
             return root, labels
 
+    class PersistentMap:
+        """An immutable map, stored as a hash array mapped trie (HAMT). Every change returns a new map that shares all untouched nodes with the old one
+
+        Used by 'class MMMUDefault' for memory versioning: a fork keeps a reference to the map (O(1)), a write copies only the path to one element (O(log n), 32 children per node)
+        Keys must be hashable, IE: (hyperThreadContext, key, index)
+        """
+        __slots__ = ("_root", "_size")
+
+        class _Node:
+            """A trie node. bitmap has bit i set if the node has a child for hash fragment i, children are stored in order without gaps"""
+            __slots__ = ("bitmap", "children")
+
+            def __init__(self, bitmap : int, children : tuple):
+                self.bitmap : int = bitmap
+                self.children : tuple["CPUsim_v4.PersistentMap._Node | CPUsim_v4.PersistentMap._Leaf | CPUsim_v4.PersistentMap._Collision"] = children
+
+        class _Leaf:
+            """A single key/value pair"""
+            __slots__ = ("hash", "key", "value")
+
+            def __init__(self, hash : int, key : Any, value : Any):
+                self.hash : int = hash
+                self.key : Any = key
+                self.value : Any = value
+
+        class _Collision:
+            """Key/value pairs whose keys have the same (full) hash"""
+            __slots__ = ("hash", "pairs")
+
+            def __init__(self, hash : int, pairs : tuple[tuple[Any, Any]]):
+                self.hash : int = hash
+                self.pairs : tuple[tuple[Any, Any]] = pairs
+
+        _bits : int = 5 # 32 children per node
+        _hashBits : int = 64
+
+        def __init__(self, root : Optional["CPUsim_v4.PersistentMap._Node"] = None, size : int = 0):
+            self._root : CPUsim_v4.PersistentMap._Node = root if root is not None else self._Node(0, ())
+            self._size : int = size
+
+        @classmethod
+        def _hash(cls, key : Any) -> int:
+            return hash(key) & ((1 << cls._hashBits) - 1)
+
+        def __len__(self) -> int:
+            return self._size
+
+        def __contains__(self, key : Any) -> bool:
+            sentinel = object()
+            return self.get(key, sentinel) is not sentinel
+
+        def __getitem__(self, key : Any) -> Any:
+            sentinel = object()
+            value = self.get(key, sentinel)
+            if value is sentinel:
+                raise KeyError(key)
+            return value
+
+        def __iter__(self):
+            for key, value in self.items():
+                yield key
+
+        def get(self, key : Any, default : Any = None) -> Any:
+            """Returns the value of key, or default if key is not in the map"""
+
+            keyHash : int = self._hash(key)
+            node = self._root
+            shift : int = 0
+            while True:
+                bit : int = 1 << ((keyHash >> shift) & 31)
+                if not (node.bitmap & bit):
+                    return default
+                child = node.children[(node.bitmap & (bit - 1)).bit_count()]
+                if type(child) is self._Node:
+                    node = child
+                    shift += self._bits
+                elif type(child) is self._Leaf:
+                    return child.value if child.hash == keyHash and child.key == key else default
+                else:
+                    if child.hash == keyHash:
+                        for pairKey, pairValue in child.pairs:
+                            if pairKey == key:
+                                return pairValue
+                    return default
+
+        def set(self, key : Any, value : Any) -> "CPUsim_v4.PersistentMap":
+            """Returns a new map with key set to value, this map is left unchanged"""
+
+            keyHash : int = self._hash(key)
+            root, added = self._set(self._root, 0, keyHash, key, value)
+            return CPUsim_v4.PersistentMap(root, self._size + (1 if added else 0))
+
+        def update(self, pairs : "Iterable[tuple[Any, Any]]") -> "CPUsim_v4.PersistentMap":
+            """Returns a new map with every (key, value) pair set, this map is left unchanged"""
+
+            root : CPUsim_v4.PersistentMap._Node = self._root
+            size : int = self._size
+            for key, value in pairs:
+                root, added = self._set(root, 0, self._hash(key), key, value)
+                size += 1 if added else 0
+            return CPUsim_v4.PersistentMap(root, size)
+
+        def items(self):
+            """Iterates over every (key, value) pair, in no particular order"""
+
+            stack : list = [self._root]
+            while len(stack) != 0:
+                node = stack.pop()
+                for child in node.children:
+                    if type(child) is self._Node:
+                        stack.append(child)
+                    elif type(child) is self._Leaf:
+                        yield (child.key, child.value)
+                    else:
+                        yield from child.pairs
+
+        def _set(self, node : "CPUsim_v4.PersistentMap._Node", shift : int, keyHash : int, key : Any, value : Any) -> tuple["CPUsim_v4.PersistentMap._Node", bool]:
+            """Returns a copy of node with key set to value, and whether key was added (instead of replaced)"""
+
+            bit : int = 1 << ((keyHash >> shift) & 31)
+            position : int = (node.bitmap & (bit - 1)).bit_count()
+            children : tuple = node.children
+
+            if not (node.bitmap & bit):
+                return (self._Node(node.bitmap | bit, children[:position] + (self._Leaf(keyHash, key, value),) + children[position:]), True)
+
+            child = children[position]
+            added : bool = False
+            if type(child) is self._Node:
+                child, added = self._set(child, shift + self._bits, keyHash, key, value)
+            elif type(child) is self._Leaf:
+                if child.hash == keyHash and child.key == key:
+                    if child.value is value:
+                        return (node, False)
+                    child = self._Leaf(keyHash, key, value)
+                elif child.hash == keyHash:
+                    child = self._Collision(keyHash, ((child.key, child.value), (key, value)))
+                    added = True
+                else:
+                    child = self._merge(shift + self._bits, child, self._Leaf(keyHash, key, value))
+                    added = True
+            else:
+                if child.hash == keyHash:
+                    pairs : tuple = tuple(pair for pair in child.pairs if pair[0] != key)
+                    added = len(pairs) == len(child.pairs)
+                    child = self._Collision(keyHash, pairs + ((key, value),))
+                else:
+                    child = self._merge(shift + self._bits, child, self._Leaf(keyHash, key, value))
+                    added = True
+
+            return (self._Node(node.bitmap, children[:position] + (child,) + children[position + 1:]), added)
+
+        def _merge(self, shift : int, a : "CPUsim_v4.PersistentMap._Leaf | CPUsim_v4.PersistentMap._Collision", b : "CPUsim_v4.PersistentMap._Leaf") -> "CPUsim_v4.PersistentMap._Node":
+            """Returns a node containing two entries with different hashes, nested as deep as their hashes share fragments"""
+
+            fragmentA : int = (a.hash >> shift) & 31
+            fragmentB : int = (b.hash >> shift) & 31
+            if fragmentA == fragmentB:
+                return self._Node(1 << fragmentA, (self._merge(shift + self._bits, a, b),))
+            if fragmentA < fragmentB:
+                return self._Node((1 << fragmentA) | (1 << fragmentB), (a, b))
+            return self._Node((1 << fragmentA) | (1 << fragmentB), (b, a))
+
     class MMMUDefault:
         """
         MMMU requirements:
@@ -9332,8 +12690,320 @@ class CPUsim_v4:
 
         """
 
+        class EvictionLRU:
+            """Least recently used eviction, for 'class PoolCache'. A set is an OrderedDict of tags, oldest first, so a hit and an eviction are O(1)"""
+
+            def newSet(self, ways : int) -> collections.OrderedDict:
+                return collections.OrderedDict()
+
+            def lookup(self, cacheSet : collections.OrderedDict, tag : Any) -> bool:
+                if tag in cacheSet:
+                    cacheSet.move_to_end(tag)
+                    return True
+                return False
+
+            def insert(self, cacheSet : collections.OrderedDict, ways : int, tag : Any) -> Any:
+                """Adds tag to cacheSet, returns the evicted tag, or None if the set wasn't full"""
+                evicted : Any = cacheSet.popitem(last = False)[0] if len(cacheSet) >= ways else None
+                cacheSet[tag] = None
+                return evicted
+
+        class EvictionRoundRobin:
+            """Round robin (FIFO) eviction, for 'class PoolCache'. A set is [{tag : way}, [tag per way], next way to evict]"""
+
+            def newSet(self, ways : int) -> list:
+                return [{}, [None] * ways, 0]
+
+            def lookup(self, cacheSet : list, tag : Any) -> bool:
+                return tag in cacheSet[0]
+
+            def insert(self, cacheSet : list, ways : int, tag : Any) -> Any:
+                """Adds tag to cacheSet, returns the evicted tag, or None if the way was empty"""
+                way : int = cacheSet[2]
+                evicted : Any = cacheSet[1][way]
+                if evicted is not None:
+                    del cacheSet[0][evicted]
+                cacheSet[0][tag] = way
+                cacheSet[1][way] = tag
+                cacheSet[2] = (way + 1) % ways
+                return evicted
+
+        class EvictionRandom:
+            """Random eviction, for 'class PoolCache'. A set is [{tag : way}, [tag per way]]. Seeded, so runs are repeatable"""
+
+            def __init__(self, seed : int = 0):
+                self._random : random.Random = random.Random(seed)
+
+            def newSet(self, ways : int) -> list:
+                return [{}, []]
+
+            def lookup(self, cacheSet : list, tag : Any) -> bool:
+                return tag in cacheSet[0]
+
+            def insert(self, cacheSet : list, ways : int, tag : Any) -> Any:
+                """Adds tag to cacheSet, returns the evicted tag, or None if the set wasn't full"""
+                if len(cacheSet[1]) < ways:
+                    cacheSet[0][tag] = len(cacheSet[1])
+                    cacheSet[1].append(tag)
+                    return None
+                way : int = self._random.randrange(ways)
+                evicted : Any = cacheSet[1][way]
+                del cacheSet[0][evicted]
+                cacheSet[0][tag] = way
+                cacheSet[1][way] = tag
+                return evicted
+
+        class PoolCache:
+            """A set associative, write back, write allocate cache level. Misses and dirty evictions are passed on to nextPool
+
+            Memory elements are grouped into lines of lineSize consecutive indexes, a line is cached in set (line % sets), in one of 'ways' ways
+            A str index (IE: a flag name) is a line of it's own, numbered in the order str indexes are first accessed (not by hash(), so stats are the same in every process)
+            eviction is a policy instance ('class EvictionLRU', 'class EvictionRoundRobin', 'class EvictionRandom'), or any class with the same newSet/lookup/insert functions
+            stats counts reads, writes, hits, misses, evictions, writebacks (evicted dirty lines), and latency (total ticks spent, including nextPool)
+            """
+
+            def __init__(self, sets : int, ways : int, lineSize : int = 1, latency : int = 1, eviction : Any = None, nextPool : Any = None):
+                assert type(sets) is int and sets >= 1
+                assert type(ways) is int and ways >= 1
+                assert type(lineSize) is int and lineSize >= 1
+                assert type(latency) is int and latency >= 0
+
+                self.sets : int = sets
+                self.ways : int = ways
+                self.lineSize : int = lineSize
+                self.latency : int = latency
+                self.eviction : Any = eviction if eviction is not None else CPUsim_v4.MMMUDefault.EvictionLRU()
+                self.nextPool : Any = nextPool
+
+                self._sets : list = [self.eviction.newSet(ways) for i in range(sets)]
+                self._dirty : set[tuple[int, Any]] = set() # (set, tag) of lines written since they were loaded
+                self._namedLines : dict[str, int] = {} # str index -> it's line number, see 'def access'
+                self.stats : dict[str, int] = dict.fromkeys(["reads", "writes", "hits", "misses", "evictions", "writebacks", "latency"], 0)
+
+            def access(self, key : int | str, index : int | str, write : bool) -> int:
+                """Reads or writes a memory element through this cache, returns the latency of the access in ticks"""
+
+                stats : dict[str, int] = self.stats
+                stats["writes" if write else "reads"] += 1
+
+                if type(index) is int:
+                    line : int = index // self.lineSize
+                    setIndex : int = line % self.sets
+                    tag : tuple[int | str, int | str] = (key, line // self.sets)
+                else:
+                    setIndex : int = self._namedLines.setdefault(index, len(self._namedLines)) % self.sets
+                    tag : tuple[int | str, int | str] = (key, index)
+                cacheSet = self._sets[setIndex]
+
+                latency : int = self.latency
+                if self.eviction.lookup(cacheSet, tag):
+                    stats["hits"] += 1
+                else:
+                    stats["misses"] += 1
+                    if self.nextPool is not None:
+                        latency += self.nextPool.access(key, index, False)
+                    evicted : Any = self.eviction.insert(cacheSet, self.ways, tag)
+                    if evicted is not None:
+                        stats["evictions"] += 1
+                        if (setIndex, evicted) in self._dirty:
+                            self._dirty.discard((setIndex, evicted))
+                            stats["writebacks"] += 1
+                            if self.nextPool is not None: # writes back the first element of the evicted line
+                                evictedIndex : int | str = evicted[1] if type(evicted[1]) is str else (evicted[1] * self.sets + setIndex) * self.lineSize
+                                latency += self.nextPool.access(evicted[0], evictedIndex, True)
+                if write:
+                    self._dirty.add((setIndex, tag))
+
+                stats["latency"] += latency
+                return latency
+
+            def flush(self) -> None:
+                """Empties the cache without writing back dirty lines, stats are kept"""
+                self._sets = [self.eviction.newSet(self.ways) for i in range(self.sets)]
+                self._dirty = set()
+
+        class PoolMemory:
+            """The last memory level (IE: DRAM), every access is a hit with a fixed latency"""
+
+            def __init__(self, latency : int = 100):
+                assert type(latency) is int and latency >= 0
+
+                self.latency : int = latency
+                self.stats : dict[str, int] = dict.fromkeys(["reads", "writes", "latency"], 0)
+
+            def access(self, key : int | str, index : int | str, write : bool) -> int:
+                self.stats["writes" if write else "reads"] += 1
+                self.stats["latency"] += self.latency
+                return self.latency
+
+            def flush(self) -> None:
+                pass
+
+        class TransactionLog:
+            """The memory transactions of one tick, stored as parallel typed arrays (columns), one row per transaction
+
+            op          - READ or WRITE
+            address     - address id, see 'def address', the addresses are (hyperThreadContext, key, index)
+            version     - the branchNode accessed (IE: one branchNode per in flight instruction)
+            size        - memory elements accessed
+            latency     - ticks the access took, 0 if it wasn't routed through a pool
+            """
+            READ : int = 0
+            WRITE : int = 1
+
+            def __init__(self):
+                self.op : array.array = array.array('B')
+                self.address : array.array = array.array('L')
+                self.version : array.array = array.array('L')
+                self.size : array.array = array.array('L')
+                self.latency : array.array = array.array('L')
+
+                self._addressIds : dict[tuple[int, int | str, int | str], int] = {}
+                self._addresses : list[tuple[int, int | str, int | str]] = []
+                self._versionRows : dict[int, list[int]] = {} # version -> it's row numbers, see 'def rows'
+
+            def __len__(self) -> int:
+                return len(self.op)
+
+            def append(self, op : int, address : tuple[int, int | str, int | str], version : int, size : int = 1, latency : int = 0) -> None:
+                addressId : int = self._addressIds.get(address)
+                if addressId is None:
+                    addressId = len(self._addresses)
+                    self._addressIds[address] = addressId
+                    self._addresses.append(address)
+
+                self._versionRows.setdefault(version, []).append(len(self.op))
+                self.op.append(op)
+                self.address.append(addressId)
+                self.version.append(version)
+                self.size.append(size)
+                self.latency.append(latency)
+
+            def addressOf(self, addressId : int) -> tuple[int, int | str, int | str]:
+                """Returns the (hyperThreadContext, key, index) of an address id"""
+                return self._addresses[addressId]
+
+            def rows(self, version : int = None) -> list[tuple[int, tuple[int, int | str, int | str], int, int, int]]:
+                """Returns the transactions as (op, address, version, size, latency) rows, in the order they happened, optionally only those of one version (costs O(rows of that version))"""
+                indexes : "Iterable[int]" = range(len(self.op)) if version is None else self._versionRows.get(version, ())
+                return [(self.op[i], self._addresses[self.address[i]], self.version[i], self.size[i], self.latency[i]) for i in indexes]
+
+            def conflicts(self) -> list[tuple[int, int, tuple[int, int | str, int | str]]]:
+                """Returns (versionA, versionB, address) for every pair of versions that can't run in the same tick, IE: one writes an address the other reads or writes
+
+                Addresses are grouped in one pass over the log (hash sets per address), instead of compairing every pair of versions. Costs O(transactions + conflicts)
+                """
+
+                writers : dict[int, set[int]] = {}
+                readers : dict[int, set[int]] = {}
+                for op, addressId, version in zip(self.op, self.address, self.version):
+                    (writers if op == self.WRITE else readers).setdefault(addressId, set()).add(version)
+
+                found : set[tuple[int, int, int]] = set()
+                for addressId, versions in writers.items():
+                    for versionA in versions:
+                        for versionB in itertools.chain(versions, readers.get(addressId, ())):
+                            if versionA != versionB:
+                                found.add((min(versionA, versionB), max(versionA, versionB), addressId))
+
+                return sorted([(versionA, versionB, self._addresses[addressId]) for versionA, versionB, addressId in found], key = lambda conflict : (conflict[0], conflict[1], str(conflict[2])))
+
+            def clear(self) -> None:
+                for column in (self.op, self.address, self.version, self.size, self.latency):
+                    del column[:]
+                self._addressIds.clear()
+                self._addresses.clear()
+                self._versionRows.clear()
+
         def __init__(self):
-            self.poolArray : dict[int, Any] = {}
+            self.poolArray : dict[int | str, Any] = {} # poolEntryPoint -> the first pool that reads and writes through it go to, see 'def createPool'
+
+            # memory versioning, every branchNode is a 'class PersistentMap' of (hyperThreadContext, key, index) -> value, branchNode 0 is the master copy
+            self._branches : dict[int, CPUsim_v4.PersistentMap] = {0 : CPUsim_v4.PersistentMap()}
+            self._branchParent : dict[int, int] = {}                                # branchNode -> the branchNode it was forked from
+            self._branchBase : dict[int, CPUsim_v4.PersistentMap] = {}              # branchNode -> the parent's map when forked (or last commited into), see 'def commit'
+            self._branchWrites : dict[int, CPUsim_v4.PersistentMap] = {}            # branchNode -> the memory elements written in this branch since it was forked
+            self._branchNext : int = 1
+
+            self.transactions : CPUsim_v4.MMMUDefault.TransactionLog | None = None # the non virtual reads and writes since the last 'def tick', None unless turned on, see 'def configTransactionLog'
+
+            self._config : dict[tuple[int | str, int | str], dict[str, Any]] = {} # (key, index) -> {'bitLength' : int}, see 'def configInfo'
+
+            self._writeWatchers : dict[int | str, list[Callable[[int, int, int | str, int | str], None]]] = {} # key -> functions called on every write to key, see 'def addWriteWatcher'
+
+        def createPool(self, poolEntryPoint : int | str, pool : Any) -> None:
+            """Takes in a poolEntryPoint (IE: "L1D"), and a pool ('class PoolCache', 'class PoolMemory', or any class with access(key, index, write) -> latency and flush())
+
+            Non virtual reads and writes with that poolEntryPoint are routed through the pool, pools are chained with nextPool. poolEntryPoint 0 is not routed (IE: registers)
+            """
+
+            assert poolEntryPoint != 0
+            assert callable(pool.access)
+
+            self.poolArray[poolEntryPoint] = pool
+
+        def createCacheHierarchy(self, lineSize : int = 8, eviction : Callable[[], Any] = None) -> None:
+            """Creates a default cache hierarchy, registers -> L1D/L1I -> L2 -> DRAM, as the poolEntryPoints "L1D", "L1I", "L2", and "DRAM"
+
+            eviction is called once per cache level for it's eviction policy (IE: CPUsim_v4.MMMUDefault.EvictionRoundRobin), default LRU
+            """
+
+            eviction = eviction if eviction is not None else CPUsim_v4.MMMUDefault.EvictionLRU
+
+            DRAM = self.PoolMemory(latency = 100)
+            L2 = self.PoolCache(sets = 256, ways = 8, lineSize = lineSize, latency = 12, eviction = eviction(), nextPool = DRAM)
+            self.createPool("DRAM", DRAM)
+            self.createPool("L2", L2)
+            self.createPool("L1D", self.PoolCache(sets = 64, ways = 8, lineSize = lineSize, latency = 4, eviction = eviction(), nextPool = L2))
+            self.createPool("L1I", self.PoolCache(sets = 64, ways = 8, lineSize = lineSize, latency = 4, eviction = eviction(), nextPool = L2))
+
+        def getPoolStats(self) -> dict[int | str, dict[str, int]]:
+            """Returns the counters (IE: hits, misses, evictions) of every pool, {poolEntryPoint : {counter : value}}"""
+
+            return {poolEntryPoint : dict(pool.stats) for poolEntryPoint, pool in self.poolArray.items()}
+
+        def createMemory(self, key : int | str, index : int | str, value : int = 0, hyperThreadContext : int = 0, branchNode : int = 0, bitLength : int = 16) -> None:
+            """Creates a memory element with the specified key, index, value, and bitLength, in the specified branchNode (IE: the master copy, branchNode 0)
+
+            Branches forked afterwards can read and write it, branches forked before can not (until the branch is commited)
+            """
+
+            assert type(key) is str or type(key) is int
+            assert type(index) is str or type(index) is int
+            assert type(value) is int
+            assert value >= 0
+            assert type(hyperThreadContext) is int
+            assert type(bitLength) is int
+            assert bitLength >= 1
+
+            self._config[(key, index)] = {'bitLength' : bitLength}
+
+            if branchNode not in self._branches:
+                raise MMMUAccessError(f'ERROR -> branchNode: {branchNode}')
+
+            self._writeBranch(branchNode, (hyperThreadContext, key, index), value)
+
+        def configInfo(self, key : int | str, index : int | str) -> dict[str, Any]:
+            """Returns the configuration of a memory element, IE: {'bitLength' : 16}. Passed to instructionSet instructions as funcGetConfig
+
+            Raises MMMUAccessError if the memory element was never created
+            """
+
+            if (key, index) not in self._config:
+                raise MMMUAccessError(f'ERROR -> register: {(key, index)}')
+
+            return self._config[(key, index)]
+
+        def addWriteWatcher(self, key : int | str, function : Callable[[int, int, int | str, int | str], None]) -> None:
+            """Calls function(branchNode, hyperThreadContext, key, index) after every write (virtual or not) to a memory element of key, in any branchNode
+
+            IE: 'class DecoderDefault' watches code memory, to invalidate cached instructions
+            """
+
+            assert type(key) is str or type(key) is int
+            assert callable(function)
+
+            self._writeWatchers.setdefault(key, []).append(function)
 
         def read(self, virtualOperation : bool, transactionType : str, branchNode : int, poolEntryPoint : int, hyperThreadContext : int, key : int | str, index : int | str):
             """
@@ -9354,14 +13024,367 @@ class CPUsim_v4:
                         -> accesses memory version node 1234, fetch memory element '255' from bank 'm', with hyperThreadContext of '0', via the 'L1Instruction' memory pool
                     (1234, L1Instruction, 0, '__', 255) 
                         -> accesses memory version node 1234, fetch raw memory element '255' from 'L1Instruction' memory pool. hyperThreadContext is not realavent
+
+            Raises MMMUAccessError if the branchNode or memory element doesn't exist
+            Non virtual reads are routed through the pool at poolEntryPoint for it's stats (see 'def createPool'), the value always comes from the branchNode
             """
-            pass
 
-        def getMemoryKeys(self, versionNode : int) -> tuple[int, int, int, int | str, int | str]:
+            branch : CPUsim_v4.PersistentMap = self._branches.get(branchNode)
+            if branch is None:
+                raise MMMUAccessError(f'ERROR -> branchNode: {branchNode}')
+
+            value : int = branch.get((hyperThreadContext, key, index))
+            if value is None:
+                raise MMMUAccessError(f'ERROR -> register: {(key, index)}')
+
+            if not virtualOperation:
+                latency : int = self.poolArray[poolEntryPoint].access(key, index, False) if poolEntryPoint in self.poolArray else 0
+                if self.transactions is not None:
+                    self.transactions.append(self.TransactionLog.READ, (hyperThreadContext, key, index), branchNode, 1, latency)
+
+            return value
+
+        def write(self, virtualOperation : bool, transactionType : str, branchNode : int, poolEntryPoint : int, hyperThreadContext : int, key : int | str, index : int | str, value : int) -> None:
+            """Writes value to a memory element of branchNode, see 'def read' for the arguments. Costs O(log n), other branchNodes are not affected
+
+            Raises MMMUAccessError if the branchNode or memory element doesn't exist
+            """
+
+            assert type(value) is int
+            assert value >= 0
+
+            branch : CPUsim_v4.PersistentMap = self._branches.get(branchNode)
+            if branch is None:
+                raise MMMUAccessError(f'ERROR -> branchNode: {branchNode}')
+            if (hyperThreadContext, key, index) not in branch:
+                raise MMMUAccessError(f'ERROR -> register: {(key, index)}')
+
+            if not virtualOperation:
+                latency : int = self.poolArray[poolEntryPoint].access(key, index, True) if poolEntryPoint in self.poolArray else 0
+                if self.transactions is not None:
+                    self.transactions.append(self.TransactionLog.WRITE, (hyperThreadContext, key, index), branchNode, 1, latency)
+
+            self._writeBranch(branchNode, (hyperThreadContext, key, index), value)
+
+            watchers : list[Callable[[int, int, int | str, int | str], None]] = self._writeWatchers.get(key)
+            if watchers is not None:
+                for function in watchers:
+                    function(branchNode, hyperThreadContext, key, index)
+
+        def _writeBranch(self, branchNode : int, address : tuple[int, int | str, int | str], value : int) -> None:
+            """Sets address to value in branchNode, and records the write if branchNode is forked"""
+
+            self._branches[branchNode] = self._branches[branchNode].set(address, value)
+            if branchNode in self._branchWrites:
+                self._branchWrites[branchNode] = self._branchWrites[branchNode].set(address, value)
+
+        def fork(self, branchNode : int) -> int:
+            """Creates a new memory version branched off of branchNode, returns the new branchNode. Costs O(1), no memory is copied
+
+            Writes to either branchNode are not seen by the other, until 'def commit'
             """
-            Returns a tuple of (branchNode, poolEntryPoint, hyperThreadContext, key, index)
+
+            if branchNode not in self._branches:
+                raise MMMUAccessError(f'ERROR -> branchNode: {branchNode}')
+
+            newBranch : int = self._branchNext
+            self._branchNext += 1
+
+            self._branches[newBranch] = self._branches[branchNode]
+            self._branchParent[newBranch] = branchNode
+            self._branchBase[newBranch] = self._branches[branchNode]
+            self._branchWrites[newBranch] = CPUsim_v4.PersistentMap()
+
+            return newBranch
+
+        def commit(self, branchNode : int) -> None:
+            """Takes in a branchNode created by 'def fork', commits it's writes into the branchNode it was forked from, and removes it
+
+            If the parent branchNode hasn't been written since the fork, the parent takes the branch's memory as is, O(1)
+            Otherwise only the memory elements written in the branch are copied, O(writes * log n). Writes in the branch win over writes in the parent
+            Branches forked from branchNode are moved to it's parent
             """
-            pass
+
+            if branchNode not in self._branchParent:
+                raise MMMUAccessError(f'ERROR -> branchNode: {branchNode}')
+
+            parent : int = self._branchParent[branchNode]
+            writes : CPUsim_v4.PersistentMap = self._branchWrites[branchNode]
+            if self._branches[parent] is self._branchBase[branchNode]:
+                self._branches[parent] = self._branches[branchNode]
+                if parent in self._branchWrites:
+                    self._branchWrites[parent] = self._branchWrites[parent].update(writes.items())
+            else:
+                for address, value in writes.items():
+                    self._writeBranch(parent, address, value)
+
+            self._removeBranch(branchNode)
+
+        def discard(self, branchNode : int) -> None:
+            """Takes in a branchNode created by 'def fork', drops it and all it's writes. Branches forked from branchNode are discarded too (IE: a mispredicted branch)"""
+
+            if branchNode not in self._branchParent:
+                raise MMMUAccessError(f'ERROR -> branchNode: {branchNode}')
+
+            for child in [child for child, parent in self._branchParent.items() if parent == branchNode]:
+                self.discard(child)
+            self._removeBranch(branchNode)
+
+        def _removeBranch(self, branchNode : int) -> None:
+            parent : int = self._branchParent[branchNode]
+            for child, childParent in self._branchParent.items():
+                if childParent == branchNode:
+                    self._branchParent[child] = parent
+                    self._branchBase[child] = None # never the parent's map, so the child's commit copies only it's own writes
+
+            del self._branches[branchNode]
+            del self._branchParent[branchNode]
+            del self._branchBase[branchNode]
+            del self._branchWrites[branchNode]
+
+        def configTransactionLog(self, enabled : bool = True) -> None:
+            """Turns logging of non virtual reads and writes on (see 'def memoryTransactions', 'def conflicts'), or off (default)
+
+            The log is only cleared by 'def tick', so whoever turns it on has to call 'def tick' every tick (IE: 'class ExecutorOutOfOrder' does)
+            """
+
+            assert type(enabled) is bool
+
+            if not enabled:
+                self.transactions = None
+            elif self.transactions is None:
+                self.transactions = self.TransactionLog()
+
+        def memoryTransactions(self, versionNode : int) -> list[tuple[int, tuple[int, int | str, int | str], int, int, int]]:
+            """Returns the non virtual reads and writes made in versionNode since the last 'def tick', as (op, (hyperThreadContext, key, index), branchNode, size, latency)
+
+            op is TransactionLog.READ or TransactionLog.WRITE. See 'def conflicts' for checking whether branchNodes conflict. Empty unless logging is on, see 'def configTransactionLog'
+            """
+
+            if self.transactions is None:
+                return []
+            return self.transactions.rows(versionNode)
+
+        def conflicts(self) -> list[tuple[int, int, tuple[int, int | str, int | str]]]:
+            """Returns (branchNodeA, branchNodeB, (hyperThreadContext, key, index)) for every pair of branchNodes that accessed the same memory element since the last 'def tick', with at least one of them writing it
+
+            IE: (A+B=C) in one branchNode and (C+D=E) in another can't execute in the same tick, since one writes C while the other reads C
+            Empty unless logging is on, see 'def configTransactionLog'
+            """
+
+            if self.transactions is None:
+                return []
+            return self.transactions.conflicts()
+
+        def tick(self) -> None:
+            """Starts a new tick, clears the memory transactions"""
+
+            if self.transactions is not None:
+                self.transactions.clear()
+
+        def getMemoryKeys(self, versionNode : int) -> list[tuple[int, int, int, int | str, int | str]]:
+            """
+            Returns a list of (branchNode, poolEntryPoint, hyperThreadContext, key, index), one for every memory element of versionNode
+            poolEntryPoint is always 0, memory elements are stored once per branchNode, pools only model where they would be cached
+            """
+
+            if versionNode not in self._branches:
+                raise MMMUAccessError(f'ERROR -> branchNode: {versionNode}')
+
+            return [(versionNode, 0, hyperThreadContext, key, index) for (hyperThreadContext, key, index), value in self._branches[versionNode].items()]
+
+    class ExecutorOutOfOrder:
+        """An out of order execution engine with N execution ports and a reorder buffer, running a program out of a 'class MMMUDefault'
+
+        program is indexed by 'pc' (memory element ('pc', 0)), every element is None (not an instruction) or (operation, latency, arguments):
+            operation(funcRead, funcWrite, funcGetConfig, *arguments) - a Base Instruction, IE: InstructionSetDefault.opAdd
+            latency(funcRead, funcWrite, funcGetConfig, *arguments) - IE: InstructionSetDefault.latencyRegister_AddRippleCarry, an int, or None for 1 tick
+        Execution stops when 'pc' points outside of program, or at a None
+        program can also be a 'class DecoderDefault', then instructions are fetched and decoded from memory, and 'pc' advances by the instruction's length
+
+        Every tick:
+            completed instructions (a heap keyed by completion tick) free their port
+            completed instructions retire in program order, their memory branchNode is commited
+            the oldest ready instructions (every memory element they read was written by a completed instruction) are issued to free ports
+            instructions are dispatched into the reorder buffer in program order, up to dispatchWidth per tick
+        Ticks where nothing can happen (every port busy, reorder buffer full) are skipped to the next completion
+
+        Dispatch executes the instruction in it's own forked branchNode (see 'def MMMUDefault.fork'), and takes it's reads and writes from the MMMU transaction log.
+            Instructions are executed in program order (jumps are resolved at dispatch, IE: perfect branch prediction), issue and completion are scheduled out of order
+            Writes are renamed by the branchNodes, only read after write dependencies stall an instruction
+        latency ticks = ceiling(latency / tickLatency) (at least 1), plus the latency of any memory pool the instruction's accesses went through, plus the decoder's decodeLatency on a decode cache miss
+        """
+
+        class _Entry:
+            """An instruction in the reorder buffer"""
+            __slots__ = ("pc", "branchNode", "latency", "producers", "issued", "done")
+
+            def __init__(self, pc : int, branchNode : int, latency : int, producers : list):
+                self.pc : int = pc
+                self.branchNode : int = branchNode
+                self.latency : int = latency
+                self.producers : list[CPUsim_v4.ExecutorOutOfOrder._Entry] = producers
+                self.issued : bool = False
+                self.done : bool = False
+
+        def __init__(self, MMMU : "CPUsim_v4.MMMUDefault", program : "list[tuple[Callable, Callable | int | None, tuple] | None] | CPUsim_v4.DecoderDefault", 
+            ports : int = 2, reorderBufferSize : int = 16, dispatchWidth : int = None, 
+            tickLatency : Decimal | int = 1, poolEntryPoints : dict[int | str, int | str] = None):
+            """poolEntryPoints maps a memory key to the poolEntryPoint it's accesses are routed through (IE: {'m' : "L1D"}), other keys use poolEntryPoint 0"""
+
+            assert type(ports) is int and ports >= 1
+            assert type(reorderBufferSize) is int and reorderBufferSize >= 1
+            assert type(dispatchWidth) is type(None) or (type(dispatchWidth) is int and dispatchWidth >= 1)
+            assert tickLatency > 0
+
+            self.MMMU : CPUsim_v4.MMMUDefault = MMMU
+            self.program : list[tuple[Callable, Callable | int | None, tuple] | None] | CPUsim_v4.DecoderDefault = program
+            self.decoder : CPUsim_v4.DecoderDefault | None = program if isinstance(program, CPUsim_v4.DecoderDefault) else None
+            self.ports : int = ports
+            self.reorderBufferSize : int = reorderBufferSize
+            self.dispatchWidth : int = dispatchWidth if dispatchWidth is not None else ports
+            self.tickLatency : Decimal | int = tickLatency
+            self.poolEntryPoints : dict[int | str, int | str] = poolEntryPoints if poolEntryPoints is not None else {}
+
+            self.stats : dict[str, int] = dict.fromkeys(["ticks", "ticksSkipped", "instructions", "issueStalls"], 0)
+
+            MMMU.configTransactionLog(True) # read after write dependencies and pool latencies come from the log
+
+        def run(self, tickLimit : int = 2**20) -> dict[str, int]:
+            """Runs the program until it halts and every instruction retired, or tickLimit ticks. Returns self.stats, the stats of this run
+
+            Instructions still in the reorder buffer at tickLimit are dropped (their branchNodes are discarded), 'pc' points at the oldest of them
+
+            ticks           - ticks simulated, including skipped ticks
+            ticksSkipped    - idle ticks jumped over
+            instructions    - instructions retired
+            issueStalls     - ticks where a dispatched instruction was waiting on a read after write dependency
+            """
+
+            assert type(tickLimit) is int and tickLimit >= 1
+
+            MMMU : CPUsim_v4.MMMUDefault = self.MMMU
+            self.stats = dict.fromkeys(self.stats.keys(), 0)
+            stats : dict[str, int] = self.stats
+
+            reorderBuffer : collections.deque[CPUsim_v4.ExecutorOutOfOrder._Entry] = collections.deque()
+            events : list[tuple[int, int, CPUsim_v4.ExecutorOutOfOrder._Entry]] = [] # heap of (completion tick, order, entry)
+            lastWriter : dict[tuple[int, int | str, int | str], CPUsim_v4.ExecutorOutOfOrder._Entry] = {}
+            freePorts : int = self.ports
+            halted : bool = False
+            order : int = 0
+            tick : int = 0
+
+            while tick < tickLimit and (not halted or len(reorderBuffer) != 0):
+                progress : bool = False
+
+                while len(events) != 0 and events[0][0] <= tick:
+                    entry = heapq.heappop(events)[2]
+                    entry.done = True
+                    freePorts += 1
+
+                while len(reorderBuffer) != 0 and reorderBuffer[0].done:
+                    entry = reorderBuffer.popleft()
+                    MMMU.commit(entry.branchNode)
+                    stats["instructions"] += 1
+                    progress = True
+
+                waiting : bool = False
+                for entry in reorderBuffer:
+                    if freePorts == 0:
+                        break
+                    if entry.issued:
+                        continue
+                    if not all([producer.done for producer in entry.producers]):
+                        waiting = True
+                        continue
+                    entry.issued = True
+                    freePorts -= 1
+                    heapq.heappush(events, (tick + entry.latency, order, entry))
+                    order += 1
+                    progress = True
+                if waiting:
+                    stats["issueStalls"] += 1
+
+                dispatched : int = 0
+                while not halted and dispatched < self.dispatchWidth and len(reorderBuffer) < self.reorderBufferSize:
+                    entry = self._dispatch(reorderBuffer[-1].branchNode if len(reorderBuffer) != 0 else 0, lastWriter)
+                    if entry is None:
+                        halted = True
+                        break
+                    reorderBuffer.append(entry)
+                    dispatched += 1
+                    progress = True
+
+                MMMU.tick()
+
+                if progress or len(events) == 0:
+                    tick += 1
+                else: # nothing can change until the next instruction completes
+                    skipTo : int = min(events[0][0], tickLimit)
+                    stats["ticksSkipped"] += skipTo - tick - 1
+                    tick = skipTo
+
+            for entry in reversed(reorderBuffer): # youngest first, every branchNode is forked from the one before it
+                MMMU.discard(entry.branchNode)
+
+            stats["ticks"] = tick
+            return stats
+
+        def _dispatch(self, parentBranch : int, lastWriter : dict) -> "CPUsim_v4.ExecutorOutOfOrder._Entry | None":
+            """Executes the instruction at pc in a branchNode forked from parentBranch, returns it's reorder buffer entry, or None if the program halted"""
+
+            MMMU : CPUsim_v4.MMMUDefault = self.MMMU
+            branchNode : int = MMMU.fork(parentBranch)
+
+            log : CPUsim_v4.MMMUDefault.TransactionLog = MMMU.transactions
+            start : int = len(log)
+
+            pc : int = MMMU.read(True, "engine", branchNode, 0, 0, "pc", 0)
+            if self.decoder is None:
+                if not (0 <= pc < len(self.program)) or self.program[pc] is None:
+                    MMMU.discard(branchNode)
+                    return None
+                operation, latency, arguments = self.program[pc]
+                length : int = 1
+                decodeTicks : int = 0
+            else:
+                decoded : tuple[Callable, Callable | int | None, tuple, int, int] | None = self.decoder.decode(branchNode, pc)
+                if decoded is None:
+                    MMMU.discard(branchNode)
+                    return None
+                operation, latency, arguments, length, decodeTicks = decoded
+            MMMU.write(True, "engine", branchNode, 0, 0, "pc", 0, pc + length)
+
+            poolEntryPoints : dict[int | str, int | str] = self.poolEntryPoints
+            funcRead = lambda register : MMMU.read(False, "instruction", branchNode, poolEntryPoints.get(register[0], 0), 0, register[0], register[1])
+            funcWrite = lambda register, value : MMMU.write(False, "instruction", branchNode, poolEntryPoints.get(register[0], 0), 0, register[0], register[1], value)
+            funcReadVirtual = lambda register : MMMU.read(True, "instruction", branchNode, 0, 0, register[0], register[1])
+            funcWriteVirtual = lambda register, value : None
+            funcGetConfig = lambda register : MMMU.configInfo(register[0], register[1])
+
+            operation(funcRead, funcWrite, funcGetConfig, *arguments)
+
+            if latency is None:
+                ticks : int = 1
+            elif type(latency) is int:
+                ticks : int = latency
+            else:
+                ticks : int = math.ceil(latency(funcReadVirtual, funcWriteVirtual, funcGetConfig, *arguments) / self.tickLatency)
+            ticks = max(1, ticks) + sum(log.latency[start:]) + decodeTicks
+
+            entry = self._Entry(pc, branchNode, ticks, [])
+            for i in range(start, len(log)):
+                address : tuple[int, int | str, int | str] = log.addressOf(log.address[i])
+                if log.op[i] == log.READ:
+                    producer = lastWriter.get(address)
+                    if producer is not None and not producer.done and producer not in entry.producers:
+                        entry.producers.append(producer)
+            for i in range(start, len(log)):
+                if log.op[i] == log.WRITE:
+                    lastWriter[log.addressOf(log.address[i])] = entry
+
+            return entry
 
     class CompilerDefault:
         """
@@ -9756,10 +13779,433 @@ class CPUsim_v4:
             return result, None
         
     class DecoderDefault:
-        pass
+        """Decodes instructions out of code memory (IE: the memory elements output by 'def CompilerDefault.link') into instructionSet calls
+
+        encoding maps an opcode to (operation, latency, operandKeys), see 'class ExecutorOutOfOrder' for operation and latency
+            an instruction is one memory element holding the opcode, followed by one memory element per operand
+            operandKeys holds a memory key per operand, the operand's memory element is the index (IE: 'r' and 5 -> ('r', 5)), or None to pass the memory element as an int
+            Example:
+                encoding = {1 : (ISA.opAdd, ISA.latencyRegister_AddRippleCarry, ('r', 'r', 'r'))}
+                memory 'm' = [1, 2, 0, 1] -> (ISA.opAdd, ISA.latencyRegister_AddRippleCarry, (('r', 2), ('r', 0), ('r', 1))), length 4
+
+        Decoded instructions are cached by (address, instruction memory elements), decoding costs decodeLatency ticks once per unique instruction
+            every fetch still reads the instruction from memory (through poolEntryPoint), so a branchNode always sees it's own version of the code
+            writes to codeKey (in any branchNode) invalidate the cached instructions they overlap, see 'def MMMUDefault.addWriteWatcher'
+        """
+
+        def __init__(self, MMMU : "CPUsim_v4.MMMUDefault", encoding : dict[int, tuple[Callable, Callable | int | None, tuple[int | str | None, ...]]], 
+            codeKey : int | str = "m", poolEntryPoint : int | str = 0, decodeLatency : int = 1, hyperThreadContext : int = 0):
+
+            assert type(encoding) is dict
+            assert all([type(opcode) is int and len(spec) == 3 and callable(spec[0]) for opcode, spec in encoding.items()])
+            assert type(codeKey) is str or type(codeKey) is int
+            assert type(decodeLatency) is int and decodeLatency >= 0
+            assert type(hyperThreadContext) is int
+
+            self.MMMU : CPUsim_v4.MMMUDefault = MMMU
+            self.encoding : dict[int, tuple[Callable, Callable | int | None, tuple[int | str | None, ...]]] = encoding
+            self.codeKey : int | str = codeKey
+            self.poolEntryPoint : int | str = poolEntryPoint
+            self.decodeLatency : int = decodeLatency
+            self.hyperThreadContext : int = hyperThreadContext
+
+            self._cache : dict[int, dict[tuple[int, ...], tuple[Callable, Callable | int | None, tuple, int, int]]] = {} # address -> {instruction memory elements -> decoded}
+            self._maxLength : int = 1 + max([len(spec[2]) for spec in encoding.values()], default = 0)
+
+            self.stats : dict[str, int] = dict.fromkeys(["hits", "misses", "invalidations"], 0)
+
+            MMMU.addWriteWatcher(codeKey, self._invalidate)
+
+        def decode(self, branchNode : int, address : int) -> tuple[Callable, Callable | int | None, tuple, int, int] | None:
+            """Fetches the instruction at address of codeKey in branchNode, returns (operation, latency, arguments, length, decodeTicks)
+
+            decodeTicks is decodeLatency on a cache miss, 0 on a hit
+            Returns None if the address is outside of code memory, or the opcode isn't in encoding
+            """
+
+            assert type(address) is int
+
+            MMMU : CPUsim_v4.MMMUDefault = self.MMMU
+            try:
+                opcode : int = MMMU.read(False, "decoder", branchNode, self.poolEntryPoint, self.hyperThreadContext, self.codeKey, address)
+                spec : tuple[Callable, Callable | int | None, tuple[int | str | None, ...]] | None = self.encoding.get(opcode)
+                if spec is None:
+                    return None
+                word : tuple[int, ...] = (opcode,) + tuple([MMMU.read(False, "decoder", branchNode, self.poolEntryPoint, self.hyperThreadContext, self.codeKey, address + i) for i in range(1, len(spec[2]) + 1)])
+            except MMMUAccessError:
+                return None
+
+            cached : dict[tuple[int, ...], tuple[Callable, Callable | int | None, tuple, int, int]] = self._cache.setdefault(address, {})
+            decoded : tuple[Callable, Callable | int | None, tuple, int, int] | None = cached.get(word)
+            if decoded is not None:
+                self.stats["hits"] += 1
+                return decoded
+
+            self.stats["misses"] += 1
+            operation, latency, operandKeys = spec
+            arguments : tuple = tuple([operand if key is None else (key, operand) for key, operand in zip(operandKeys, word[1:])])
+            decoded = (operation, latency, arguments, len(word), 0)
+            cached[word] = decoded
+
+            return decoded[:4] + (self.decodeLatency,)
+
+        def _invalidate(self, branchNode : int, hyperThreadContext : int, key : int | str, index : int | str) -> None:
+            """Drops every cached instruction overlapping the written memory element, see 'def MMMUDefault.addWriteWatcher'"""
+
+            if type(index) is not int:
+                return
+
+            address : int
+            for address in range(index - self._maxLength + 1, index + 1):
+                cached : dict[tuple[int, ...], tuple] | None = self._cache.get(address)
+                if not cached:
+                    continue
+                for word in [word for word in cached if address + len(word) > index]:
+                    del cached[word]
+                    self.stats["invalidations"] += 1
 
 #=============================================================================================================================================================== Unit Tests
 
+class Test_MMMUDefault(unittest.TestCase):
+    def setUp(self):
+        self.MMMU = CPUsim_v4.MMMUDefault()
+        for i in range(64):
+            self.MMMU.createMemory('m', i, i)
+        self.MMMU.createMemory('flag', 'carry', 0)
+
+    def read(self, branchNode : int, key : str | int, index : str | int) -> int:
+        return self.MMMU.read(True, "test", branchNode, 0, 0, key, index)
+
+    def write(self, branchNode : int, key : str | int, index : str | int, value : int) -> None:
+        self.MMMU.write(True, "test", branchNode, 0, 0, key, index, value)
+
+    def test_PersistentMap(self):
+        """Tests the persistent map against a dict, including hash collisions, and that old versions are unchanged"""
+
+        class Collide:
+            def __init__(self, value):
+                self.value = value
+            def __hash__(self):
+                return 7
+            def __eq__(self, other):
+                return type(other) is Collide and other.value == self.value
+
+        rng = random.Random(1)
+        expected : dict = {}
+        versions : list[tuple[CPUsim_v4.PersistentMap, dict]] = []
+        persistent = CPUsim_v4.PersistentMap()
+        for i in range(3000):
+            key = rng.choice([rng.randrange(500), ('m', rng.randrange(500)), Collide(rng.randrange(5)), -rng.randrange(500)])
+            persistent = persistent.set(key, i)
+            expected[key] = i
+            if i % 500 == 0:
+                versions.append((persistent, dict(expected)))
+
+        for persistent, expected in versions + [(persistent, expected)]:
+            self.assertEqual(len(persistent), len(expected))
+            self.assertEqual(dict(persistent.items()), expected)
+            for key, value in expected.items():
+                self.assertEqual(persistent[key], value)
+        self.assertNotIn(('m', 1000), persistent)
+        self.assertEqual(persistent.get(Collide(9), -1), -1)
+
+    def test_ReadWrite(self):
+        """Tests reading and writing memory elements, and MMMUAccessError for ones that don't exist"""
+        self.write(0, 'm', 3, 100)
+        self.assertEqual(self.read(0, 'm', 3), 100)
+        self.assertEqual(self.read(0, 'flag', 'carry'), 0)
+
+        self.assertRaises(MMMUAccessError, self.read, 0, 'm', 64)
+        self.assertRaises(MMMUAccessError, self.write, 0, 'r', 0, 1)
+        self.assertRaises(MMMUAccessError, self.read, 5, 'm', 0)
+        self.assertEqual(sorted(self.MMMU.getMemoryKeys(0), key = str)[:2], [(0, 0, 0, 'flag', 'carry'), (0, 0, 0, 'm', 0)])
+        self.assertEqual(len(self.MMMU.getMemoryKeys(0)), 65)
+
+    def test_ForkCommit(self):
+        """Tests that forked branches don't see each others writes until commited"""
+        branchA = self.MMMU.fork(0)
+        branchB = self.MMMU.fork(0)
+        self.write(branchA, 'm', 0, 10)
+        self.write(branchB, 'm', 1, 11)
+        self.assertEqual([self.read(i, 'm', 0) for i in (0, branchA, branchB)], [0, 10, 0])
+
+        self.MMMU.commit(branchA) # parent unchanged since the fork
+        self.assertEqual(self.read(0, 'm', 0), 10)
+        self.write(0, 'm', 2, 12)
+        self.MMMU.commit(branchB) # parent changed since the fork, only branchB's writes are copied
+        self.assertEqual([self.read(0, 'm', i) for i in range(4)], [10, 11, 12, 3])
+        self.assertRaises(MMMUAccessError, self.read, branchA, 'm', 0)
+        self.assertRaises(MMMUAccessError, self.MMMU.commit, 0)
+
+    def test_NestedBranches(self):
+        """Tests commiting and discarding nested branches"""
+        outer = self.MMMU.fork(0)
+        self.write(outer, 'm', 0, 1)
+        inner = self.MMMU.fork(outer)
+        self.write(inner, 'm', 1, 2)
+        self.MMMU.commit(inner)
+        self.assertEqual([self.read(outer, 'm', i) for i in range(2)], [1, 2])
+        self.MMMU.commit(outer)
+        self.assertEqual([self.read(0, 'm', i) for i in range(2)], [1, 2])
+
+        outer = self.MMMU.fork(0)
+        inner = self.MMMU.fork(outer)
+        self.write(inner, 'm', 5, 50)
+        self.MMMU.discard(outer)
+        self.assertRaises(MMMUAccessError, self.read, inner, 'm', 5)
+        self.assertEqual(self.read(0, 'm', 5), 5)
+
+        outer = self.MMMU.fork(0)
+        self.write(outer, 'm', 6, 60)
+        inner = self.MMMU.fork(outer)
+        self.write(inner, 'm', 7, 70)
+        self.MMMU.commit(outer) # inner moves to branchNode 0
+        self.write(0, 'm', 8, 80)
+        self.MMMU.commit(inner)
+        self.assertEqual([self.read(0, 'm', i) for i in (6, 7, 8)], [60, 70, 80])
+
+    def test_PoolCacheEviction(self):
+        """Tests hits, misses, and which line gets evicted, for every eviction policy"""
+        for eviction, expectedHit in [(CPUsim_v4.MMMUDefault.EvictionLRU, True), (CPUsim_v4.MMMUDefault.EvictionRoundRobin, False)]:
+            with self.subTest(eviction = eviction.__name__):
+                cache = CPUsim_v4.MMMUDefault.PoolCache(sets = 1, ways = 2, eviction = eviction())
+                for index in (0, 1, 0, 2): # 2 evicts 1 with LRU (0 was used again), 0 with round robin
+                    cache.access('m', index, False)
+                self.assertEqual(cache.stats["misses"], 3)
+                self.assertEqual(cache.stats["evictions"], 1)
+                cache.access('m', 0, False)
+                self.assertEqual(cache.stats["hits"] == 2, expectedHit)
+
+        cache = CPUsim_v4.MMMUDefault.PoolCache(sets = 4, ways = 2, lineSize = 4, eviction = CPUsim_v4.MMMUDefault.EvictionRandom(seed = 3))
+        for index in range(1000):
+            cache.access('m', random.Random(index).randrange(64), False)
+        self.assertEqual(cache.stats["hits"] + cache.stats["misses"], 1000)
+        self.assertEqual(cache.stats["misses"] - cache.stats["evictions"], 8, "every way is filled once before evictions start")
+
+    def test_PoolCacheHierarchy(self):
+        """Tests that misses and dirty evictions go down the hierarchy, and latency adds up"""
+        self.MMMU.createCacheHierarchy(lineSize = 8)
+        for i in range(16):
+            self.MMMU.read(False, "test", 0, "L1D", 0, 'm', i)
+        self.MMMU.write(False, "test", 0, "L1D", 0, 'm', 0, 7)
+        self.MMMU.read(False, "test", 0, "L1I", 0, 'm', 0)
+        self.MMMU.read(True, "test", 0, "L1D", 0, 'm', 32) # virtual reads aren't counted
+
+        stats : dict = self.MMMU.getPoolStats()
+        self.assertEqual((stats["L1D"]["hits"], stats["L1D"]["misses"], stats["L1D"]["writes"]), (15, 2, 1))
+        self.assertEqual((stats["L2"]["hits"], stats["L2"]["misses"]), (1, 2), "L1I misses, then hits in L2")
+        self.assertEqual(stats["DRAM"]["reads"], 2)
+        self.assertEqual(stats["L1D"]["latency"], 17 * 4 + 2 * (12 + 100))
+        self.assertEqual(self.read(0, 'm', 0), 7)
+
+        cache = CPUsim_v4.MMMUDefault.PoolCache(sets = 1, ways = 1, nextPool = CPUsim_v4.MMMUDefault.PoolMemory(latency = 10))
+        cache.access('m', 0, True)
+        self.assertEqual(cache.access('m', 1, False), 1 + 10 + 10, "miss, plus writing back the dirty line")
+        self.assertEqual(cache.stats["writebacks"], 1)
+        self.assertEqual(cache.nextPool.stats["writes"], 1)
+
+        accesses : list[tuple] = []
+        nextPool = CPUsim_v4.MMMUDefault.PoolMemory(latency = 10)
+        nextPool.access = lambda key, index, write : accesses.append((key, index, write)) or 10
+        cache = CPUsim_v4.MMMUDefault.PoolCache(sets = 2, ways = 1, nextPool = nextPool)
+        for index in ('zero', 'carry', 'zero', 1, 'overflow'): # str indexes take sets in the order they're first seen, 'overflow' evicts 'zero'
+            cache.access('flag', index, index == 'zero')
+        self.assertEqual((cache.stats["hits"], cache.stats["misses"]), (1, 4))
+        self.assertEqual(accesses[-2:], [('flag', 'overflow', False), ('flag', 'zero', True)], "the evicted str index is written back as is")
+
+    def test_MemoryTransactions(self):
+        """Tests the transaction log of a tick, and finding conflicts between branchNodes"""
+        self.MMMU.createMemory('r', 'a', 1)
+        self.MMMU.read(False, "test", 0, 0, 0, 'r', 'a')
+        self.assertIsNone(self.MMMU.transactions, "logging is off by default")
+        self.assertEqual(self.MMMU.memoryTransactions(0), [])
+        self.MMMU.configTransactionLog()
+
+        self.MMMU.createMemory('r', 'b', 2)
+        self.MMMU.createMemory('r', 'c', 0)
+        self.MMMU.createMemory('r', 'd', 4)
+        self.MMMU.createMemory('r', 'e', 0)
+
+        def add(branchNode : int, a : str, b : str, c : str) -> None:
+            self.write(branchNode, 'r', c, self.read(branchNode, 'r', a) + self.read(branchNode, 'r', b))
+
+        first = self.MMMU.fork(0)
+        second = self.MMMU.fork(0)
+        third = self.MMMU.fork(0)
+        self.MMMU.read(True, "test", first, 0, 0, 'r', 'e') # virtual reads aren't logged
+        for branchNode, registers in ((first, 'abc'), (second, 'cde'), (third, 'abd')):
+            self.MMMU.read(False, "test", branchNode, 0, 0, 'r', registers[0])
+            self.MMMU.read(False, "test", branchNode, 0, 0, 'r', registers[1])
+            self.MMMU.write(False, "test", branchNode, 0, 0, 'r', registers[2], 0)
+
+        R, W = CPUsim_v4.MMMUDefault.TransactionLog.READ, CPUsim_v4.MMMUDefault.TransactionLog.WRITE
+        self.assertEqual(self.MMMU.memoryTransactions(first), [(R, (0, 'r', 'a'), first, 1, 0), (R, (0, 'r', 'b'), first, 1, 0), (W, (0, 'r', 'c'), first, 1, 0)])
+        self.assertEqual(len(self.MMMU.transactions), 9)
+        self.assertEqual(self.MMMU.conflicts(), [(first, second, (0, 'r', 'c')), (second, third, (0, 'r', 'd'))], "C is written by first and read by second, D is read by second and written by third")
+
+        self.MMMU.tick()
+        self.assertEqual(self.MMMU.memoryTransactions(first), [])
+        self.assertEqual(self.MMMU.conflicts(), [])
+
+        log = CPUsim_v4.MMMUDefault.TransactionLog()
+        for version in range(2000): # every version writes it's own address, and reads the one before, all conflicts are found in one pass
+            log.append(log.WRITE, (0, 'm', version), version)
+            log.append(log.READ, (0, 'm', version - 1), version)
+        self.assertEqual(len(log.conflicts()), 1999)
+
+class Test_ExecutorOutOfOrder(unittest.TestCase):
+    def setUp(self):
+        self.ISA = CPUsim_v4.InstructionSetDefault()
+        self.MMMU = CPUsim_v4.MMMUDefault()
+        for i in range(8):
+            self.MMMU.createMemory('r', i, i)
+        self.MMMU.createMemory('pc', 0, 0)
+        for i, value in enumerate([1, 5, 0]):
+            self.MMMU.createMemory('imm', i, value)
+
+    def add(self, des : int, a : int, b : int) -> tuple[Callable, Callable, tuple]:
+        return (self.ISA.opAdd, self.ISA.latencyRegister_AddRippleCarry, (('r', des), ('r', a), ('r', b))) # 16 bit registers, 48 gate latency
+
+    def registers(self) -> list[int]:
+        return [self.MMMU.read(True, "test", 0, 0, 0, 'r', i) for i in range(8)]
+
+    def test_IndependentInstructions(self):
+        """Tests that independent instructions run in parallel on multiple ports, and idle ticks are skipped"""
+        program : list = [self.add(2, 0, 1), self.add(3, 0, 1), self.add(4, 0, 1), self.add(5, 0, 1)]
+
+        ticks : list[int] = []
+        for ports in (1, 2, 4):
+            with self.subTest(ports = ports):
+                self.setUp()
+                stats : dict = CPUsim_v4.ExecutorOutOfOrder(self.MMMU, program, ports = ports, tickLatency = 8).run()
+                self.assertEqual(self.registers(), [0, 1, 1, 1, 1, 1, 6, 7])
+                self.assertEqual(self.MMMU.read(True, "test", 0, 0, 0, 'pc', 0), 4)
+                self.assertEqual(stats["instructions"], 4)
+                self.assertGreater(stats["ticksSkipped"], 0)
+                ticks.append(stats["ticks"])
+        self.assertLess(ticks[1], ticks[0])
+        self.assertLess(ticks[2], ticks[1])
+
+    def test_DependentInstructions(self):
+        """Tests that a chain of read after write dependencies gets no faster with more ports, and results are retired in program order"""
+        program : list = [self.add(2, 0, 1), self.add(3, 2, 1), self.add(4, 3, 1), self.add(5, 4, 1)]
+
+        ticks : list[int] = []
+        for ports in (1, 4):
+            self.setUp()
+            stats : dict = CPUsim_v4.ExecutorOutOfOrder(self.MMMU, program, ports = ports, tickLatency = 8).run()
+            self.assertEqual(self.registers(), [0, 1, 1, 2, 3, 4, 6, 7])
+            ticks.append(stats["ticks"])
+        self.assertEqual(ticks[0], ticks[1])
+        self.assertGreater(stats["issueStalls"], 0)
+
+    def test_ReorderBuffer(self):
+        """Tests that a short instruction behind a long one completes first, but isn't retired first, and that a full reorder buffer stalls dispatch"""
+        program : list = [(self.ISA.opAdd, 100, (('r', 2), ('r', 0), ('r', 1))), (self.ISA.opAdd, 1, (('r', 3), ('r', 0), ('r', 1)))]
+        executor = CPUsim_v4.ExecutorOutOfOrder(self.MMMU, program, ports = 2)
+        stats : dict = executor.run(tickLimit = 50)
+        self.assertEqual(stats["instructions"], 0, "the second instruction is done, but waits on the first to retire")
+        self.assertEqual(self.registers()[2:4], [2, 3])
+        self.assertEqual(list(self.MMMU._branches.keys()), [0], "the instructions still in flight are dropped")
+        self.assertEqual(self.MMMU.read(True, "test", 0, 0, 0, 'pc', 0), 0)
+
+        stats = executor.run()
+        self.assertEqual(self.registers()[2:4], [1, 1])
+        self.assertEqual(stats["instructions"], 2)
+        self.assertLess(stats["ticks"], 50 + 100, "stats are per run")
+
+        self.setUp()
+        program = [(self.ISA.opAdd, 10, (('r', i), ('r', 0), ('r', 1))) for i in range(2, 8)]
+        stats = CPUsim_v4.ExecutorOutOfOrder(self.MMMU, program, ports = 4, reorderBufferSize = 2).run()
+        self.assertEqual(stats["ticks"], 1 + 3 * 11, "two instructions in flight at a time, every round is issued the tick after dispatch, and retired 10 ticks later")
+        self.assertEqual(self.registers(), [0, 1, 1, 1, 1, 1, 1, 1])
+
+    def test_Jump(self):
+        """Tests a loop, jumps are resolved at dispatch"""
+        self.MMMU.write(True, "test", 0, 0, 0, 'r', 0, 0)
+        program : list = [
+            (self.ISA.opAdd, None, (('r', 0), ('r', 0), ('imm', 0))),
+            (self.ISA.opJump, 1, ({}, {}, "!=", ('imm', 2), ('r', 0), ('imm', 1)))
+        ]
+        stats : dict = CPUsim_v4.ExecutorOutOfOrder(self.MMMU, program).run()
+        self.assertEqual(self.registers()[0], 5)
+        self.assertEqual(stats["instructions"], 10)
+        self.assertEqual(self.MMMU.read(True, "test", 0, 0, 0, 'pc', 0), 2)
+
+    def test_BitLengthInstructions(self):
+        """Tests instructions that read register bitLengths from funcGetConfig (see 'def MMMUDefault.configInfo')"""
+        self.MMMU.createMemory('b', 0, 0, bitLength = 8)
+        program : list = [
+            (self.ISA.opRotate, None, ({}, {}, ('r', 2), ('r', 1), ('imm', 0), "right")),
+            (self.ISA.opCopyElement, None, ({}, {}, ('r', 3), ('r', 2))),
+            (self.ISA.opCopyElement, None, ({}, {}, ('b', 0), ('r', 7)))
+        ]
+        stats : dict = CPUsim_v4.ExecutorOutOfOrder(self.MMMU, program).run()
+        self.assertEqual(stats["instructions"], 3)
+        self.assertEqual(self.registers()[2:4], [2**15, 2**15])
+        self.assertEqual(self.MMMU.read(True, "test", 0, 0, 0, 'b', 0), 7)
+
+        funcGetConfig = lambda register : self.MMMU.configInfo(register[0], register[1])
+        energy : Decimal = self.ISA.energyRegister_MonoLogicGate(lambda register : 0, lambda register, value : None, funcGetConfig, ('r', 0), ('b', 0), ('r', 1))
+        self.assertEqual(energy, Decimal(16))
+
+class Test_DecoderDefault(unittest.TestCase):
+    def setUp(self):
+        self.ISA = CPUsim_v4.InstructionSetDefault()
+        self.MMMU = CPUsim_v4.MMMUDefault()
+        for i in range(4):
+            self.MMMU.createMemory('r', i, 0)
+        self.MMMU.createMemory('pc', 0, 0)
+        for i, value in enumerate([1, 5, 0]):
+            self.MMMU.createMemory('imm', i, value)
+
+        # add(r[a], r[b], imm[c]) and jump(imm[target], r[a], !=, imm[b])
+        self.encoding : dict = {
+            1 : (self.ISA.opAdd, None, ('r', 'r', 'imm')),
+            2 : (lambda funcRead, funcWrite, funcGetConfig, *registers : self.ISA.opJump(funcRead, funcWrite, funcGetConfig, {}, {}, "!=", *registers), 1, ('imm', 'r', 'imm'))
+        }
+        for i, value in enumerate([1, 0, 0, 0, 2, 2, 0, 1]):
+            self.MMMU.createMemory('m', i, value)
+
+    def test_DecodeCache(self):
+        """Tests a loop decoded out of memory, every unique instruction is decoded once"""
+        ticks : list[int] = []
+        for decodeLatency in (0, 10):
+            self.setUp()
+            decoder = CPUsim_v4.DecoderDefault(self.MMMU, self.encoding, decodeLatency = decodeLatency)
+            stats : dict = CPUsim_v4.ExecutorOutOfOrder(self.MMMU, decoder).run()
+            self.assertEqual(self.MMMU.read(True, "test", 0, 0, 0, 'r', 0), 5)
+            self.assertEqual(self.MMMU.read(True, "test", 0, 0, 0, 'pc', 0), 8)
+            self.assertEqual(stats["instructions"], 10)
+            self.assertEqual(decoder.stats, {"hits" : 8, "misses" : 2, "invalidations" : 0})
+            ticks.append(stats["ticks"])
+        self.assertLess(ticks[0], ticks[1])
+        self.assertLess(ticks[1], ticks[0] + 10 * 10, "decode latency is only paid on the 2 misses")
+
+    def test_Invalidate(self):
+        """Tests that writes to code memory invalidate the cached instructions they overlap, and branchNodes decode their own version of the code"""
+        decoder = CPUsim_v4.DecoderDefault(self.MMMU, self.encoding, decodeLatency = 3)
+
+        self.assertEqual(decoder.decode(0, 0), (self.ISA.opAdd, None, (('r', 0), ('r', 0), ('imm', 0)), 4, 3))
+        self.assertEqual(decoder.decode(0, 0), (self.ISA.opAdd, None, (('r', 0), ('r', 0), ('imm', 0)), 4, 0))
+
+        self.MMMU.write(True, "test", 0, 0, 0, 'm', 4, 2)
+        self.assertEqual(decoder.stats["invalidations"], 0, "m[4] is the next instruction")
+
+        self.MMMU.write(False, "test", 0, 0, 0, 'm', 2, 3)
+        self.assertEqual(decoder.stats["invalidations"], 1)
+        self.assertEqual(decoder.decode(0, 0), (self.ISA.opAdd, None, (('r', 0), ('r', 3), ('imm', 0)), 4, 3))
+
+        branchNode : int = self.MMMU.fork(0)
+        self.MMMU.write(True, "test", branchNode, 0, 0, 'm', 1, 2)
+        self.assertEqual(decoder.decode(branchNode, 0)[2], (('r', 2), ('r', 3), ('imm', 0)))
+        self.assertEqual(decoder.decode(0, 0)[2], (('r', 0), ('r', 3), ('imm', 0)))
+        self.assertEqual(decoder.stats["misses"], 4)
+
+        self.MMMU.write(True, "test", 0, 0, 0, 'm', 0, 7)
+        self.assertIsNone(decoder.decode(0, 0), "unknown opcode")
+        self.assertIsNone(decoder.decode(0, 6), "reads past the end of code memory")
+
 class Test_CompilerDefault_BuildingBlocks(unittest.TestCase):
     def setUp(self):
         self.compiler = CPUsim_v4.CompilerDefault
@@ -1,5 +1,6 @@
 import random
 import time
+import functools
 import CPUSimulator
 animationDelay = 0.05 #in seconds
 
@@ -64,6 +65,35 @@ def multiply1(a, b, bitlength=8):
     assert z == a * b #sanity check
     return z
 
+multiplyProgram = '''
+                # Multiplies two numbers together
+                # Inputs: r[0], t[0]
+                # Output: t[1]
+                loop:   jumpEQ  (end, r[0], 0)
+                            and     (r[1], r[0], 1)
+                            jumpNE  (zero, r[1], 1)
+                                add     (t[1], t[0], t[1])
+                zero:       shiftL  (t[0], t[0])
+                            shiftR  (r[0], r[0])
+                            jump    (loop)
+                end:    halt
+                '''
+
+def multiplyALU(bitlength : int, optimize : bool = False) -> "CPUSimulator.CPUsim":
+    """Returns a CPU configured for multiplyProgram, optimize turns on the peephole pass (see CPUsim.configSetOptimizer())
+
+    Is a module level function so CPUsim.sweep() can call it in worker processes
+    """
+    ALU = CPUSimulator.CPUsim(bitlength, defaultSetup=False) #bitlength
+    ALU.configSetOptimizer(optimize)
+
+    #configure memory
+    ALU.configAddRegister('r', bitlength, 2) #namespace symbol, bitlength, register amount #will overwrite defaults
+    ALU.configAddRegister('m', bitlength, 8, show=False) #the program is loaded into here
+    ALU.configAddRegister('t', bitlength * 2, 2) #note that the register bitlength is double the input register size
+
+    return ALU
+
 def multiply2(a : int, b : int, bitlength : int = 8) -> int:
     """Takes in two unsigned integers, a, b -> returns an integer a*b
 
@@ -96,27 +126,10 @@ def multiply2(a : int, b : int, bitlength : int = 8) -> int:
     resultPython = t[1]
 
     #the same algorithm, but using a generic assembly like algorithm
-    ALU = CPUSimulator.CPUsim(bitlength, defaultSetup=False) #bitlength
+    ALU = multiplyALU(bitlength)
     ALU.configSetDisplay(ALU.DisplaySimpleAndClean(0.5))
 
-    #configure memory
-    ALU.configAddRegister('r', bitlength, 2) #namespace symbol, bitlength, register amount #will overwrite defaults
-    ALU.configAddRegister('m', bitlength, 8, show=False) #the program is loaded into here
-    ALU.configAddRegister('t', bitlength * 2, 2) #note that the register bitlength is double the input register size
-
-    ALU.linkAndLoad('''
-                # Multiplies two numbers together
-                # Inputs: r[0], t[0]
-                # Output: t[1]
-                loop:   jumpEQ  (end, r[0], 0)
-                            and     (r[1], r[0], 1)
-                            jumpNE  (zero, r[1], 1)
-                                add     (t[1], t[0], t[1])
-                zero:       shiftL  (t[0], t[0])
-                            shiftR  (r[0], r[0])
-                            jump    (loop)
-                end:    halt
-                ''')
+    ALU.linkAndLoad(multiplyProgram)
     #loads arguments into correct registers
     ALU.inject(key='t', index=0, value=a)
     ALU.inject(key='r', index=0, value=b)
@@ -129,6 +142,26 @@ def multiply2(a : int, b : int, bitlength : int = 8) -> int:
     
     return resultALU
 
+def multiplyExhaustive(bitlength : int = 8) -> bool:
+    """Runs multiplyProgram on every possible pair of unsigned integers a, b -> returns True if every result is a*b
+
+    Uses CPUsim.sweep() to spread the runs over every CPU core, the program is only loaded (and optimized) once per core
+    """
+    assert type(bitlength) is int
+    assert bitlength >= 1
+
+    pairs = ((a, b) for a in range(2**bitlength) for b in range(2**bitlength))
+    results = CPUSimulator.CPUsim.sweep(
+        functools.partial(multiplyALU, bitlength, True),
+        multiplyProgram,
+        ({'t' : {0 : a}, 'r' : {0 : b}} for a, b in pairs),
+        [('t', 1)],
+        cycleLimit = 8 * bitlength + 8
+    )
+
+    pairs = ((a, b) for a in range(2**bitlength) for b in range(2**bitlength))
+    return all(result['t'][1] == a * b for (a, b), result in zip(pairs, results, strict = True))
+
 if __name__ == "__main__":
     animationDelay = 0.5
 